@@ -572,7 +572,7 @@ class AllBlogPosts(Timeline):
     def __init__(self):
         # ensure we initialize the ranges mixin properly.
         super(AllBlogPosts, self).__init__(
-            Post.objects.all(),
+            Post.objects.all().prefetch_atoms(),
             'publish_timestamp',
             'publish_timestamp',
             'resource_type',
@@ -1,8 +1,11 @@
 """
 Blog related middleware.
 """
+from django.utils import timezone
+
 from swim.blog.models import Post, AllBlogPosts
 from swim.content.models import Page
+from swim.core.content import get_queryset_stamp
 
 #-------------------------------------------------------------------------------
 def blog_context(request, context, resource, template):
@@ -14,9 +17,22 @@ def blog_context(request, context, resource, template):
         # the page _IS_ the blog!
         context['blog'] = context['resource']
 
+def blog_context_stamps(request, resource, template):
+    # The blog is the resource, which the page already covers.
+    return []
+blog_context.modification_stamps = blog_context_stamps
+
 #-------------------------------------------------------------------------------
 def all_blog_posts(request, context, resource, template):
     """
     Update the context to include an 'all_calendar_events' entry.
     """
     context['all_blog_posts'] = AllBlogPosts()
+
+def all_blog_posts_stamps(request, resource, template):
+    # Posts move into the past as time goes by, without being saved.
+    return [
+        get_queryset_stamp(Post.objects.all()),
+        get_queryset_stamp(Post.objects.filter(publish_timestamp__lte=timezone.now())),
+    ]
+all_blog_posts.modification_stamps = all_blog_posts_stamps
@@ -3,6 +3,7 @@ from datetime import datetime
 
 from django.http import Http404
 
+from swim.core.content import get_queryset_stamp
 from swim.content.views import PageView
 from swim.blog.models import (
     Blog,
@@ -34,6 +35,18 @@ class BlogView(PageView):
         except Blog.DoesNotExist as e:
             raise Http404()
 
+    #---------------------------------------------------------------------------
+    def get_modification_stamps(self, request, resource, template):
+        """
+        Blog pages list the published posts of their blog.
+        """
+        stamps = super(BlogView, self).get_modification_stamps(
+                request, resource, template)
+        blog = resource if isinstance(resource, Blog) else resource.blog
+        stamps.append(get_queryset_stamp(
+                Post.published_objects.filter(blog=blog)))
+        return stamps
+
 
 #-------------------------------------------------------------------------------
 class BlogTagView(BlogView):
@@ -6,6 +6,7 @@ from django.utils import timezone
 
 from swim.chronology.fields import TimeField
 from swim.chronology import get_now
+from swim.core import ContentQuerySet
 
 #-------------------------------------------------------------------------------
 class Event(models.Model):
@@ -171,12 +172,13 @@ class Instant(Event):
         abstract = True
 
 #-------------------------------------------------------------------------------
-class PublishedItemsManager(models.Manager):
+class PublishedItemsManager(models.Manager.from_queryset(ContentQuerySet)):
     def get_queryset(self):
         return super(PublishedItemsManager, self).get_queryset() \
             .exclude(publish_date__gt=get_now()) \
             .exclude(publish_date__isnull=True) \
-            .order_by('-publish_date')
+            .order_by('-publish_date') \
+            .prefetch_atoms()
 
 #-------------------------------------------------------------------------------
 class PublishedInstant(Instant):
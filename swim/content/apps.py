@@ -5,3 +5,5 @@ class ContentAppConfig(AppConfig):
 
     def ready(self):
         from swim.content import sitemaps
+        from swim.content.models import connect_site_wide_content_receivers
+        connect_site_wide_content_receivers()
@@ -7,7 +7,8 @@ from datetime import datetime
 import collections
 
 from django.db import models, IntegrityError
-from django.db.models.signals import post_init
+from django.db.models import Prefetch, prefetch_related_objects
+from django.db.models.signals import post_init, post_save, post_delete
 from django.forms import ValidationError
 from django.conf import settings
 from django.utils.http import http_date
@@ -21,11 +22,14 @@ from swim.core import WithRelated, is_subpath_on_path
 from swim.core.content import (
         register_content_object,
         register_atom_type,
+        prefetch_atoms,
+        CONTENT_ATOM_METADATA,
         AtomType,
         ReferencedAtomType,
     )
 from swim.chronology.models import Period, AnonymousInstant
 from swim.core import modelfields, string_to_key
+from swim.core.cache import LRUCache, VersionedCache, VersionStamp
 from swim.core.models import (
     ModelBase,
     ModelIsContentType,
@@ -168,10 +172,33 @@ class Menu(ModelIsContentType):
             return 'Untitled %s' % self.id
 
 
+    #---------------------------------------------------------------------------
+    @classmethod
+    def prefetch_relations(cls, menus, attributes):
+        """
+        Load the links of all of the menus at once, when they will be used.
+
+        See: swim.core.content.prefetch_analyzed_atoms
+        """
+        if {'links', 'menulinks'} & set(attributes):
+            prefetch_related_objects(
+                    menus,
+                    Prefetch('menulink_set', queryset=MenuLink.objects.select_related('link'))
+                )
+
+    #---------------------------------------------------------------------------
+    def _get_menulink_set(self):
+        from swim.core import pagecache
+
+        pagecache.record_related(self, MenuLink)
+        if 'menulink_set' in getattr(self, '_prefetched_objects_cache', {}):
+            return self.menulink_set.all()
+        return self.menulink_set.all().select_related('link')
+
     #---------------------------------------------------------------------------
     def get_links(self):
         links = []
-        for menulink in self.menulink_set.all().select_related('link'):
+        for menulink in self._get_menulink_set():
             links.append(menulink.link)
         return links
     links = property(get_links, )
@@ -179,7 +206,7 @@ class Menu(ModelIsContentType):
     #---------------------------------------------------------------------------
     def get_menulinks(self):
         links = []
-        for menulink in self.menulink_set.all().select_related('link'):
+        for menulink in self._get_menulink_set():
             links.append(menulink)
         return links
     menulinks = property(get_menulinks, )
@@ -193,10 +220,14 @@ class Menu(ModelIsContentType):
         This is a frequently accomplished task - and because of this we want to
         make sure it's as efficient as possible.
         """
-        links = []
+        from swim.core import pagecache
+
+        pagecache.record_related(self, MenuLink)
         return Page.objects.filter(
                 ownlink__menulink__menu=self
-            ).order_by('ownlink__menulink__order').select_related("resource_type")
+            ).order_by(
+                'ownlink__menulink__order'
+            ).select_related("resource_type").prefetch_atoms()
     pages = property(get_pages, )
 
 #-------------------------------------------------------------------------------
@@ -301,7 +332,17 @@ class CopySlot(ContentSlot, ModelIsContentType):
         verbose_name_plural = "Copy"
         ordering = ['order',]
 
-register_atom_type('copy', AtomType(CopySlot))
+register_atom_type(
+        'copy',
+        AtomType(CopySlot, swim_content_types=(
+            'swim.content.Copy',
+            'swim.content.TextInputCopy',
+            'swim.content.TextAreaCopy',
+            'swim.content.TinyMCECopy',
+            'swim.content.CKEditorCopy',
+            'swim.content.EditAreaCopy',
+        ))
+    )
 
 #-------------------------------------------------------------------------------
 class MenuSlot(ContentSlot):
@@ -346,7 +387,10 @@ class ArrangementSlot(ContentSlot):
 
 register_atom_type(
         'arrangement',
-        ReferencedAtomType(Arrangement, ArrangementSlot)
+        ReferencedAtomType(
+            Arrangement, ArrangementSlot,
+            swim_content_types=('swim.core.ArrangementType',)
+        )
     )
 
 #-------------------------------------------------------------------------------
@@ -447,7 +491,7 @@ class EnumSlot(ContentSlot, ModelIsContentType):
         ordering = ['order',]
 register_atom_type(
         'enum',
-        AtomType(EnumSlot)
+        AtomType(EnumSlot, swim_content_types=('swim.core.EnumType',))
     )
 
 #-------------------------------------------------------------------------------
@@ -495,19 +539,49 @@ class MenuTreeGenerator:
 
     #---------------------------------------------------------------------------
     def __getitem__(self, key):
+        """
+        Returns the tree for the menus under key, which each worker builds
+        once per page and keeps until a page or a menu changes.
+        """
+        from swim.core import pagecache
+
+        (root, tags) = menu_trees.get_or_build(
+                (menu_tree_versions.get(), self.page.path, key),
+                lambda: self.build(key),
+            )
+        # Pages using a cached tree don't load the rows it was built from.
+        pagecache.record_versions(tags)
+        return root
+
+    #---------------------------------------------------------------------------
+    def build(self, key):
         """
         Generates the appropriate tree based on the menus and parent pages.
 
         First, we'll look up all the parent pages using a single query, then we
         will find out which ones have the appropriate menu (if they don't they
-        are excluded).  Once we have a list of ones with the appropriate menus
-        we will get all of their menu links, and generate the appropriate tree.
+        are excluded), loading the menus of every page with another.  Once we
+        have a list of ones with the appropriate menus we will get all of their
+        menu links, and their links, with a third, and generate the
+        appropriate tree.
 
+        Returns (the root MenuTreeNode, a dict of the page cache tags of the
+        rows used to their versions).
 
         Note: once we generate the list of paths in order from '/' to the page
         that we are targetting - we will iterate over the paths for most of
         the loops in this algorithm in order to consistently order them.
         """
+        from swim.core import pagecache
+
+        with pagecache.collect_dependencies() as tags:
+            root = self._build(key)
+        return (root, tags)
+
+    #---------------------------------------------------------------------------
+    def _build(self, key):
+        from swim.core import pagecache
+
         parent_paths = []
         path_parts = self.page.path.strip("/").split("/")
         for i in range(0, len(path_parts)):
@@ -516,6 +590,7 @@ class MenuTreeGenerator:
         page_lookup = {self.page.path: self.page}
         for page in parent_pages:
             page_lookup[page.path] = page
+        prefetch_atoms(page_lookup.values(), 'menu')
 
         # Now that we have all of the pages we are to include, let's see if
         # they have a menu associated with them
@@ -525,8 +600,8 @@ class MenuTreeGenerator:
         target_paths = []
         menu_ids = []
         for path in parent_paths + [self.page.path]:
-            page = page_lookup[path]
             try:
+                page = page_lookup[path]
                 menu = page.menu[key]
                 target_paths.append(path)
                 menu_lookup[path] = menu
@@ -538,11 +613,13 @@ class MenuTreeGenerator:
 
         # Now we have a list of paths that have the appropriate menus in
         # order.
+        for menu in menu_by_id_lookup.values():
+            pagecache.record_related(menu, MenuLink)
         menu_link_lookup = collections.defaultdict(list)
-        menu_link_as = MenuLink.objects.filter(
+        menu_links = MenuLink.objects.filter(
                 menu__id__in=menu_ids
             ).order_by('order').select_related('link')
-        for menu_link in MenuLink.objects.filter(menu__id__in=menu_ids).order_by('order'):
+        for menu_link in menu_links:
             menu = menu_by_id_lookup[menu_link.menu_id]
             menu_link_lookup[path_by_menu_id[menu.id]].append(menu_link.link)
 
@@ -586,6 +663,16 @@ class MenuTreeGenerator:
 
         return root
 
+#-------------------------------------------------------------------------------
+# The trees built by MenuTreeGenerator, keyed on (version, page path, key).
+menu_trees = LRUCache(getattr(settings, 'SWIM_MENU_TREE_CACHE_SIZE', 1024))
+
+# Bumped whenever anything a tree is built from changes.
+menu_tree_versions = VersionStamp('menu_trees')
+
+def bump_menu_tree_versions(sender, instance, **kwargs):
+    menu_tree_versions.bump()
+
 #-------------------------------------------------------------------------------
 class Page(LinkResource, ClassIsContentType):
     """A resource with a URL, title and content defined by its content schema.
@@ -697,7 +784,10 @@ class PageSlot(ContentSlot):
 
 register_atom_type(
         'page',
-        ReferencedAtomType(Page, PageSlot)
+        ReferencedAtomType(
+            Page, PageSlot,
+            swim_content_types=('swim.content.PageType',)
+        )
     )
 register_content_object('page', Page)
 
@@ -734,3 +824,78 @@ class SiteWideContent(HasResourceType):
 #-------------------------------------------------------------------------------
 register_content_object('site', SiteWideContent)
 
+#-------------------------------------------------------------------------------
+def load_site_wide_content():
+    """
+    Returns (content, tags, sites) for the site wide content.
+
+    content
+        Every SiteWideContent, with all of its atoms loaded.
+    tags
+        A dict of the page cache tags of the rows loaded to their versions,
+        which the pages using the content record themselves, as they don't
+        load them.
+    sites
+        A dict of site id to a copy of that Site with the content set on it,
+        filled in by swim.context.
+    """
+    from swim.core import pagecache
+
+    with pagecache.collect_dependencies() as tags:
+        pagecache.record_model(SiteWideContent)
+        content = list(SiteWideContent.objects.select_related('resource_type'))
+        prefetch_atoms(content, *[
+                accessor.attr_name
+                for accessor in getattr(SiteWideContent, '_atom_accessors', ())
+            ])
+    return (content, tags, {})
+
+site_wide_content = VersionedCache('site_wide_content', load_site_wide_content)
+
+post_save.connect(site_wide_content.invalidate, sender=SiteWideContent)
+post_delete.connect(site_wide_content.invalidate, sender=SiteWideContent)
+# The copies of the sites the content is set on are kept along with it.
+post_save.connect(site_wide_content.invalidate, sender=Site)
+post_delete.connect(site_wide_content.invalidate, sender=Site)
+
+#-------------------------------------------------------------------------------
+def site_wide_content_slot_changed(sender, instance, **kwargs):
+    if instance.django_content_type_id == SiteWideContent.get_django_content_type().id:
+        site_wide_content.invalidate()
+
+#-------------------------------------------------------------------------------
+def site_wide_content_atom_changed(sender, instance, **kwargs):
+    for atom_type in CONTENT_ATOM_METADATA.values():
+        if getattr(atom_type, 'atom_model', None) is not sender:
+            continue
+        if atom_type.content_slot_model.objects.filter(**{
+                    atom_type.get_slot_attrname(): instance,
+                    'django_content_type': SiteWideContent.get_django_content_type(),
+                }).exists():
+            site_wide_content.invalidate()
+            return
+
+#-------------------------------------------------------------------------------
+def connect_site_wide_content_receivers():
+    """
+    Invalidate the site wide content when any of its slots, or the atoms
+    they refer to, change.
+    """
+    for atom_type in CONTENT_ATOM_METADATA.values():
+        slot_model = atom_type.content_slot_model
+        for signal in (post_save, post_delete):
+            signal.connect(
+                    site_wide_content_slot_changed, sender=slot_model,
+                    dispatch_uid='swim.content.site_wide_content_slot_changed'
+                )
+        atom_model = getattr(atom_type, 'atom_model', None)
+        if atom_model is not None:
+            post_save.connect(
+                    site_wide_content_atom_changed, sender=atom_model,
+                    dispatch_uid='swim.content.site_wide_content_atom_changed'
+                )
+
+#-------------------------------------------------------------------------------
+for model in (Page, Menu, MenuLink, Link, MenuSlot):
+    post_save.connect(bump_menu_tree_versions, sender=model)
+    post_delete.connect(bump_menu_tree_versions, sender=model)
@@ -1,15 +1,16 @@
 from django import template
-from django.template import Variable, Template, NodeList
+from django.template import Variable, NodeList
 from django.contrib.contenttypes.models import ContentType as DjangoContentType
 from django.conf import settings
 from django.template import TemplateDoesNotExist, VariableDoesNotExist
 from django.template.defaultfilters import stringfilter
 from django.db.models import Q
 
-from swim.design.models import ResourceTypeTemplateMapping
+from swim.design.models import ResourceTypeTemplateMapping, get_compiled_template
 from swim.core.models import Resource
 from swim.content.models import Arrangement, EnumSlot
-from swim.core import is_subpath_on_path
+from swim.core import is_subpath_on_path, timing
+from swim.core.content import prefetch_analyzed_atoms, batch_content_keys
 
 register = template.Library()
 
@@ -242,6 +243,7 @@ class RenderNode(template.Node, DebugNodeMixin):
             return self._error("No %s in context" % self.sco_name)
 
         if isinstance(sco, (tuple, list)):
+            self._prefetch(sco, resource, request)
             html = []
             for instance in sco:
                 html += self._render_single(instance, resource, request, context)
@@ -250,62 +252,87 @@ class RenderNode(template.Node, DebugNodeMixin):
             return self._render_single(sco, resource, request, context)
 
 
+    def _get_template(self, sco, resource, request):
+        """
+        Returns the ResourceTypeTemplateMapping to render sco with.
+
+        raises TemplateDoesNotExist if there isn't one.
+        """
+        types = getattr(request, 'types', {})
+        resource_type_templates = getattr(
+                request, 'resource_type_templates', {}
+            ).setdefault(
+                resource.resource_type.id, {}
+            )
+
+        rt_cot = None
+        template = None
+
+        # If this object is typed, we'll use that type information.
+        if hasattr(sco, 'type_field_name'):
+            type_id = getattr(sco, '%s_id' % sco.type_field_name, None)
+            type = types.get(type_id, None)
+            if not type:
+                type = getattr(sco, sco.type_field_name, None)
+
+            if type:
+                types[type.id] = type
+                rt_cot = type.swim_content_type()
+
+        sco_cot = sco.swim_content_type()
+
+        if rt_cot:
+            template = resource_type_templates.get(rt_cot, None)
+
+        if not template:
+            template = resource_type_templates.get(sco_cot, None)
+
+        if not template:
+            try:
+
+                # First try to get a template based on the resource_type
+                # swim swim_content_type
+                template = ResourceTypeTemplateMapping.get_template(
+                        request,
+                        resource_type=resource.resource_type,
+                        swim_content_type=rt_cot,
+                        http_content_type=request.http_content_type,
+                    )
+                resource_type_templates[rt_cot] = template
+
+            except TemplateDoesNotExist:
+                # If we couldn't find one that way, look for one
+                # based on the SCO's direct content_objec_type.
+                template = ResourceTypeTemplateMapping.get_template(
+                        request,
+                        resource_type=resource.resource_type,
+                        swim_content_type = sco_cot,
+                        http_content_type=request.http_content_type,
+                    )
+                resource_type_templates[sco_cot] = template
+        return template
+
+    def _prefetch(self, scos, resource, request):
+        # Load what each template uses for all of the objects it will render
+        # at once.  See: swim.design.analysis
+        by_template = {}
+        for sco in scos:
+            try:
+                template = self._get_template(sco, resource, request).template
+            except TemplateDoesNotExist:
+                continue
+            by_template.setdefault(template.id, (template, []))[1].append(sco)
+        for (template, scos) in by_template.values():
+            prefetch_analyzed_atoms(scos, template.analysis)
+            batch_content_keys(request, template.analysis)
+
     def _render_single(self, sco, resource, request, context):
         try:
-            types = getattr(request, 'types', {})
-            resource_type_templates = getattr(
-                    request, 'resource_type_templates', {}
-                ).setdefault(
-                    resource.resource_type.id, {}
-                )
-
-            rt_cot = None
-            template = None
-
-            # If this object is typed, we'll use that type information.
-            if hasattr(sco, 'type_field_name'):
-                type_id = getattr(sco, '%s_id' % sco.type_field_name, None)
-                type = types.get(type_id, None)
-                if not type:
-                    type = getattr(sco, sco.type_field_name, None)
-
-                if type:
-                    types[type.id] = type
-                    rt_cot = type.swim_content_type()
-
-            sco_cot = sco.swim_content_type()
-
-            if rt_cot:
-                template = resource_type_templates.get(rt_cot, None)
-
-            if not template:
-                template = resource_type_templates.get(sco_cot, None)
-
-            if not template:
-                try:
-
-                    # First try to get a template based on the resource_type
-                    # swim swim_content_type
-                    template = ResourceTypeTemplateMapping.get_template(
-                            request,
-                            resource_type=resource.resource_type,
-                            swim_content_type=rt_cot,
-                            http_content_type=request.http_content_type,
-                        )
-                    resource_type_templates[rt_cot] = template
-
-                except TemplateDoesNotExist:
-                    # If we couldn't find one that way, look for one
-                    # based on the SCO's direct content_objec_type.
-                    template = ResourceTypeTemplateMapping.get_template(
-                            request,
-                            resource_type=resource.resource_type,
-                            swim_content_type = sco_cot,
-                            http_content_type=request.http_content_type,
-                        )
-                    resource_type_templates[sco_cot] = template
-
-            template = Template(template.template.body)
+            template = self._get_template(sco, resource, request)
+            prefetch_analyzed_atoms([sco], template.template.analysis)
+            batch_content_keys(request, template.template.analysis)
+            path = template.template.path
+            template = get_compiled_template(template.template)
 
             # Check to make sure that we are allowed to render this piece of
             # content with this template.
@@ -347,7 +374,8 @@ class RenderNode(template.Node, DebugNodeMixin):
             # set the name 'target' to be our content object.
             context['target'] = sco
 
-            html = template.render(context)
+            with timing.stage(request, 'render_tag', path):
+                html = template.render(context)
 
             # restore whatever 'target' used to be
             context['target'] = target
@@ -440,6 +468,8 @@ class EntityListByEnumNode(template.Node, DebugNodeMixin):
         queryset = entity_type.objects.filter(pk__in=pks)
         if hasattr(entity_type, 'type_field_name'):
             queryset = queryset.select_related(entity_type.type_field_name)
+        if hasattr(queryset, 'prefetch_atoms'):
+            queryset = queryset.prefetch_atoms()
         context[self.context_key] = queryset
         return ''
 
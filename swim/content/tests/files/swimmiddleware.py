@@ -11,3 +11,14 @@ def return_404(request, context, resource, template):
 #-------------------------------------------------------------------------------
 def cause_500(request, context, resource, template):
     return FakeClassThatIsntImported
+
+#-------------------------------------------------------------------------------
+# What add_stamped_to_context puts in the context.
+stamped = {'value': 'Stamped'}
+
+def add_stamped_to_context(request, context, resource, template):
+    context['key'] = stamped['value']
+
+def add_stamped_to_context_stamps(request, resource, template):
+    return [(None, stamped['value'])]
+add_stamped_to_context.modification_stamps = add_stamped_to_context_stamps
@@ -16,6 +16,8 @@ from swim.content.models import (
         ArrangementSlot,
         PageSlot,
     )
+from swim.core.content import prefetch_atoms, hydrate_atoms, atom_snapshots
+from django.core.cache import caches
 from django.test import override_settings
 
 #-------------------------------------------------------------------------------
@@ -131,6 +133,166 @@ class ContentAccessorTests(NoContentTestCase, NoTemplateTestCase):
         self.assertEqual(200, response.status_code)
         self.assertCount(3, b'This is the test text', response.content)
 
+    #---------------------------------------------------------------------------
+    def test_prefetch_atoms(self):
+        for i in range(3):
+            page = Page.objects.create(
+                path = '/batch/%s' % i,
+                title = 'batch %s' % i,
+            )
+            CopySlot.objects.create(
+                order = 0,
+                key = 'green',
+                content_object = page,
+                body = 'Batch %s' % i,
+            )
+
+        def get_pages():
+            return Page.objects.filter(path__startswith='/batch').order_by('path')
+
+        # Warm up the content schema cache.
+        for page in prefetch_atoms(get_pages(), 'copy'):
+            page.copy
+
+        # One query for the pages and one for all of their copy.
+        with self.assertNumQueries(2):
+            pages = prefetch_atoms(get_pages(), 'copy')
+            self.assertEqual(
+                    ['Batch 0', 'Batch 1', 'Batch 2'],
+                    [page.copy['green'].body for page in pages]
+                )
+
+        with self.assertNumQueries(2):
+            pages = get_pages().prefetch_atoms('copy')
+            self.assertEqual(
+                    ['Batch 0', 'Batch 1', 'Batch 2'],
+                    [page.copy['green'].body for page in pages]
+                )
+
+        # Without names the atoms are loaded for the batch on first use.
+        with self.assertNumQueries(2):
+            pages = get_pages().prefetch_atoms()
+            self.assertEqual(
+                    ['Batch 0', 'Batch 1', 'Batch 2'],
+                    [page.copy['green'].body for page in pages]
+                )
+
+        # Long lists are split into batches, each loaded on its own.
+        with self.settings(SWIM_ATOM_BATCH_SIZE=2):
+            with self.assertNumQueries(3):
+                pages = prefetch_atoms(get_pages(), 'copy')
+            with self.assertNumQueries(1):
+                pages = list(get_pages().prefetch_atoms())
+            self.assertEqual([pages[0], pages[1]], pages[0]._atom_batch)
+            with self.assertNumQueries(1):
+                self.assertEqual('Batch 0', pages[0].copy['green'].body)
+                self.assertEqual('Batch 1', pages[1].copy['green'].body)
+            with self.assertNumQueries(1):
+                self.assertEqual('Batch 2', pages[2].copy['green'].body)
+
+    #---------------------------------------------------------------------------
+    def test_hydrate_atoms(self):
+        content_schema = self.test_page.resource_type.content_schema
+        for (order, key, model) in ((1, 'green', Copy), (2, 'grapes', Arrangement)):
+            ContentSchemaMember.objects.create(
+                    content_schema = content_schema,
+                    order = order,
+                    key = key,
+                    title = key,
+                    cardinality = 'single',
+                    swim_content_type = model.swim_content_type(),
+                )
+        CopySlot.objects.create(
+            order = 0,
+            key = 'green',
+            content_object = self.test_page,
+            body = 'Hydrated',
+        )
+        arrangement = Arrangement.objects.create(
+            arrangement_type=self.arrangement_type,
+        )
+        ArrangementSlot.objects.create(
+            order = 0,
+            key = 'grapes',
+            content_object = self.test_page,
+            arrangement = arrangement,
+        )
+
+        page = hydrate_atoms(
+                Page.objects.select_related('resource_type').get(pk=self.test_page.id)
+            )
+
+        # The copy and arrangements are loaded on first use, and nothing else.
+        with self.assertNumQueries(2):
+            self.assertEqual('Hydrated', page.copy['green'].body)
+        with self.assertNumQueries(0):
+            self.assertEqual(arrangement, page.arrangement['grapes'])
+
+    #---------------------------------------------------------------------------
+    @override_settings(SWIM_ATOM_CACHE='default')
+    def test_atom_snapshot_cache(self):
+        caches['default'].clear()
+        copyslot = CopySlot.objects.create(
+            order = 0,
+            key = 'green',
+            content_object = self.test_page,
+            body = 'Cached',
+        )
+        arrangement = Arrangement.objects.create(
+            arrangement_type=self.arrangement_type,
+        )
+        ArrangementSlot.objects.create(
+            order = 0,
+            key = 'grapes',
+            content_object = self.test_page,
+            arrangement = arrangement,
+        )
+
+        def get_page():
+            return Page.objects.select_related('resource_type').get(pk=self.test_page.id)
+
+        self.assertEqual('Cached', get_page().copy['green'].body)
+        self.assertEqual(arrangement, get_page().arrangement['grapes'])
+
+        # Subsequent loads come from the cache, including the referenced atoms.
+        page = get_page()
+        with self.assertNumQueries(0):
+            self.assertEqual('Cached', page.copy['green'].body)
+            self.assertEqual(arrangement.id, page.arrangement['grapes'].id)
+
+        # Saving a slot or a referenced atom invalidates the snapshot.
+        copyslot.body = 'Changed'
+        copyslot.save()
+        self.assertEqual('Changed', get_page().copy['green'].body)
+
+        arrangement.save()
+        page = get_page()
+        with self.assertNumQueries(1):
+            page.arrangement['grapes']
+
+        # Rows loaded before a change are stored under the version they were
+        # loaded with, rather than the new one.
+        django_content_type_id = self.test_page.get_django_content_type().id
+        (found, versions) = atom_snapshots.get_many(
+                'copy', django_content_type_id, [self.test_page.id])
+        copyslot.save()
+        atom_snapshots.set_many(
+                'copy', django_content_type_id, {self.test_page.id: []}, versions)
+        self.assertEqual('Changed', get_page().copy['green'].body)
+
+        # So does moving a slot to another object, for both of them.
+        other = Page.objects.create(path='/other', title='Other')
+        self.assertEqual('Changed', get_page().copy['green'].body)
+        self.assertRaises(KeyError, lambda: other.copy['green'])
+        copyslot = CopySlot.objects.get(pk=copyslot.pk)
+        copyslot.content_object = other
+        copyslot.save()
+        self.assertRaises(KeyError, lambda: get_page().copy['green'])
+        self.assertEqual(
+                'Changed',
+                Page.objects.get(pk=other.pk).copy['green'].body
+            )
+
     #---------------------------------------------------------------------------
     def test_copy_access(self):
         self.copy = Copy.objects.create(
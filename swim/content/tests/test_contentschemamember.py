@@ -515,4 +515,35 @@ class ContentSchemaCachingTests(TestCase):
             self.assertEqual(member['cardinality'], "single")
             self.assertEqual(member['order'], 0)
 
+    #---------------------------------------------------------------------------
+    def test_compiled_content_schemas(self):
+        content_schema = ContentSchema.objects.create(title="Test Schema")
+        title_member = ContentSchemaMember.objects.create(
+                content_schema=content_schema,
+                order=0,
+                key="title",
+                title="Title",
+                cardinality="list",
+                swim_content_type=Copy.swim_content_type(),
+            )
+        ResourceType.objects.create(
+                key="test_page",
+                title="Test Page",
+                content_schema=content_schema,
+            )
+
+        # Every instance of the type shares the same compiled schema.
+        compiled = ResourceType.objects.get(key="test_page").get_compiled_schema()
+        self.assertTrue(
+                compiled is ResourceType.objects.get(key="test_page").get_compiled_schema()
+            )
+        self.assertEqual(['title'], [member['key'] for member in compiled.members])
+        self.assertTrue(compiled.is_list('title'))
+        self.assertEqual(None, compiled.get('missing'))
+        with self.assertRaises(TypeError):
+            compiled.get('title')['title'] = 'Changed'
 
+        title_member.cardinality = "single"
+        title_member.save()
+        compiled = ResourceType.objects.get(key="test_page").get_compiled_schema()
+        self.assertFalse(compiled.is_list('title'))
@@ -1,23 +1,62 @@
+import time
+
 from swim.content.tests.base import NoContentTestCase
+from swim.core import bulk_writes, pagecache
+from swim.core.pagecache import page_cache, connect_page_cache_receivers
 from swim.core.models import (
+    Resource,
     ResourceType,
     ReservedPath,
+    RequestHandlerMapping,
     ContentSchema,
     ContentSchemaMember,
 )
 from swim.design.models import Template, ResourceTypeTemplateMapping
 from swim.content.models import (
     Page,
+    SiteWideContent,
     Link,
     Menu,
     MenuLink,
     MenuSlot,
 )
+from swim.core.content import prefetch_analyzed_atoms
+from swim.core.timing import timing_histograms
 from django.test import override_settings
+from django.utils.http import http_date
+
+#-------------------------------------------------------------------------------
+class TypedPageTestCase(NoContentTestCase):
+    """
+    A NoContentTestCase which creates pages with resource types of their own.
+    """
+
+    #---------------------------------------------------------------------------
+    def create_typed_page(self, key, body, **kwargs):
+        """
+        Creates a resource type with the key and kwargs, rendered by a
+        template at /<key> with the body, and a page of it at /<key>.
+
+        Returns (resource_type, template, page).
+        """
+        resource_type = ResourceType.objects.create(
+                key=key, title=key.title(), **kwargs)
+        template = Template.objects.create(
+            path='/%s' % key,
+            body=body,
+            swim_content_type=Resource.swim_content_type(),
+        )
+        ResourceTypeTemplateMapping.objects.create(
+            resource_type=resource_type,
+            template=template,
+        )
+        page = Page.objects.create(
+            path='/%s' % key, title=key.title(), resource_type=resource_type)
+        return (resource_type, template, page)
 
 #-------------------------------------------------------------------------------
 @override_settings(ROOT_URLCONF='swim.urls')
-class PageTest(NoContentTestCase):
+class PageTest(TypedPageTestCase):
 
     def test_empty_site_404(self):
         response = self.client.get('/')
@@ -229,6 +268,308 @@ class PageTest(NoContentTestCase):
         except Link.DoesNotExist:
             pass
 
+    def test_bulk_writes_defers_request_handlers(self):
+        moved = Page.objects.create(path='/moved', title='Moved')
+        with bulk_writes():
+            pages = [
+                Page.objects.create(path='/bulk/%d' % i, title='Bulk %d' % i)
+                for i in range(5)
+            ]
+            moved.path = '/Moved-Again'
+            moved.save()
+            deleted = Page.objects.create(path='/deleted', title='Deleted')
+            deleted.delete()
+
+            # Nothing is done until the block exits.
+            self.assertEqual(
+                    0, RequestHandlerMapping.objects.filter(
+                        path__startswith='/bulk').count()
+                )
+
+        for page in pages:
+            self.assertEqual(1, page.request_handler_mappings.count())
+            self.assertEqual(1, page.reserved_paths.count())
+            self.assertEqual(page.path, page.request_handler_mappings.get().path)
+            self.assertEqual(page.path, page.reserved_paths.get().path)
+
+        self.assertEqual(
+                ['/moved-again'],
+                [m.path for m in moved.request_handler_mappings.all()]
+            )
+        self.assertEqual(
+                ['/moved-again'], [r.path for r in moved.reserved_paths.all()])
+        self.assertFalse(
+                RequestHandlerMapping.objects.filter(path='/deleted').exists())
+        self.assertFalse(ReservedPath.objects.filter(path='/deleted').exists())
+
+        response = self.client.get('/bulk/3')
+        self.assertEqual(200, response.status_code)
+
+    def test_conditional_get(self):
+        (resource_type, template, page) = self.create_typed_page(
+                'conditional',
+                """{{ resource.title }}""",
+            )
+
+        # The middleware of the default resource type describes what it adds,
+        # so the page has an ETag.
+        response = self.client.get('/conditional')
+        self.assertEqual(200, response.status_code)
+        etag = response['ETag']
+
+        # The stamps can change without their dates moving, so there's no
+        # Last-Modified to answer If-Modified-Since with.
+        self.assertFalse(response.has_header('Last-Modified'))
+        response = self.client.get(
+                '/conditional', HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(200, response.status_code)
+
+        response = self.client.get('/conditional', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(etag, response['ETag'])
+        self.assertEqual(b'', response.content)
+
+        # Anything the page uses changing gives it a new ETag.
+        SiteWideContent.objects.create(key='footer')
+        response = self.client.get('/conditional', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+
+        etag = response['ETag']
+        page.title = 'Changed'
+        page.save()
+        response = self.client.get('/conditional', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(b'Changed', response.content)
+
+        # So do the links of a menu, and the templates which it extends.
+        etag = response['ETag']
+        MenuLink.objects.create(
+                menu=Menu.objects.create(title='Navigation'),
+                order=0,
+                link=Link.objects.create(url='/a', title='A'),
+            )
+        response = self.client.get('/conditional', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+
+        etag = response['ETag']
+        Template.objects.create(
+            path='/conditional-base',
+            body="""{% block title %}{% endblock %}""",
+            swim_content_type=Resource.swim_content_type(),
+        )
+        response = self.client.get('/conditional', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+
+        # The stamps can't describe what's in the session.
+        template.body = """{{ resource.title }}{{ request.session.visited }}"""
+        template.save()
+        response = self.client.get('/conditional', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(b'Changed', response.content)
+        self.assertFalse(response.has_header('ETag'))
+
+    @override_settings(SWIM_STREAM_CHUNK_SIZE=1)
+    def test_streamed_pages(self):
+        (resource_type, template, page) = self.create_typed_page(
+                'streamed',
+                """<h1>{{ resource.title }}</h1>{% for i in "abc" %}{{ i }}{% endfor %}""",
+                stream_response=True,
+            )
+
+        response = self.client.get('/streamed')
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.streaming)
+        chunks = list(response.streaming_content)
+        self.assertEqual(b'<h1>Streamed</h1>abc', b''.join(chunks))
+        self.assertEqual(4, len(chunks))
+
+        # Templates can ask for it as well, and jinja streams them itself.
+        resource_type.stream_response = False
+        resource_type.save()
+        template.path = '/streamed.jinja.html'
+        template.body = """<h1>{{ resource.title }}</h1>{% for i in "abc" %}{{ i }}{% endfor %}"""
+        template.stream_response = True
+        template.save()
+        response = self.client.get('/streamed')
+        self.assertTrue(response.streaming)
+        self.assertEqual(b'<h1>Streamed</h1>abc', b''.join(response.streaming_content))
+
+    def test_page_timings(self):
+        (resource_type, template, page) = self.create_typed_page(
+                'timed',
+                """<h1>{{ resource.title }}</h1>""",
+            )
+
+        # Only staff are sent the timings.
+        response = self.client.get('/timed')
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.create_and_login_superuser('timer', 'timer')
+        response = self.client.get('/timed')
+        server_timing = response['Server-Timing']
+        for stage in (
+                'match_resource', 'match_template', 'get_context',
+                'run_middleware', 'render', 'run_response_processors', 'total',
+            ):
+            self.assertIn('%s;dur=' % stage, server_timing)
+        self.assertIn('desc="/timed, 0 queries"', server_timing)
+
+        # Both pages are kept in the histograms the admin lists.
+        [(name, histogram)] = timing_histograms.slowest('resource_type')
+        self.assertEqual(('timed', 2), (name, histogram.count))
+        self.assertIn(('/timed', 2), [
+                (name, histogram.count)
+                for (name, histogram) in timing_histograms.slowest('template')
+            ])
+        response = self.client.get('/admin/core/resourcetype/timings/')
+        self.assertEqual(200, response.status_code)
+        self.assertIn(b'<td>timed</td>', response.content)
+
+        with self.settings(SWIM_TIMING=False):
+            response = self.client.get('/timed')
+            self.assertFalse(response.has_header('Server-Timing'))
+
+#-------------------------------------------------------------------------------
+@override_settings(ROOT_URLCONF='swim.urls', SWIM_PAGE_CACHE='default')
+class PageCacheTests(TypedPageTestCase):
+
+    def setUp(self):
+        super(PageCacheTests, self).setUp()
+        connect_page_cache_receivers()
+
+    def test_cached_pages_are_evicted_when_their_content_changes(self):
+        (resource_type, template, page) = self.create_typed_page(
+                'cached',
+                """{{ resource.title }} {{ content.sitewidecontent.footer }}""",
+                page_cache_timeout=60,
+            )
+        Page.objects.create(
+            path='/other', title='Other', resource_type=resource_type)
+        footer = SiteWideContent.objects.create(key='footer')
+
+        self.assertEqual(b'Cached footer', self.client.get('/cached').content)
+        self.assertEqual(b'Other footer', self.client.get('/other').content)
+        with self.assertNumQueries(1):
+            self.assertEqual(b'Cached footer', self.client.get('/cached').content)
+
+        # Only the page which changed is rendered again.
+        page.title = 'Changed'
+        page.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(b'Other footer', self.client.get('/other').content)
+        self.assertEqual(b'Changed footer', self.client.get('/cached').content)
+
+        # Both of them used the footer.
+        footer.delete()
+        self.assertEqual(b'Changed ', self.client.get('/cached').content)
+        self.assertEqual(b'Other ', self.client.get('/other').content)
+
+    def test_cached_pages_are_evicted_when_their_menu_links_change(self):
+        (resource_type, template, page) = self.create_typed_page(
+                'menus',
+                """{% for link in resource.menu.nav.links %}{{ link.title }}{% endfor %}""",
+                page_cache_timeout=60,
+            )
+        menu = Menu.objects.create(title='Navigation')
+        MenuSlot.objects.create(key='nav', order=1, menu=menu, content_object=page)
+        MenuLink.objects.create(
+                menu=menu, order=0, link=Link.objects.create(url='/a', title='A'))
+
+        self.assertEqual(b'A', self.client.get('/menus').content)
+        with self.assertNumQueries(1):
+            self.assertEqual(b'A', self.client.get('/menus').content)
+
+        # The links are listed through the menu, which the page loaded.
+        MenuLink.objects.create(
+                menu=menu, order=1, link=Link.objects.create(url='/b', title='B'))
+        self.assertEqual(b'AB', self.client.get('/menus').content)
+
+    def test_cached_pages_are_kept_when_links_of_their_menus_change(self):
+        (resource_type, template, page) = self.create_typed_page(
+                'titles',
+                """{{ resource.menu.nav.title }}""",
+                page_cache_timeout=60,
+            )
+        menu = Menu.objects.create(title='Navigation')
+        MenuSlot.objects.create(key='nav', order=1, menu=menu, content_object=page)
+
+        self.assertEqual(b'Navigation', self.client.get('/titles').content)
+
+        # The page only used the menu, not the links listed through it.
+        MenuLink.objects.create(
+                menu=menu, order=0, link=Link.objects.create(url='/a', title='A'))
+        with self.assertNumQueries(1):
+            self.assertEqual(b'Navigation', self.client.get('/titles').content)
+
+    def test_pages_changed_while_rendering_are_not_served_stale(self):
+        (resource_type, template, page) = self.create_typed_page(
+                'racing',
+                """{{ resource.title }}""",
+                page_cache_timeout=60,
+            )
+
+        # The page is changed after it was rendered, but before it's stored.
+        set_page = page_cache.set
+        def set_after_a_change(*args):
+            Page.objects.get(pk=page.pk).save()
+            Page.objects.filter(pk=page.pk).update(title='Changed')
+            set_page(*args)
+        page_cache.set = set_after_a_change
+        try:
+            self.assertEqual(b'Racing', self.client.get('/racing').content)
+        finally:
+            page_cache.set = set_page
+        self.assertEqual(b'Changed', self.client.get('/racing').content)
+
+    def test_cached_pages_share_their_chunks(self):
+        navigation = ''.join(
+                '<li><a href="/section/%d">Section %d</a></li>\n' % (i, i)
+                for i in range(100)
+            )
+        (resource_type, template, page) = self.create_typed_page(
+                'shared',
+                navigation + """<h1>{{ resource.title }}</h1>""",
+                page_cache_timeout=60,
+            )
+        manifests = []
+        for path in ('/one', '/two'):
+            page = Page.objects.create(path=path, title=path, resource_type=resource_type)
+            response = self.client.get(path)
+            key = pagecache.cache_key(response.wsgi_request, template.http_content_type, [])
+            (tag_versions, shell, manifest) = page_cache.get_cache().get(key)
+            self.assertEqual(b'', shell.content)
+            manifests.append(manifest)
+
+            with self.assertNumQueries(1):
+                self.assertEqual(response.content, self.client.get(path).content)
+
+        # Only the chunk with the title differs.
+        self.assertEqual(manifests[0][:-1], manifests[1][:-1])
+        self.assertNotEqual(manifests[0][-1], manifests[1][-1])
+
+        # The chunks nothing uses any more are deleted along with the page.
+        page.title = 'Changed'
+        page.save()
+        self.assertEqual(b'Changed', self.client.get('/two').content[-12:-5])
+        chunks = page_cache.get_chunks()
+        self.assertEqual(None, chunks.get(manifests[1][-1:]))
+        self.assertNotEqual(None, chunks.get(manifests[1][:-1]))
+
+    def test_uncacheable_pages_are_rendered_every_time(self):
+        (resource_type, template, page) = self.create_typed_page(
+                'uncached',
+                """{{ resource.title }}""",
+            )
+
+        self.assertEqual(b'Uncached', self.client.get('/uncached').content)
+        self.assertEqual(
+                None,
+                page_cache.get(pagecache.cache_key(
+                    self.client.get('/uncached').wsgi_request,
+                    template.http_content_type, [])
+                )
+            )
+
 #-------------------------------------------------------------------------------
 @override_settings(ROOT_URLCONF='swim.urls')
 class MenuTreeTests(NoContentTestCase):
@@ -255,6 +596,50 @@ class MenuTreeTests(NoContentTestCase):
             title = 'Home(test)',
         )
 
+    #---------------------------------------------------------------------------
+    def test_analyzed_templates_prefetch_menu_links(self):
+        template = Template.objects.create(
+            path='/simple',
+            body="""{% for link in resource.menu.sub_nav.links %}{{ link.title }} {% endfor %}""",
+            swim_content_type=Resource.swim_content_type(),
+        )
+        self.assertEqual(
+                {
+                    'atoms': ['menu'],
+                    'relations': [['menu', 'sub_nav', 'links']],
+                    'content': [],
+                },
+                template.analysis
+            )
+        ResourceTypeTemplateMapping.objects.create(
+            resource_type=self.simple_page_resource_type,
+            template=template,
+        )
+        about_page = Page.objects.create(
+            resource_type=self.simple_page_resource_type,
+            path='/about',
+            title='About'
+        )
+        menu = Menu.objects.create(title="About Page Menu")
+        for count in range(3):
+            link = Link.objects.create(url='/about/%s' % count, title='Link %s' % count)
+            MenuLink.objects.create(menu=menu, order=count, link=link)
+        MenuSlot.objects.create(
+                key='sub_nav',
+                order=1,
+                menu=menu,
+                content_object=about_page,
+            )
+
+        response = self.client.get('/about')
+        self.assertEqual(b'Link 0 Link 1 Link 2 ', response.content)
+
+        # The links were loaded along with the menu, before rendering.
+        page = Page.objects.get(path='/about')
+        prefetch_analyzed_atoms([page], template.analysis)
+        with self.assertNumQueries(0):
+            self.assertEqual(3, len(page.menu['sub_nav'].links))
+
     #---------------------------------------------------------------------------
     def test_menu_tree_generation(self):
         home_page = Page.objects.create(
@@ -412,3 +797,23 @@ class MenuTreeTests(NoContentTestCase):
             self.assertEqual(len(final_child.children), 0)
             self.assertFalse(final_child.active)
 
+
+        # The ancestors, their menus and the menu links are loaded with a
+        # query each, however deep the page is.
+        page = Page.objects.get(path='/about/history/first-years/2008')
+        with self.assertNumQueries(3):
+            menu_tree = page.menu_tree['sub_nav']
+        self.assertEqual(
+                ["/about/history", "/about/other"],
+                [child.url for child in menu_tree.children]
+            )
+
+        # And the tree is then kept until a page or menu changes.
+        page = Page.objects.get(path='/about/history/first-years/2008')
+        with self.assertNumQueries(0):
+            self.assertEqual("/about", page.menu_tree['sub_nav'].url)
+
+        about_other_page.ownlink.title = 'More About'
+        about_other_page.ownlink.save()
+        menu_tree = page.menu_tree['sub_nav']
+        self.assertEqual("More About", menu_tree.children[1].title)
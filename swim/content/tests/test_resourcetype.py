@@ -17,6 +17,7 @@ from swim.content.models import (
         Page,
     )
 from swim.core.management import register_swim_middleware
+from swim.content.tests.files import swimmiddleware
 
 
 
@@ -84,6 +85,32 @@ class ResourceTypeMiddlewareTest(TestCase):
             context = context[0]
         self.assertEqual(context['key'], "What the hell.")
 
+        # The middleware doesn't describe what it adds, so the page has no
+        # ETag.
+        self.assertFalse(response.has_header('ETag'))
+
+    #---------------------------------------------------------------------------
+    def testStampedMiddleware(self):
+        self.function = ResourceTypeMiddleware.objects.get(
+            function = 'swim.content.tests.files.swimmiddleware.add_stamped_to_context'
+        )
+        self.code = ResourceTypeMiddlewareMapping.objects.create(
+            function = self.function
+        )
+        response = self.client.get('/middleware')
+        etag = response['ETag']
+        response = self.client.get('/middleware', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+
+        # The stamps the middleware gives are part of the ETag.
+        swimmiddleware.stamped['value'] = 'Changed'
+        try:
+            response = self.client.get('/middleware', HTTP_IF_NONE_MATCH=etag)
+        finally:
+            swimmiddleware.stamped['value'] = 'Stamped'
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+
     #---------------------------------------------------------------------------
     def testRaise404(self):
         self.function = ResourceTypeMiddleware.objects.get(
@@ -232,3 +259,51 @@ class ResourceTypeMiddlewareTest(TestCase):
         self.assertEqual(response.content, b"parent")
 
 
+
+    #---------------------------------------------------------------------------
+    def testMiddlewareChainsAreCached(self):
+        self.content_schema = ContentSchema.objects.create(title='Parent')
+        parent_type = ResourceType.objects.create(
+                key = 'parent',
+                parent = None,
+                title = 'Parent',
+                content_schema = self.content_schema,
+            )
+        child_type = ResourceType.objects.create(
+                key = 'child',
+                parent = parent_type,
+                title = 'Child',
+                content_schema = self.content_schema,
+            )
+        add_to_context = ResourceTypeMiddleware.objects.get(
+            function = 'swim.content.tests.files.swimmiddleware.add_to_context'
+        )
+        return_404 = ResourceTypeMiddleware.objects.get(
+            function = 'swim.content.tests.files.swimmiddleware.return_404'
+        )
+        ResourceTypeMiddlewareMapping.objects.create(
+            resource_type = parent_type,
+            function = return_404,
+        )
+        ResourceTypeMiddlewareMapping.objects.create(
+            resource_type = child_type,
+            function = add_to_context,
+        )
+
+        # The child's own middleware runs first, then its parent's.
+        self.assertEqual(
+                [add_to_context.id, return_404.id],
+                [mapping.function_id for mapping in child_type.get_middleware()]
+            )
+        with self.assertNumQueries(0):
+            for mapping in child_type.get_middleware():
+                mapping.function.title
+            self.assertEqual([], child_type.get_response_processors())
+
+        # Changes to the hierarchy are picked up.
+        child_type.parent = None
+        child_type.save()
+        self.assertEqual(
+                [add_to_context.id],
+                [mapping.function_id for mapping in child_type.get_middleware()]
+            )
@@ -77,3 +77,47 @@ class SiteWideContentTests(NoTemplateTestCase):
         response = self.client.get('/eagles')
         self.assertIn(self.other_copy.body, response.content)
 
+
+    def test_site_wide_content_is_cached(self):
+        from swim.context import LazyLoadSite
+
+        site_wide_content = SiteWideContent.objects.create(key="footer")
+        copyright = CopySlot.objects.create(
+                body = 'Copyright 2009',
+                order = 0,
+                key = 'copyright',
+                content_object = site_wide_content
+            )
+        Page.objects.create(path='/eagles', title='eagles')
+        template = Template.objects.create(
+            path = '/eagles',
+            body = '{{ site.footer.copy.copyright.body }}',
+            http_content_type = 'text/html; charset=utf-8'
+        )
+        ResourceTypeTemplateMapping.objects.create(template=template)
+
+        response = self.client.get('/eagles')
+        self.assertIn(b'Copyright 2009', response.content)
+
+        # Once loaded, neither the content nor its copy are queried again.
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                    LazyLoadSite().footer.copy['copyright'].body,
+                    'Copyright 2009'
+                )
+
+        # Changing the copy, or adding more content, is seen straight away.
+        copyright.body = 'Copyright 2010'
+        copyright.save()
+        response = self.client.get('/eagles')
+        self.assertIn(b'Copyright 2010', response.content)
+
+        SiteWideContent.objects.create(key="header")
+        self.assertTrue(hasattr(LazyLoadSite(), 'header'))
+
+        # As is changing the site.
+        site = Site.objects.get_current()
+        site.name = 'Eagles'
+        site.save()
+        self.assertEqual('Eagles', LazyLoadSite().name)
+        self.assertTrue(hasattr(LazyLoadSite(), 'footer'))
@@ -1,8 +1,11 @@
-from django.template import loader, TemplateDoesNotExist
+from django.template import loader, TemplateDoesNotExist, Context, Template as DjangoTemplate
+from django.test import RequestFactory
 from django.contrib.sites.models import Site
 from django.test import override_settings
 from django.utils.encoding import smart_bytes
 
+from swim.context import processor
+from swim.core.content import batch_content_keys, content_keys
 from swim.content.tests.base import NoContentTestCase, NoTemplateTestCase
 from swim.core.models import (
     ResourceType,
@@ -268,3 +271,41 @@ class ContextProcessorTests(NoContentTestCase, NoTemplateTestCase):
 
         self.assertEqual(response.content, b"[eagle page][test page]")
 
+    #---------------------------------------------------------------------------
+    def test_page_access_is_batched(self):
+        Page.objects.create(path='/rss/eagle', title='eagle page')
+        Page.objects.create(path='/rss/hawk', title='hawk page')
+        self.template.body = (
+            '[{{ content.page.rss_eagle.title }}][{{ content.page.rss_hawk.title }}]'
+            '[{{ content.page.rss_eagle.title }}][{{ content.page.rss_owl.title }}]'
+        )
+        self.template.save()
+        self.assertEqual(
+                [['page', 'rss_eagle'], ['page', 'rss_hawk'], ['page', 'rss_owl']],
+                self.template.analysis['content']
+            )
+
+        def render():
+            request = RequestFactory().get('/')
+            batch_content_keys(request, self.template.analysis)
+            return DjangoTemplate(self.template.body).render(
+                    Context(processor(request)))
+
+        # Every key, found or not, with one query.
+        with self.assertNumQueries(1):
+            self.assertEqual('[eagle page][hawk page][eagle page][]', render())
+
+        with self.settings(SWIM_CONTENT_KEY_CACHE='default'):
+            render()
+            with self.assertNumQueries(0):
+                self.assertEqual('[eagle page][hawk page][eagle page][]', render())
+
+            Page.objects.create(path='/rss/owl', title='owl page')
+            self.assertEqual('[eagle page][hawk page][eagle page][owl page]', render())
+
+            # What was loaded before a change is stored under the version it
+            # was loaded with, rather than the new one.
+            (found, version) = content_keys.get_many(Page, ['rss_kite'])
+            Page.objects.create(path='/rss/kite', title='kite page')
+            content_keys.set_many(Page, {'rss_kite': None}, version)
+            self.assertEqual({}, content_keys.get_many(Page, ['rss_kite'])[0])
@@ -1,3 +1,5 @@
+import contextlib
+import hashlib
 import os
 import string
 from datetime import datetime
@@ -11,19 +13,35 @@ from django.http import (
     HttpResponseRedirect,
     HttpResponseNotFound,
     HttpResponseServerError,
-    Http404
+    Http404,
+    StreamingHttpResponse,
 )
 from django.template import loader, TemplateDoesNotExist
+from django.template.context import make_context
 from django.template.defaultfilters import slugify
 from django.shortcuts import get_object_or_404, render
 from django.contrib.sites.models import Site
-from django.core.exceptions import ObjectDoesNotExist
-
-from swim.core import string_to_key
-from swim.core.content import DJANGO_MODEL_SWIM_CONTENT_TYPE_LOOKUPS
+from django.utils.cache import get_conditional_response
+
+import swim
+from swim.core import string_to_key, pagecache, timing
+from swim.core.functions import function_registry
+from swim.core.pagecache import page_cache
+from swim.core.content import (
+    DJANGO_MODEL_SWIM_CONTENT_TYPE_LOOKUPS,
+    hydrate_atoms,
+    prefetch_analyzed_atoms,
+    batch_content_keys,
+    get_atom_stamps,
+    get_queryset_stamp,
+)
 from swim.core.models import ResourceType
 from swim.core.http import AcceptElement, header_elements
-from swim.design.models import ResourceTypeTemplateMapping
+from swim.design.models import (
+    ResourceTypeTemplateMapping,
+    Template,
+    template_versions,
+)
 from swim.core.views import CoreView
 from swim.core.models import Resource
 from swim.content.templatetags import swim_tags
@@ -31,6 +49,7 @@ from swim.content.templatetags import swim_tags
 from swim.content.models import (
     Page,
     SiteWideContent,
+    menu_tree_versions,
 )
 
 #-------------------------------------------------------------------------------
@@ -44,27 +63,94 @@ class ContentKeyMapper(dict):
     """
     This is a dictionary extention that will allow the template the ability to do lookups of the
     form content.type.key which is mapped to type.objects.get(key=key)
+
+    Each object is only looked up once per request, and any other keys the
+    request's templates are known to use for the same type are looked up
+    along with it.  See: swim.core.content.batch_content_keys
     """
     def __init__(self, contentclass, request):
         self._contentclass = contentclass
         self._request = request
         self._class_lookup = {}
         for content_object in DJANGO_MODEL_SWIM_CONTENT_TYPE_LOOKUPS.values():
-            self._class_lookup[content_object.get_context_name()] = content_object.lookup_key
+            self._class_lookup[content_object.get_context_name()] = content_object.lookup_keys
+        self._memo = {}
 
     def set_context(self, context):
         self._context = context
 
+    def _get_memo(self):
+        # Shared by the mappers of every context made for the request.
+        memos = getattr(self._request, '_swim_content_keys', None)
+        if memos is None:
+            if self._request is None:
+                return self._memo
+            memos = self._request._swim_content_keys = {}
+        return memos.setdefault(self._contentclass, {})
+
     def __getitem__(self, key):
-        try:
-            # Get the piece of content
-            return self._class_lookup.get(self._contentclass, None)(key, self._request)
-        except ObjectDoesNotExist as e:
-            return ''
+        memo = self._get_memo()
+        if key not in memo:
+            keys = set([key])
+            batch = getattr(self._request, '_swim_content_key_batch', {})
+            keys.update(batch.pop(self._contentclass, ()))
+            keys.difference_update(memo)
+
+            # Get the pieces of content
+            found = self._class_lookup.get(self._contentclass, None)(keys, self._request)
+            for each in keys:
+                memo[each] = found.get(each, '')
+        return memo[key]
 
     def get(self, key, x):
         self[key] or x
 
+#-------------------------------------------------------------------------------
+def render_chunks(template, context, request):
+    """
+    Yields the rendering of a template (as returned by loader.get_template)
+    a piece at a time.
+
+    Jinja templates are streamed by jinja.  Django templates are rendered one
+    top level node at a time, so one which extends another comes out whole.
+    """
+    stream = getattr(template, 'stream', None)
+    if stream is not None:
+        yield from stream(context, request)
+        return
+
+    django_template = template.template
+    context = make_context(
+            context, request, autoescape=template.backend.engine.autoescape
+        )
+    with context.render_context.push_state(django_template):
+        with context.bind_template(django_template):
+            context.template_name = django_template.name
+            for node in django_template.nodelist:
+                yield node.render_annotated(context)
+
+#-------------------------------------------------------------------------------
+@contextlib.contextmanager
+def tracking_session_use(request):
+    """
+    Sets request._swim_session_used to whether the block read or wrote the
+    session, which the looking up of the user beforehand doesn't count as.
+    """
+    session = getattr(request, 'session', None)
+    if session is None:
+        request._swim_session_used = False
+        yield
+        return
+
+    accessed = session.accessed
+    session.accessed = False
+    try:
+        yield
+    finally:
+        request._swim_session_used = session.accessed
+        # The session middleware still needs to know to vary on the cookie.
+        session.accessed = session.accessed or accessed
+
 #-------------------------------------------------------------------------------
 class PageView(CoreView):
     #---------------------------------------------------------------------------
@@ -95,19 +181,41 @@ class PageView(CoreView):
         6) Any registered response processors are run and given access to the
            request, context, resource template and response.
         7) Finally the response is returned.
+
+        When the resource type or the template asks for its pages to be
+        streamed (see stream_response), step 5 only starts the rendering and
+        the template is rendered as the response is sent.  The response
+        processors still run before anything is sent, so they can set headers
+        and cookies, but response.streaming is True and there is no content
+        for them to read.
+
+        Each step is timed, see swim.core.timing.
         """
+        with timing.recording(request):
+            response = self.respond(request)
+            timing.finish(request, response)
+        return response
+
+    #---------------------------------------------------------------------------
+    def respond(self, request):
         self.request = request
         path = "/%s" % request.path.split('#')[0].strip('/')
         path = path.lower()
 
         # Match the incoming path to a Page object
-        resource = self.match_resource(path, request)
-
-        try:
-            template = self.match_template(
+        with timing.stage(request, 'match_resource'):
+            resource = self.match_resource(path, request)
+        timing.describe(
                 request,
-                resource,
+                resource_type=getattr(getattr(resource, 'resource_type', None), 'key', None)
             )
+
+        try:
+            with timing.stage(request, 'match_template'):
+                template = self.match_template(
+                    request,
+                    resource,
+                )
         except HTTPError406 as e:
             # According to [1] HTTP/1.1 servers are allowed to return responses
             # that don't match the accept header.  We should consider choosing the first
@@ -117,6 +225,33 @@ class PageView(CoreView):
             # [1] -http://www.w3.org/Protocols/rfc2616/rfc2616-sec10.html
             response = HttpResponse(str(e), status = 406)
             return response
+        timing.describe(request, template=template.path)
+
+        page_cache_key = self.get_page_cache_key(request, resource, template)
+        if page_cache_key:
+            response = page_cache.get(page_cache_key)
+            if response is not None:
+                # The cached page carries the ETag it was stored with.
+                return get_conditional_response(
+                        request, etag=response.get('ETag'), response=response)
+            pagecache.start_recording(request)
+            pagecache.record_dependencies(
+                    pagecache.object_tag(type(resource), resource.pk),
+                    pagecache.model_tag(Template),
+                    pagecache.model_tag(ResourceTypeTemplateMapping),
+                )
+
+        etag = self.get_etag(request, resource, template)
+        if etag:
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                response['ETag'] = etag
+                return response
+
+        if getattr(settings, 'SWIM_HYDRATE_RESOURCE_ATOMS', True):
+            hydrate_atoms(resource)
+        prefetch_analyzed_atoms([resource], getattr(template, 'analysis', None))
+        batch_content_keys(request, getattr(template, 'analysis', None))
 
         # used by the context processor as part of the Context
         request.resource = resource
@@ -124,34 +259,218 @@ class PageView(CoreView):
 
         # used by the SCOR's to avoid recursion problems
         request.recursion_guard_dict = {}
-        context = self.get_context(request)
-        context['resource'] = resource
+        with tracking_session_use(request):
+            with timing.stage(request, 'get_context'):
+                context = self.get_context(request)
+            context['resource'] = resource
+
+            if getattr(settings, 'SWIM_RUN_MIDDLEWARE', True):
+                with timing.stage(request, 'run_middleware'):
+                    self.run_middleware(resource.resource_type, request, context, resource, template)
+
+            with timing.stage(request, 'render', template.path):
+                if self.stream_response(request, resource, template):
+                    response = self.get_streaming_response(request, context, template)
+                else:
+                    response = self.get_response(request, context, template)
+
+            if getattr(settings, 'SWIM_RUN_RESPONSE_PROCESSOR', True):
+                with timing.stage(request, 'run_response_processors'):
+                    self.run_response_processors(
+                            resource.resource_type, request, context, resource, template, response)
+
+        # A page which read the session, such as a form showing its errors,
+        # differs in ways the ETag doesn't cover, and a streamed one may read
+        # it after we have returned.
+        if (etag and response.status_code == 200 and not response.streaming
+                and not request._swim_session_used):
+            response['ETag'] = etag
+        if page_cache_key:
+            self.store_page(request, resource, page_cache_key, response)
+        return response
 
-        if getattr(settings, 'SWIM_RUN_MIDDLEWARE', True):
-            self.run_middleware(resource.resource_type, request, context, resource, template)
+    #---------------------------------------------------------------------------
+    def get_modification_stamps(self, request, resource, template):
+        """
+        Returns (last modified, token) pairs for everything the page uses.
 
-        response = self.get_response(request, context, template)
+        Views which list other objects should add a stamp for them, see
+        swim.core.content.get_queryset_stamp, as should resource type
+        middleware, see get_middleware_stamps.
+        """
+        stamps = [
+            (resource.modifieddate, resource.pk),
+            (template.modifieddate, template.pk),
+            # Covers the templates it extends and includes as well.
+            (None, template_versions.get()),
+            # Covers the links of its menus, which are listed through them.
+            (None, menu_tree_versions.get()),
+            get_queryset_stamp(SiteWideContent.objects.all()),
+        ]
+        stamps.extend(get_atom_stamps(resource))
+        return stamps
 
-        if getattr(settings, 'SWIM_RUN_RESPONSE_PROCESSOR', True):
-            self.run_response_processors(
-                    resource.resource_type, request, context, resource, template, response)
+    #---------------------------------------------------------------------------
+    def get_middleware_stamps(self, request, resource, template):
+        """
+        Returns the stamps for what the resource type middleware adds to the
+        page, or None when one of them can't describe it.
 
-        return response
+        A middleware function describes what it adds with a
+        modification_stamps attribute: a callable taking the request,
+        resource and template, which returns a list of stamps.
+        """
+        resource_type = getattr(resource, 'resource_type', None)
+        if resource_type is None or not getattr(settings, 'SWIM_RUN_MIDDLEWARE', True):
+            return []
+
+        stamps = []
+        for middleware in resource_type.get_middleware():
+            function = function_registry.resolve(middleware.function.function)
+            get_stamps = getattr(function, 'modification_stamps', None)
+            if get_stamps is None:
+                return None
+            stamps.extend(get_stamps(request, resource, template))
+        return stamps
+
+    #---------------------------------------------------------------------------
+    def get_etag(self, request, resource, template):
+        """
+        Returns the ETag of the page, or None when conditional requests for it
+        aren't answered.
+
+        There is no Last-Modified, as most of the stamps can change without
+        their date moving forward: a row being deleted, or a template being
+        swapped for an older one.
+        """
+        if not getattr(settings, 'SWIM_CONDITIONAL_GET', True):
+            return None
+        if request.method not in ('GET', 'HEAD'):
+            return None
+
+        middleware_stamps = self.get_middleware_stamps(request, resource, template)
+        if middleware_stamps is None:
+            return None
+        stamps = self.get_modification_stamps(request, resource, template)
+        stamps.extend(middleware_stamps)
+
+        # The page differs for each user, and for whatever else its resource
+        # type says it varies on.
+        resource_type = getattr(resource, 'resource_type', None)
+        vary = resource_type.get_page_cache_vary() if resource_type else []
+        user = getattr(request, 'user', None)
+        user_id = user.pk if user is not None and user.is_authenticated else ''
+        identity = "%s %s %r" % (
+                pagecache.cache_key(request, template.http_content_type, vary),
+                user_id,
+                stamps,
+            )
+        return '"%s"' % hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+    #---------------------------------------------------------------------------
+    def get_page_cache_key(self, request, resource, template):
+        """
+        Returns the key to cache the response under, or None if it shouldn't be.
+        """
+        resource_type = getattr(resource, 'resource_type', None)
+        if not page_cache.enabled() or not getattr(resource_type, 'page_cache_timeout', None):
+            return None
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return None
+        return pagecache.cache_key(
+                request,
+                template.http_content_type,
+                resource_type.get_page_cache_vary(),
+            )
+
+    #---------------------------------------------------------------------------
+    def store_page(self, request, resource, key, response):
+        dependencies = request._swim_page_dependencies
+        request._swim_page_dependencies = None
+        if getattr(request, '_swim_page_uncacheable', False):
+            return
+        if getattr(request, '_swim_session_used', False):
+            return
+        # Cookies set by resource type middleware and response processors are
+        # cached along with the page, so any that differ between visitors
+        # must mark the response uncacheable.
+        if response.status_code != 200 or response.streaming:
+            return
+        # The csrf token in the page would be shared between visitors.
+        if request.META.get('CSRF_COOKIE_USED'):
+            return
+        page_cache.set(
+                key, response, dependencies,
+                resource.resource_type.page_cache_timeout
+            )
 
     #---------------------------------------------------------------------------
     def get_response(self, request, context, swim_template):
         # Render the template and create the response.
         return render(request, swim_template.path, context, content_type=str(swim_template.http_content_type))
 
+    #---------------------------------------------------------------------------
+    def stream_response(self, request, resource, template):
+        """
+        Returns True when the page should be sent while it's being rendered.
+        """
+        resource_type = getattr(resource, 'resource_type', None)
+        return bool(
+                getattr(resource_type, 'stream_response', False) or
+                getattr(template, 'stream_response', False)
+            )
+
+    #---------------------------------------------------------------------------
+    def get_streaming_response(self, request, context, swim_template):
+        # Looking the template up here means a missing one still fails before
+        # the response is started.
+        template = loader.get_template(swim_template.path)
+        return StreamingHttpResponse(
+                self.stream(request, render_chunks(template, context, request)),
+                content_type=str(swim_template.http_content_type)
+            )
+
+    #---------------------------------------------------------------------------
+    def stream(self, request, chunks):
+        """
+        Yields the chunks joined into pieces of about SWIM_STREAM_CHUNK_SIZE
+        characters, as the individual pieces of a template are tiny.
+
+        The template is rendered after the view has returned, so the request
+        is made current again while it is.
+        """
+        chunk_size = getattr(settings, 'SWIM_STREAM_CHUNK_SIZE', 16384)
+        previous_request = swim.current_request()
+        swim._thread_locals.request = request
+        try:
+            pending = []
+            pending_size = 0
+            for chunk in chunks:
+                pending.append(chunk)
+                pending_size += len(chunk)
+                if pending_size >= chunk_size:
+                    yield ''.join(pending)
+                    pending = []
+                    pending_size = 0
+            if pending:
+                yield ''.join(pending)
+        finally:
+            swim._thread_locals.request = previous_request
+
     #---------------------------------------------------------------------------
     def run_middleware(self, resource_type, request, context, resource, template):
         for middleware in resource_type.get_middleware():
-            middleware.function.invoke(request, context, resource, template)
+            with timing.stage(request, 'middleware', middleware.function.function):
+                middleware.function.invoke(request, context, resource, template)
 
     #---------------------------------------------------------------------------
     def run_response_processors(self, resource_type, request, context, resource, template, response):
         for response_processor in resource_type.get_response_processors():
-            response_processor.function.invoke(request, context, resource, template, response)
+            with timing.stage(request, 'response_processor', response_processor.function.function):
+                response_processor.function.invoke(request, context, resource, template, response)
 
     #---------------------------------------------------------------------------
     def match_resource(self, path, request):
@@ -293,6 +612,18 @@ class ResourceView404(PageView):
     def match_resource(self, path, request):
         return Resource404()
 
+    #---------------------------------------------------------------------------
+    def get_page_cache_key(self, request, resource, template):
+        return None
+
+    #---------------------------------------------------------------------------
+    def get_etag(self, request, resource, template):
+        return None
+
+    #---------------------------------------------------------------------------
+    def stream_response(self, request, resource, template):
+        return False
+
     #---------------------------------------------------------------------------
     def get_context(self, request):
         context = super(ResourceView404, self).get_context(request)
@@ -2,10 +2,11 @@ from django.conf import settings
 from django.contrib.sites.models import Site
 from django.utils.functional import LazyObject, SimpleLazyObject
 
+from swim.core import pagecache
 from swim.core.content import DJANGO_MODEL_SWIM_CONTENT_TYPE_LOOKUPS
 from swim.content.views import ContentKeyMapper
 from swim.content.models import (
-    SiteWideContent,
+    site_wide_content,
 )
 
 
@@ -14,11 +15,22 @@ class LazyLoadSite(LazyObject):
 
     #---------------------------------------------------------------------------
     def _setup(self):
-        self._wrapped = Site.objects.get_current()
-        # Add in the site wide content.
-        for swc in SiteWideContent.objects.all():
-            setattr(self._wrapped, swc.key, swc)
+        # Both the site and its content are cached by each worker, the
+        # content until it changes.  See swim.content.models.site_wide_content
+        (content, tags, sites) = site_wide_content.get()
+        pagecache.record_versions(tags)
 
+        current = Site.objects.get_current()
+        pagecache.record_dependencies(pagecache.object_tag(Site, current.id))
+        site = sites.get(current.id)
+        if site is None:
+            # Add in the site wide content.  The site is loaded again, as the
+            # one django caches isn't refreshed when another worker saves it.
+            site = Site.objects.get(pk=current.id)
+            for swc in content:
+                setattr(site, swc.key, swc)
+            sites[current.id] = site
+        self._wrapped = site
         return self._wrapped
 
 #-------------------------------------------------------------------------------
@@ -1,6 +1,8 @@
 """
 The basic website application for SWIM.
 """
+default_app_config = 'swim.core.apps.CoreAppConfig'
+
 import os
 import string
 
@@ -9,6 +11,97 @@ from django.dispatch import Signal
 from django.db import models
 from django.db.models import query, Q
 
+#-------------------------------------------------------------------------------
+def potential_paths(path):
+    """
+    Yield the paths that may contain the given path, most specific first.
+
+    Path pieces are broken off the end of the path one at a time until none
+    are left, and the default path "/" is always yielded last.
+    """
+    if path != "/":
+        branch = path
+        while branch:
+            yield branch
+            if '/' not in branch:
+                break
+            # remove the last "path part" and iterate
+            branch = branch.rsplit('/', 1)[0]
+    yield '/'
+
+#-------------------------------------------------------------------------------
+class PathTrie:
+    """
+    An in memory map of paths to values with a longest prefix lookup.
+
+    The paths are split into their "path parts" so a lookup costs one dict
+    access per part, and it finds the same object the database lookups in
+    this module would: the value stored for the first path yielded by
+    potential_paths.
+    """
+
+    #---------------------------------------------------------------------------
+    class Node:
+        __slots__ = ('children', 'value', 'has_value')
+
+        def __init__(self):
+            self.children = {}
+            self.value = None
+            self.has_value = False
+
+    #---------------------------------------------------------------------------
+    def __init__(self, items=()):
+        self.root = PathTrie.Node()
+        self.default = PathTrie.Node()
+        for (path, value) in items:
+            self.add(path, value)
+
+    #---------------------------------------------------------------------------
+    def add(self, path, value):
+        if path == '/':
+            node = self.default
+        else:
+            node = self.root
+            for part in path.split('/'):
+                node = node.children.setdefault(part, PathTrie.Node())
+        node.value = value
+        node.has_value = True
+
+    #---------------------------------------------------------------------------
+    def get(self, path):
+        """
+        Return the value stored for exactly this path.
+
+        raises KeyError if there isn't one.
+        """
+        if path == '/':
+            node = self.default
+        else:
+            node = self.root
+            for part in path.split('/'):
+                node = node.children.get(part)
+                if node is None:
+                    raise KeyError(path)
+        if not node.has_value:
+            raise KeyError(path)
+        return node.value
+
+    #---------------------------------------------------------------------------
+    def longest_prefix(self, path, default=None):
+        """
+        Return the value stored for the most specific path containing path.
+        """
+        found = self.default
+        if path != '/':
+            node = self.root
+            for part in path.split('/'):
+                node = node.children.get(part)
+                if node is None:
+                    break
+                if node.has_value:
+                    found = node
+        return found.value if found.has_value else default
+
 #-------------------------------------------------------------------------------
 def path_resolution_order(
     get_function,
@@ -28,21 +121,14 @@ def path_resolution_order(
 
     # Otherwise match the template based on 'tree'
     object = None
-    branch = path
-    parts = [branch, '']
-    while True:
-        branch = parts[0]
-        if branch == '':
+    for branch in potential_paths(path):
+        if branch == '/':
             break
         try:
             object = get_function(branch, http_content_type, swim_content_type, *args, **kwargs)
             break
         except exception as e:
-            if len(parts) <= 1:
-                break
-
-        # remove the last "path part" and iterate
-        parts = branch.rsplit('/', 1)
+            pass
 
     if not object:
         object = get_function('/', http_content_type, swim_content_type, *args, **kwargs)
@@ -55,24 +141,11 @@ def query_object_by_potential_paths(Model, path, path_attr='path'):
 
     Start by using exact path matches and then break off path pieces until none
     are left, and end by trying the default path "/" - this object does a single query.
-    """
-    potential_paths = []
-    if path != "/":
-        branch = path
-        parts = [branch, '']
-        while True:
-            branch = parts[0]
-            if branch == '':
-                break
-            potential_paths.append(branch)
-            # remove the last "path part" and iterate
-            parts = branch.rsplit('/', 1)
 
-    potential_paths.append('/')
-
-    query_restrictions = Q(**{path_attr:potential_paths.pop(0)})
-    for path in potential_paths:
-        query_restrictions |= Q(**{path_attr:path})
+    When the rows are kept in memory, PathTrie.longest_prefix gives the same
+    answer without the query.
+    """
+    query_restrictions = Q(**{'%s__in' % path_attr: list(potential_paths(path))})
 
     try:
         return Model.objects.filter(
@@ -94,30 +167,39 @@ def get_object_by_path(get_function, path, exception=ObjectDoesNotExist, *args,
 
     Start by using exact path matches and then break off path pieces until none
     are left, and end by trying the default path "/".
+
+    Passing the get method of a PathTrie, along with exception=KeyError,
+    works too, although PathTrie.longest_prefix does the same thing directly.
     """
     if path == "/":
         return get_function('/')
 
     object = None
-    branch = path
-    parts = [branch, '']
-    while True:
-        branch = parts[0]
-        if branch == '':
+    for branch in potential_paths(path):
+        if branch == '/':
             break
         try:
             object = get_function(branch, *args, **kwargs)
             break
         except exception:
-            if len(parts) <= 1:
-                break
-        # remove the last "path part" and iterate
-        parts = branch.rsplit('/', 1)
+            pass
 
     if not object:
         object = get_function('/')
     return object
 
+#-------------------------------------------------------------------------------
+def bulk_writes():
+    """
+    A context manager for importing or updating many resources at once.
+
+    The request handlers and path reservations of the resources saved within
+    it are brought up to date together when it exits.  See
+    swim.core.models.bulk_writes.
+    """
+    from swim.core.models import bulk_writes
+    return bulk_writes()
+
 #-------------------------------------------------------------------------------
 # Only allows letters, digits, and _
 def string_to_key(the_str):
@@ -158,7 +240,67 @@ def is_subpath_on_path(subpath, path):
 #query.ModelIterable.__iter__ = __SA_iter__
 
 #-------------------------------------------------------------------------------
-class WithRelated(models.Manager):
+class ContentQuerySet(query.QuerySet):
+    """
+    A queryset for content objects which can batch the loading of their atoms.
+
+    See: swim.core.content.prefetch_atoms
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self, *args, **kwargs):
+        super(ContentQuerySet, self).__init__(*args, **kwargs)
+        self._prefetch_atom_names = None
+        self._prefetch_atoms_done = False
+        self._single_object = False
+
+    #---------------------------------------------------------------------------
+    def prefetch_atoms(self, *attr_names):
+        """
+        Load the named atoms for all of the results with one query per atom type.
+
+        With no names, every atom type is loaded for all of the results the
+        first time it is used on any one of them.
+        """
+        clone = self._chain()
+        clone._prefetch_atom_names = (clone._prefetch_atom_names or ()) + attr_names
+        return clone
+
+    #---------------------------------------------------------------------------
+    def _clone(self):
+        clone = super(ContentQuerySet, self)._clone()
+        clone._prefetch_atom_names = self._prefetch_atom_names
+        clone._single_object = self._single_object
+        return clone
+
+    #---------------------------------------------------------------------------
+    def get(self, *args, **kwargs):
+        # A page which gets a single object only depends on that object,
+        # which the page cache records as it is loaded.  If it's missing the
+        # page depends on the whole model, as it may be created later.
+        clone = self._chain()
+        clone._single_object = True
+        try:
+            return super(ContentQuerySet, clone).get(*args, **kwargs)
+        except self.model.DoesNotExist:
+            from swim.core.pagecache import record_model
+            record_model(self.model)
+            raise
+
+    #---------------------------------------------------------------------------
+    def _fetch_all(self):
+        if self._result_cache is None and not self._single_object:
+            from swim.core.pagecache import record_model
+            record_model(self.model)
+        super(ContentQuerySet, self)._fetch_all()
+        if self._prefetch_atom_names is not None and not self._prefetch_atoms_done:
+            self._prefetch_atoms_done = True
+            if issubclass(self._iterable_class, query.ModelIterable):
+                from swim.core.content import prefetch_atoms
+                prefetch_atoms(self._result_cache, *self._prefetch_atom_names)
+
+#-------------------------------------------------------------------------------
+class WithRelated(models.Manager.from_queryset(ContentQuerySet)):
     """
     A query manager which minimizes query to 'get' the associated resource_type.
     """
@@ -0,0 +1,65 @@
+import logging
+
+from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
+
+from swim.core import signals
+
+logger = logging.getLogger(__name__)
+
+#-------------------------------------------------------------------------------
+def warm_up(sender=None):
+    """
+    Ask every app to fill its process caches.
+
+    returns
+        the list of (receiver, response) pairs from the warmup signal.
+    """
+    responses = signals.warmup.send_robust(sender=sender)
+    for (receiver, response) in responses:
+        if isinstance(response, Exception):
+            logger.error("Warm up failed in %r: %s", receiver, response)
+    return responses
+
+#-------------------------------------------------------------------------------
+def warm_up_on_first_request(sender, **kwargs):
+    # The app registry is ready before the database can safely be used, so
+    # the work is put off until the first request comes in.
+    request_started.disconnect(warm_up_on_first_request)
+    warm_up(sender=sender)
+
+
+#-------------------------------------------------------------------------------
+def report_startup_timings():
+    from swim.core.content import (
+        REGISTRATION_TIMINGS,
+        CONTENT_OBJECTS,
+        CONTENT_ATOM_METADATA,
+    )
+    logger.info(
+            "SWIM registered %d content objects and %d atom types.",
+            len(CONTENT_OBJECTS), len(CONTENT_ATOM_METADATA)
+        )
+    for (name, (count, seconds)) in sorted(REGISTRATION_TIMINGS.items()):
+        logger.info("    %s: %d call(s) in %.2fms", name, count, seconds * 1000)
+
+
+#-------------------------------------------------------------------------------
+class CoreAppConfig(AppConfig):
+    name = 'swim.core'
+
+    def ready(self):
+        # Every app's models have been imported, so all of the content objects
+        # and atom types they register are known.
+        from swim.core import checks
+        from swim.core.content import attach_content_atom_accessors
+        from swim.core.models import connect_bookkeeping_receivers
+        from swim.core.pagecache import connect_page_cache_receivers
+        attach_content_atom_accessors()
+        connect_bookkeeping_receivers()
+        connect_page_cache_receivers()
+        report_startup_timings()
+
+        if getattr(settings, 'SWIM_WARM_UP_ON_FIRST_REQUEST', True):
+            request_started.connect(warm_up_on_first_request)
@@ -0,0 +1,246 @@
+"""
+Process level caches for SWIM.
+
+A lot of the data that SWIM consults on every request changes very rarely,
+but is read constantly.  This module provides the pieces used to keep that
+data in memory within each worker while keeping all of the workers coherent.
+
+A VersionStamp is a small token that is kept in django's cache framework so
+that it is shared between workers whenever a shared cache backend is
+configured (see the SWIM_CACHE_ALIAS setting).  When the underlying data
+changes, the stamp is bumped and every worker will notice the next time it
+consults the stamp.  Within a single request the stamp is only read once.
+
+SWIM_CACHE_ALIAS must name a cache which every worker shares, such as
+memcached, redis or the database cache, whenever there is more than one
+worker.  With a per process cache, such as the LocMemCache django falls back
+to, a change made in one worker is never seen by the others and their copies
+stay stale.  The swim.W001 and swim.E001 (manage.py check --deploy) system
+checks report this.
+
+A VersionedCache pairs a loader with a VersionStamp.  The loader is run the
+first time the value is needed and again whenever the stamp has changed.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+import swim
+
+#-------------------------------------------------------------------------------
+# Every cache defined with this module, so that they can all be reset at once.
+PROCESS_CACHES = []
+
+#-------------------------------------------------------------------------------
+def get_cache():
+    """
+    Returns the django cache which is used to share state between workers.
+    """
+    return caches[getattr(settings, 'SWIM_CACHE_ALIAS', 'default')]
+
+#-------------------------------------------------------------------------------
+def reset_process_caches():
+    """
+    Throw away the in memory contents of every process cache.
+
+    The caches will reload themselves on next use.  This is mostly useful
+    for tests, whose database changes are rolled back without any signals.
+    """
+    for process_cache in PROCESS_CACHES:
+        process_cache.reset()
+
+
+#-------------------------------------------------------------------------------
+class VersionStamp:
+    """
+    A shared token which changes whenever the data it represents changes.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self, name):
+        self.name = name
+        self.cache_key = 'swim.version.%s' % name
+
+    #---------------------------------------------------------------------------
+    def _request_versions(self):
+        request = swim.current_request()
+        if request is None:
+            return None
+
+        versions = getattr(request, '_swim_versions', None)
+        if versions is None:
+            versions = request._swim_versions = {}
+        return versions
+
+    #---------------------------------------------------------------------------
+    def get(self):
+        """
+        Returns the current version, reading the shared cache once per request.
+        """
+        versions = self._request_versions()
+        if versions is not None and self.name in versions:
+            return versions[self.name]
+
+        cache = get_cache()
+        version = cache.get(self.cache_key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(self.cache_key, version, None):
+                version = cache.get(self.cache_key, version)
+
+        if versions is not None:
+            versions[self.name] = version
+        return version
+
+    #---------------------------------------------------------------------------
+    def bump(self):
+        """
+        Mark the data this stamp represents as changed.
+        """
+        version = self._set()
+
+        # Other workers may reload between now and the end of the current
+        # transaction, in which case they would be loading the old rows
+        # under the new version.  Bumping again on commit avoids that.
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(self._set)
+        return version
+
+    #---------------------------------------------------------------------------
+    def _set(self):
+        version = uuid.uuid4().hex
+        get_cache().set(self.cache_key, version, None)
+
+        versions = self._request_versions()
+        if versions is not None:
+            versions[self.name] = version
+        return version
+
+
+#-------------------------------------------------------------------------------
+class VersionedCache:
+    """
+    A value which is loaded once per worker and reloaded when its stamp changes.
+
+    attributes:
+    stamp
+        The VersionStamp that is checked before the value is used.
+    loader
+        A callable which takes no arguments and returns the value.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self, name, loader):
+        self.stamp = VersionStamp(name)
+        self.loader = loader
+        self._lock = threading.Lock()
+        self.reset()
+        PROCESS_CACHES.append(self)
+
+    #---------------------------------------------------------------------------
+    def reset(self):
+        # The version and value are always replaced together so that readers
+        # in other threads never see a mismatched pair.
+        self._state = (None, None)
+
+    #---------------------------------------------------------------------------
+    def get(self):
+        version = self.stamp.get()
+        loaded_version, value = self._state
+        if loaded_version == version:
+            return value
+
+        with self._lock:
+            loaded_version, value = self._state
+            if loaded_version != version:
+                value = self.loader()
+                self._state = (version, value)
+        return value
+
+    #---------------------------------------------------------------------------
+    def invalidate(self, *args, **kwargs):
+        """
+        Discard the value in every worker.
+
+        Accepts (and ignores) any arguments so it can be used directly as a
+        signal receiver.
+        """
+        self.reset()
+        self.stamp.bump()
+
+
+#-------------------------------------------------------------------------------
+class LRUCache:
+    """
+    A bounded, per worker map which throws away the least recently used keys.
+
+    attributes:
+    maxsize
+        The most values that will be kept at once.
+    hits
+        How many lookups found their key.
+    misses
+        How many lookups had to build their value.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self.reset()
+        PROCESS_CACHES.append(self)
+
+    #---------------------------------------------------------------------------
+    def reset(self):
+        with self._lock:
+            self._values = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+
+    #---------------------------------------------------------------------------
+    def __len__(self):
+        return len(self._values)
+
+    #---------------------------------------------------------------------------
+    def get_or_build(self, key, build):
+        """
+        Returns the value for key, calling build() to make it if it's missing.
+        """
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return self._values[key]
+            self.misses += 1
+
+        # Built outside of the lock, as building is the slow part.  Two
+        # threads may build the same value, in which case the last one wins.
+        value = build()
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+        return value
+
+    #---------------------------------------------------------------------------
+    def discard(self, predicate):
+        """
+        Throw away every value whose key satisfies predicate.
+        """
+        with self._lock:
+            for key in [key for key in self._values if predicate(key)]:
+                del self._values[key]
+
+    #---------------------------------------------------------------------------
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._values),
+            'maxsize': self.maxsize,
+        }
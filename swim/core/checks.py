@@ -0,0 +1,55 @@
+"""
+System checks for the settings SWIM depends on.
+"""
+from django.conf import settings
+from django.core import checks
+
+# Backends which keep their entries within a single process.
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+#-------------------------------------------------------------------------------
+def process_local_cache_alias():
+    """
+    Returns the name of SWIM_CACHE_ALIAS when it resolves to a cache that
+    isn't shared between workers, otherwise None.
+    """
+    alias = getattr(settings, 'SWIM_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    if backend in PROCESS_LOCAL_CACHE_BACKENDS:
+        return alias
+    return None
+
+#-------------------------------------------------------------------------------
+def shared_cache_message(alias):
+    return (
+        "SWIM_CACHE_ALIAS names the %r cache, which isn't shared between "
+        "processes, so the changes made in one worker are never seen by "
+        "the others." % alias
+    )
+
+SHARED_CACHE_HINT = (
+    "Point SWIM_CACHE_ALIAS at a memcached, redis, database or file based "
+    "cache which every worker uses."
+)
+
+#-------------------------------------------------------------------------------
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    # Fine for a single process, such as the development server.
+    alias = process_local_cache_alias()
+    if alias is None:
+        return []
+    return [checks.Warning(
+            shared_cache_message(alias), hint=SHARED_CACHE_HINT, id='swim.W001')]
+
+#-------------------------------------------------------------------------------
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache_deploy(app_configs, **kwargs):
+    alias = process_local_cache_alias()
+    if alias is None:
+        return []
+    return [checks.Error(
+            shared_cache_message(alias), hint=SHARED_CACHE_HINT, id='swim.E001')]
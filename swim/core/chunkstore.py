@@ -0,0 +1,153 @@
+"""
+Deduplicated storage of rendered output in a django cache.
+
+The pages of a site share a lot of identical output: the same header, the
+same menus and the same footer.  A ChunkStore splits what it is given into
+chunks, stores each chunk once under the hash of its contents, and hands
+back the list of hashes (a manifest) which reassembles it.
+
+The chunk boundaries depend only on the bytes around them, so the shared
+parts of two pages are cut the same way even though they're found at
+different offsets.  Output is split into lines (or at the end of tags for
+output without many lines) and a chunk ends after a piece whose checksum
+has its low bits clear, once the chunk is long enough.
+
+Chunks count the manifests that refer to them and are deleted when the
+last one is released.  Manifests which simply expire are never released, so
+chunks also expire: each store keeps the chunks it uses for another
+timeout seconds.  A chunk may also be evicted by the cache, in which case
+reading a manifest which uses it returns None, like any other cache miss.
+"""
+import hashlib
+import zlib
+
+#-------------------------------------------------------------------------------
+class ChunkStore:
+    """
+    attributes:
+    cache
+        The django cache the chunks are stored in.
+    timeout
+        How long a chunk is kept after the last time it was stored.
+    min_size, max_size
+        The smallest and largest chunk that will normally be made, in bytes.
+    mask
+        A chunk ends after a piece whose crc32 has none of these bits set,
+        making the average chunk around mask + 1 pieces long.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(
+            self, cache, timeout=None, prefix='swim.chunk',
+            min_size=256, max_size=4096, mask=0x3
+        ):
+        self.cache = cache
+        self.timeout = timeout
+        self.prefix = prefix
+        self.min_size = min_size
+        self.max_size = max_size
+        self.mask = mask
+
+    #---------------------------------------------------------------------------
+    def chunk_key(self, digest):
+        return '%s.%s' % (self.prefix, digest)
+
+    #---------------------------------------------------------------------------
+    def refs_key(self, digest):
+        return '%s.refs.%s' % (self.prefix, digest)
+
+    #---------------------------------------------------------------------------
+    def pieces(self, data):
+        for line in data.splitlines(True):
+            if len(line) <= self.max_size:
+                yield line
+                continue
+            # Long lines are split at the end of each tag instead.
+            start = 0
+            while start < len(line):
+                end = line.find(b'>', start + self.min_size)
+                end = len(line) if end == -1 else end + 1
+                end = min(end, start + self.max_size)
+                yield line[start:end]
+                start = end
+
+    #---------------------------------------------------------------------------
+    def split(self, data):
+        """
+        Returns the list of chunks which make up data.
+        """
+        chunks = []
+        current = []
+        size = 0
+        for piece in self.pieces(data):
+            current.append(piece)
+            size += len(piece)
+            boundary = not (zlib.crc32(piece) & self.mask)
+            if (boundary and size >= self.min_size) or size >= self.max_size:
+                chunks.append(b''.join(current))
+                current = []
+                size = 0
+        if current:
+            chunks.append(b''.join(current))
+        return chunks
+
+    #---------------------------------------------------------------------------
+    def put(self, data):
+        """
+        Stores data, returning the manifest to read it back with.
+        """
+        chunks = {}
+        manifest = []
+        for chunk in self.split(data):
+            digest = hashlib.sha1(chunk).hexdigest()
+            chunks[digest] = chunk
+            manifest.append(digest)
+
+        # Only the chunks which aren't stored already are written, the rest
+        # are kept for another timeout.
+        missing = {}
+        for (digest, chunk) in chunks.items():
+            if not self.cache.touch(self.chunk_key(digest), self.timeout):
+                missing[self.chunk_key(digest)] = chunk
+            self.add_reference(digest)
+        self.cache.set_many(missing, self.timeout)
+        return manifest
+
+    #---------------------------------------------------------------------------
+    def get(self, manifest):
+        """
+        Returns the data stored under manifest, or None when any of its
+        chunks are gone.
+        """
+        keys = [self.chunk_key(digest) for digest in manifest]
+        chunks = self.cache.get_many(keys)
+        if len(chunks) != len(set(keys)):
+            return None
+        return b''.join(chunks[key] for key in keys)
+
+    #---------------------------------------------------------------------------
+    def release(self, manifest):
+        """
+        Drops the references of a manifest, and every chunk left unused.
+        """
+        for digest in set(manifest):
+            try:
+                refs = self.cache.decr(self.refs_key(digest))
+            except ValueError:
+                refs = 0
+            if refs <= 0:
+                self.cache.delete_many([self.chunk_key(digest), self.refs_key(digest)])
+
+    #---------------------------------------------------------------------------
+    def add_reference(self, digest):
+        key = self.refs_key(digest)
+        if self.cache.add(key, 1, self.timeout):
+            return 1
+        try:
+            refs = self.cache.incr(key)
+        except ValueError:
+            # Expired between the two calls.
+            self.cache.set(key, 1, self.timeout)
+            return 1
+        self.cache.touch(key, self.timeout)
+        return refs
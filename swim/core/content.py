@@ -20,11 +20,20 @@ to associate a strong content atom with content objects via the same call.
 TODO: Better documentation for this module.
 """
 import itertools
+import time
+import uuid
 
+from django.apps import apps
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType as DjangoContentType
-from django.db.models.signals import post_init
+from django.core.cache import caches
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import Signal
 
+from swim.core import models as core_models, signals
 from swim.core.models import ContentSchemaMember
 
 #-------------------------------------------------------------------------------
@@ -98,13 +107,57 @@ class BaseAtomAccessor:
 
     #---------------------------------------------------------------------------
     def _generate_cache(self, instance):
+        # Load every other atom type the content schema uses at the same
+        # time.  See: hydrate_atoms
+        if getattr(instance, '_hydrate_atoms', False):
+            instance._hydrate_atoms = False
+            for accessor in get_schema_atom_accessors(instance):
+                if accessor is not self and not accessor._is_cached(instance):
+                    accessor.prefetch([instance])
+
+        # Load the atoms for the rest of the batch this instance was
+        # fetched in as well.  See: prefetch_atoms
+        instances = [instance]
+        for sibling in getattr(instance, '_atom_batch', ()):
+            if sibling is not instance and not self._is_cached(sibling):
+                instances.append(sibling)
+        self.prefetch(instances)
+
+    #---------------------------------------------------------------------------
+    def prefetch(self, instances):
+        """
+        Fill the cache for all of the instances with a single query.
+
+        When the atom snapshot cache is enabled, only the instances that
+        aren't in it are queried.
+        """
         django_content_type = DjangoContentType.objects.get_for_model(self.model)
-        related_args = self.gfk_model.get_select_related()
-        related = get_atoms(
-            self.gfk_model, django_content_type, [instance.id],
-            related_args=related_args
-        )
-        self._cache_atoms(instance, list(related))
+        ids = [instance.id for instance in instances]
+
+        atoms_by_id = {}
+        if atom_snapshots.enabled():
+            (atoms_by_id, versions) = atom_snapshots.get_many(
+                    self.attr_name, django_content_type.id, ids)
+            ids = [id for id in ids if id not in atoms_by_id]
+
+        if ids:
+            related_args = self.gfk_model.get_select_related()
+            related = get_atoms(
+                self.gfk_model, django_content_type, ids,
+                related_args=related_args
+            )
+
+            loaded = dict((id, []) for id in ids)
+            for atom in related:
+                loaded[atom.object_id].append(atom)
+
+            if atom_snapshots.enabled():
+                atom_snapshots.set_many(
+                        self.attr_name, django_content_type.id, loaded, versions)
+            atoms_by_id.update(loaded)
+
+        for instance in instances:
+            self._cache_atoms(instance, atoms_by_id.get(instance.id, []))
 
     #---------------------------------------------------------------------------
     def _apply_interface(self, instance, key, atom_list):
@@ -122,6 +175,521 @@ class BaseAtomAccessor:
             return atom_list[0]
 
 
+#-------------------------------------------------------------------------------
+def prefetch_atoms(instances, *attr_names):
+    """
+    Load the atoms for a list (or queryset) of content objects in bulk.
+
+    Each of the named atom types is loaded for every instance with a single
+    query.  Without any names, the instances are marked as a batch instead,
+    and the first time any atom type is used on one of them it is loaded
+    for the whole batch.
+
+    Long lists, such as the whole of a timeline, are split into batches of
+    SWIM_ATOM_BATCH_SIZE instances, so that using the first of them only
+    loads the atoms of those near it, and each keeps only its batch.
+
+    returns
+        the list of instances.
+    """
+    instances = list(instances)
+    for attr_name in attr_names:
+        if attr_name not in CONTENT_ATOM_METADATA:
+            raise AttributeError("No atom type registered as %s" % attr_name)
+
+    batch_size = getattr(settings, 'SWIM_ATOM_BATCH_SIZE', 500)
+    batches = []
+    for start in range(0, len(instances), batch_size):
+        batch = instances[start:start + batch_size]
+        by_accessor = {}
+        for instance in batch:
+            for accessor in getattr(instance, '_atom_accessors', ()):
+                if not attr_names:
+                    instance._atom_batch = batch
+                    break
+                if accessor.attr_name in attr_names and not accessor._is_cached(instance):
+                    by_accessor.setdefault(accessor, []).append(instance)
+        batches.extend(by_accessor.items())
+
+    for (accessor, batch) in batches:
+        accessor.prefetch(batch)
+    return instances
+
+#-------------------------------------------------------------------------------
+def snapshot_instance(instance):
+    """
+    A compact, picklable version of a model instance.
+
+    The instance's field values are kept along with any related instances
+    that were loaded through its foreign keys (by select_related).
+    """
+    opts = instance._meta
+    related = []
+    for field in opts.concrete_fields:
+        if field.is_relation and field.is_cached(instance):
+            related_instance = field.get_cached_value(instance)
+            if related_instance is not None:
+                related.append((field.name, snapshot_instance(related_instance)))
+
+    return (
+            opts.label,
+            tuple(field.attname for field in opts.concrete_fields),
+            tuple(getattr(instance, field.attname) for field in opts.concrete_fields),
+            tuple(related),
+        )
+
+#-------------------------------------------------------------------------------
+def restore_instance(snapshot, using='default'):
+    """
+    The inverse of snapshot_instance.
+    """
+    (label, field_names, values, related) = snapshot
+    instance = apps.get_model(label).from_db(using, field_names, values)
+    for (field_name, related_snapshot) in related:
+        instance._meta.get_field(field_name).set_cached_value(
+                instance, restore_instance(related_snapshot, using))
+    return instance
+
+
+#-------------------------------------------------------------------------------
+class AtomSnapshotCache:
+    """
+    A cache of the atoms of each content object shared between requests.
+
+    Enabled by setting SWIM_ATOM_CACHE to the name of a django cache.
+    Snapshots are keyed by the atom type, the django content type and id
+    of the content object and a version for that object, which is changed
+    whenever one of its content slots or a referenced atom is saved or
+    deleted.
+    """
+
+    #---------------------------------------------------------------------------
+    def enabled(self):
+        return bool(getattr(settings, 'SWIM_ATOM_CACHE', None))
+
+    #---------------------------------------------------------------------------
+    def get_cache(self):
+        return caches[settings.SWIM_ATOM_CACHE]
+
+    #---------------------------------------------------------------------------
+    def get_timeout(self):
+        return getattr(settings, 'SWIM_ATOM_CACHE_TIMEOUT', None)
+
+    #---------------------------------------------------------------------------
+    def _version_key(self, django_content_type_id, object_id):
+        return 'swim.atoms.version.%s.%s' % (django_content_type_id, object_id)
+
+    #---------------------------------------------------------------------------
+    def _snapshot_key(self, attr_name, django_content_type_id, object_id, version):
+        return 'swim.atoms.%s.%s.%s.%s' % (
+                attr_name, django_content_type_id, object_id, version)
+
+    #---------------------------------------------------------------------------
+    def get_versions(self, django_content_type_id, object_ids):
+        cache = self.get_cache()
+        version_keys = dict(
+                (self._version_key(django_content_type_id, id), id)
+                for id in object_ids
+            )
+        found = cache.get_many(list(version_keys.keys()))
+
+        versions = {}
+        for (key, id) in version_keys.items():
+            version = found.get(key)
+            if version is None:
+                version = uuid.uuid4().hex
+                if not cache.add(key, version, None):
+                    version = cache.get(key, version)
+            versions[id] = version
+        return versions
+
+    #---------------------------------------------------------------------------
+    def get_many(self, attr_name, django_content_type_id, object_ids):
+        """
+        Returns a dict mapping object ids to the list of their cached atoms,
+        and the dict of the versions of all of the objects.
+
+        Objects without a snapshot are left out of the first.  The atoms
+        loaded for them must be stored under the versions returned here,
+        read before they were, so that a change which commits in between
+        isn't hidden under its own version.
+        """
+        versions = self.get_versions(django_content_type_id, object_ids)
+        snapshot_keys = dict(
+                (self._snapshot_key(attr_name, django_content_type_id, id, version), id)
+                for (id, version) in versions.items()
+            )
+
+        atoms_by_id = {}
+        for (key, snapshots) in self.get_cache().get_many(list(snapshot_keys.keys())).items():
+            atoms_by_id[snapshot_keys[key]] = [
+                    restore_instance(snapshot) for snapshot in snapshots
+                ]
+        return (atoms_by_id, versions)
+
+    #---------------------------------------------------------------------------
+    def set_many(self, attr_name, django_content_type_id, atoms_by_id, versions):
+        self.get_cache().set_many(
+                dict(
+                    (
+                        self._snapshot_key(
+                            attr_name, django_content_type_id, id, versions[id]),
+                        [snapshot_instance(atom) for atom in atoms]
+                    )
+                    for (id, atoms) in atoms_by_id.items()
+                ),
+                self.get_timeout()
+            )
+
+    #---------------------------------------------------------------------------
+    def bump(self, django_content_type_id, object_id):
+        """
+        Invalidate the snapshots for a content object.
+        """
+        if not self.enabled():
+            return
+
+        def set_version():
+            self.get_cache().set(
+                    self._version_key(django_content_type_id, object_id),
+                    uuid.uuid4().hex,
+                    None
+                )
+        set_version()
+
+        # Don't let another request store the old rows under the new version
+        # before this transaction commits.
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(set_version)
+
+    #---------------------------------------------------------------------------
+    def content_slot_loaded(self, sender, instance, **kwargs):
+        # Remember which object the slot belongs to, so that moving it to
+        # another one invalidates the snapshots of both.  Deferred fields are
+        # left alone, rather than loaded.
+        instance._swim_atom_owner = (
+                instance.__dict__.get('django_content_type_id'),
+                instance.__dict__.get('object_id'),
+            )
+
+    #---------------------------------------------------------------------------
+    def content_slot_changed(self, sender, instance, **kwargs):
+        owner = (instance.django_content_type_id, instance.object_id)
+        self.bump(*owner)
+
+        previous = getattr(instance, '_swim_atom_owner', (None, None))
+        if previous != owner and None not in previous:
+            self.bump(*previous)
+        instance._swim_atom_owner = owner
+
+    #---------------------------------------------------------------------------
+    def atom_changed(self, sender, instance, **kwargs):
+        if not self.enabled():
+            return
+
+        for atom in CONTENT_ATOM_METADATA.values():
+            if getattr(atom, 'atom_model', None) is not sender:
+                continue
+            for (django_content_type_id, object_id) in \
+                    atom.content_slot_model.objects.filter(**{
+                        atom.get_slot_attrname(): instance
+                    }).values_list('django_content_type_id', 'object_id'):
+                self.bump(django_content_type_id, object_id)
+
+    #---------------------------------------------------------------------------
+    def watch(self, content_atom):
+        """
+        Invalidate snapshots when the models used by the atom type change.
+        """
+        slot_model = content_atom.content_slot_model
+        post_init.connect(self.content_slot_loaded, sender=slot_model)
+        post_save.connect(self.content_slot_changed, sender=slot_model)
+        post_delete.connect(self.content_slot_changed, sender=slot_model)
+
+        atom_model = getattr(content_atom, 'atom_model', None)
+        if atom_model is not None:
+            post_save.connect(self.atom_changed, sender=atom_model)
+            # The slots are deleted along with the atom and invalidate
+            # the snapshots themselves.
+
+atom_snapshots = AtomSnapshotCache()
+
+#-------------------------------------------------------------------------------
+class ContentKeyCache:
+    """
+    A cache of the content objects looked up by key, shared between requests.
+
+    Enabled by setting SWIM_CONTENT_KEY_CACHE to the name of a django cache.
+    Objects, and keys without one, are kept for SWIM_CONTENT_KEY_CACHE_TIMEOUT
+    seconds (five minutes by default) or until an object of the same model is
+    saved or deleted, which changes the version they're stored under.
+    """
+    # Stored for keys without an object, as the cache can't store None.
+    MISSING = 'missing'
+
+    #---------------------------------------------------------------------------
+    def enabled(self):
+        return bool(getattr(settings, 'SWIM_CONTENT_KEY_CACHE', None))
+
+    #---------------------------------------------------------------------------
+    def get_cache(self):
+        return caches[settings.SWIM_CONTENT_KEY_CACHE]
+
+    #---------------------------------------------------------------------------
+    def get_timeout(self):
+        return getattr(settings, 'SWIM_CONTENT_KEY_CACHE_TIMEOUT', 300)
+
+    #---------------------------------------------------------------------------
+    def _version_key(self, django_content_type_id):
+        return 'swim.content_keys.version.%s' % django_content_type_id
+
+    #---------------------------------------------------------------------------
+    def get_version(self, model):
+        version_key = self._version_key(model.get_django_content_type().id)
+        cache = self.get_cache()
+        version = cache.get(version_key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(version_key, version, None):
+                version = cache.get(version_key, version)
+        return version
+
+    #---------------------------------------------------------------------------
+    def _object_keys(self, model, keys, version):
+        django_content_type_id = model.get_django_content_type().id
+        return dict(
+                ('swim.content_keys.%s.%s.%s' % (django_content_type_id, version, key), key)
+                for key in keys
+            )
+
+    #---------------------------------------------------------------------------
+    def get_many(self, model, keys):
+        """
+        Returns a dict mapping keys to their objects, or to None for keys
+        known not to have one, and the version of the model they were read
+        under.
+
+        Keys which aren't in the cache are left out.  The objects loaded for
+        them must be stored under the version returned here, see
+        AtomSnapshotCache.get_many
+        """
+        version = self.get_version(model)
+        object_keys = self._object_keys(model, keys, version)
+        objects = {}
+        for (cache_key, snapshot) in self.get_cache().get_many(list(object_keys.keys())).items():
+            if snapshot == self.MISSING:
+                objects[object_keys[cache_key]] = None
+            else:
+                objects[object_keys[cache_key]] = restore_instance(snapshot)
+        return (objects, version)
+
+    #---------------------------------------------------------------------------
+    def set_many(self, model, objects, version):
+        """
+        Stores a dict of keys to their objects, or to None, under the version
+        returned by get_many.
+        """
+        object_keys = self._object_keys(model, objects.keys(), version)
+        self.get_cache().set_many(
+                dict(
+                    (
+                        cache_key,
+                        self.MISSING if objects[key] is None
+                        else snapshot_instance(objects[key])
+                    )
+                    for (cache_key, key) in object_keys.items()
+                ),
+                self.get_timeout()
+            )
+
+    #---------------------------------------------------------------------------
+    def model_changed(self, sender, **kwargs):
+        if not self.enabled():
+            return
+
+        version_key = self._version_key(sender.get_django_content_type().id)
+        def set_version():
+            self.get_cache().set(version_key, uuid.uuid4().hex, None)
+        set_version()
+
+        # See AtomSnapshotCache.bump
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(set_version)
+
+    #---------------------------------------------------------------------------
+    def watch(self, model):
+        """
+        Invalidate the objects of a content object model when any one changes.
+        """
+        post_save.connect(self.model_changed, sender=model)
+        post_delete.connect(self.model_changed, sender=model)
+
+content_keys = ContentKeyCache()
+
+#-------------------------------------------------------------------------------
+def batch_content_keys(request, analysis):
+    """
+    Look up the content objects a template uses by key, as in
+    content.page.about, together.
+
+    analysis
+        The analysis of the template, see swim.design.analysis.
+
+    The keys are added to the batch for the request, and the first time any
+    object of a content type is used all of the keys in the batch for that
+    type are looked up with a single query.  See:
+    swim.content.views.ContentKeyMapper
+
+    Does nothing when SWIM_CONTENT_KEY_BATCH is False.
+    """
+    if not analysis or request is None:
+        return
+    if not getattr(settings, 'SWIM_CONTENT_KEY_BATCH', True):
+        return
+
+    batch = getattr(request, '_swim_content_key_batch', None)
+    if batch is None:
+        batch = request._swim_content_key_batch = {}
+    # Analyses made before content objects were included don't have them.
+    for (context_name, key) in analysis.get('content', ()):
+        batch.setdefault(context_name, set()).add(key)
+
+#-------------------------------------------------------------------------------
+def get_schema_atom_accessors(instance):
+    """
+    Returns the atom accessors for the atom types used by the instance's schema.
+
+    The compiled content schema of the instance's type is used, so this
+    doesn't hit the database once the type is loaded.
+    """
+    type_field_name = getattr(instance, 'type_field_name', None)
+    if not type_field_name:
+        return []
+
+    entity_type = getattr(instance, type_field_name, None)
+    if entity_type is None:
+        return []
+
+    titles = entity_type.get_compiled_schema().swim_content_types
+    return [
+            accessor for accessor in getattr(instance, '_atom_accessors', ())
+            if any(accessor.atom_type.stores(title) for title in titles)
+        ]
+
+#-------------------------------------------------------------------------------
+def hydrate_atoms(instance):
+    """
+    Put the instance into "resource hydration" mode.
+
+    The first time any atom is used on the instance, every atom type that is
+    used by its content schema is loaded as well, one query per atom type.
+    This keeps the number of queries for a resource constant no matter how
+    many of its schema members a template uses.
+
+    returns
+        the instance.
+    """
+    instance._hydrate_atoms = True
+    return instance
+
+#-------------------------------------------------------------------------------
+def prefetch_analyzed_atoms(instances, analysis):
+    """
+    Load the atoms, and the relations of those atoms, that a template uses
+    for all of the instances before it renders them.
+
+    analysis
+        The analysis of the template, see swim.design.analysis.  Nothing is
+        loaded when it's None.
+
+    Atoms from a relation are handed, per model, to the model's
+    prefetch_relations(instances, attributes) classmethod when it has one.
+
+    returns
+        the list of instances.
+    """
+    instances = list(instances)
+    if not analysis or not instances:
+        return instances
+
+    attr_names = [name for name in analysis['atoms'] if name in CONTENT_ATOM_METADATA]
+    if attr_names:
+        prefetch_atoms(instances, *attr_names)
+
+    related = {}
+    for (attr_name, key, attribute) in analysis['relations']:
+        if attr_name not in CONTENT_ATOM_METADATA:
+            continue
+        cache_name = "_%s_cache" % attr_name
+        for instance in instances:
+            atoms = (getattr(instance, cache_name, None) or {}).get(key)
+            if atoms is None:
+                continue
+            if not isinstance(atoms, list):
+                atoms = [atoms]
+            for atom in atoms:
+                (models, attributes) = related.setdefault(type(atom), ({}, set()))
+                models[id(atom)] = atom
+                attributes.add(attribute)
+
+    for (model, (atoms, attributes)) in related.items():
+        prefetch_relations = getattr(model, 'prefetch_relations', None)
+        if prefetch_relations is not None:
+            prefetch_relations(list(atoms.values()), attributes)
+    return instances
+
+#-------------------------------------------------------------------------------
+def get_atom_stamps(instance):
+    """
+    Describe the atoms used by the instance's schema without loading them.
+
+    returns
+        a list of (last modified, count) pairs, one for each atom type.  The
+        last modified time is None when the rows don't record one.
+    """
+    accessors = get_schema_atom_accessors(instance)
+    if not accessors:
+        return []
+
+    django_content_type = instance.get_django_content_type()
+    stamps = []
+    for accessor in accessors:
+        atom_type = accessor.atom_type
+        slot_model = atom_type.content_slot_model
+        aggregates = {'count': Count('pk')}
+        if has_field(slot_model, 'modifieddate'):
+            aggregates['slots'] = Max('modifieddate')
+        atom_model = getattr(atom_type, 'atom_model', None)
+        if atom_model is not None and has_field(atom_model, 'modifieddate'):
+            aggregates['atoms'] = Max(
+                    '%s__modifieddate' % atom_type.get_slot_attrname())
+
+        values = slot_model.objects.filter(
+                django_content_type=django_content_type,
+                object_id=instance.pk,
+            ).aggregate(**aggregates)
+        dates = [values.get(name) for name in ('slots', 'atoms')]
+        dates = [date for date in dates if date is not None]
+        stamps.append((max(dates) if dates else None, values['count']))
+    return stamps
+
+#-------------------------------------------------------------------------------
+def get_queryset_stamp(queryset):
+    """
+    Returns the (last modified, count) pair for the rows in queryset.
+    """
+    values = queryset.order_by().aggregate(
+            last_modified=Max('modifieddate'), count=Count('pk'))
+    return (values['last_modified'], values['count'])
+
+#-------------------------------------------------------------------------------
+def has_field(model, name):
+    try:
+        model._meta.get_field(name)
+        return True
+    except FieldDoesNotExist:
+        return False
+
 #-------------------------------------------------------------------------------
 class AtomAccessor(BaseAtomAccessor):
 
@@ -151,8 +719,36 @@ class AtomAccessor(BaseAtomAccessor):
         for key in keys:
             cache[key] = self._apply_interface(instance, key, cache[key])
 
+#-------------------------------------------------------------------------------
+def get_content_type_title(cls):
+    # ex swim.content.Page
+    return "%s.%s" % (cls.__module__.rsplit('.', 1)[0], cls.__name__)
+
 #-------------------------------------------------------------------------------
 class BaseAtomType:
+    """
+    attributes:
+    swim_content_types
+        The titles of the swim content types stored by this atom type.  A
+        title also covers the types whose titles extend it with a key, so
+        'swim.core.EnumType' covers 'swim.core.EnumType.colour'.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self, swim_content_types=()):
+        self.swim_content_types = tuple(swim_content_types)
+
+    #---------------------------------------------------------------------------
+    def stores(self, swim_content_type_title):
+        """
+        Whether schema members of the given swim content type use this atom type.
+        """
+        for title in self.swim_content_types:
+            if swim_content_type_title == title or \
+                    swim_content_type_title.startswith(title + '.'):
+                return True
+        return False
+
     #---------------------------------------------------------------------------
     def get_atoms(self, slot_model, django_content_type, instance_id_list):
         return get_atoms(slot_model, django_content_type, instance_id_list)
@@ -164,7 +760,11 @@ class AtomType(BaseAtomType):
     """
 
     #---------------------------------------------------------------------------
-    def __init__(self, content_slot_model):
+    def __init__(self, content_slot_model, swim_content_types=()):
+        super(AtomType, self).__init__(
+                (get_content_type_title(content_slot_model),) +
+                tuple(swim_content_types)
+            )
         self.content_slot_model = content_slot_model
 
     #---------------------------------------------------------------------------
@@ -174,6 +774,7 @@ class AtomType(BaseAtomType):
         keyed_accessor = AtomAccessor(
             model, self.content_slot_model, attr_name=attr_name
         )
+        keyed_accessor.atom_type = self
         model._atom_accessors.append(keyed_accessor)
         setattr(model, attr_name, keyed_accessor)
 
@@ -240,10 +841,21 @@ class ReferencedAtomType(BaseAtomType):
     An atom type that is stored via a reference.
     """
     #---------------------------------------------------------------------------
-    def __init__(self, atom_model, content_slot_model):
+    def __init__(self, atom_model, content_slot_model, swim_content_types=()):
+        super(ReferencedAtomType, self).__init__(
+                (
+                    get_content_type_title(atom_model),
+                    get_content_type_title(content_slot_model),
+                ) + tuple(swim_content_types)
+            )
         self.atom_model = atom_model
         self.content_slot_model = content_slot_model
 
+    #---------------------------------------------------------------------------
+    def get_slot_attrname(self):
+        # See: BaseReferencedAtomAccessor.gfk_attrname
+        return self.atom_model.__name__.lower()
+
     #---------------------------------------------------------------------------
     def get_atoms(self, slot_model, django_content_type, instance_id_list):
         related_args = slot_model.get_select_related()
@@ -264,6 +876,7 @@ class ReferencedAtomType(BaseAtomType):
                 gfk_model=self.content_slot_model,
                 attr_name=attr_name,
             )
+        keyed_accessor.atom_type = self
         model._atom_accessors.append(keyed_accessor)
         setattr(model, attr_name, keyed_accessor)
 
@@ -280,29 +893,69 @@ class DjangoModelContentObject:
     #---------------------------------------------------------------------------
     def get_name(self):
         # ex swim.content.Page
-        return "%s.%s" % (
-            self.django_model.__module__.rsplit('.', 1)[0],
-            self.django_model.__name__
-        )
+        return get_content_type_title(self.django_model)
 
     #---------------------------------------------------------------------------
     def get_context_name(self):
         return self.get_name().rsplit('.', 1)[1].lower()
 
     #---------------------------------------------------------------------------
-    def lookup_key(self, key, request):
-        content_obj = None
+    def get_queryset(self):
         if hasattr(self.django_model, 'type_field_name'):
-            content_obj = self.django_model.objects.select_related(
+            return self.django_model.objects.select_related(
                         self.django_model.type_field_name
-                    ).get(key=key)
-        else:
-            content_obj = self.django_model.objects.get(key=key)
+                    )
+        return self.django_model.objects.all()
 
-        if hasattr(content_obj, 'set_request'):
-            content_obj.set_request(request)
+    #---------------------------------------------------------------------------
+    def lookup_key(self, key, request):
+        try:
+            return self.lookup_keys([key], request)[key]
+        except KeyError:
+            raise self.django_model.DoesNotExist(
+                    "%s matching key %r does not exist." % (
+                        self.django_model._meta.object_name, key))
+
+    #---------------------------------------------------------------------------
+    def lookup_keys(self, keys, request):
+        """
+        Returns a dict of key to the content object with that key, using one
+        query for all of those which aren't in the content key cache.
 
-        return content_obj
+        Keys without an object are left out.
+        """
+        model = self.django_model
+        keys = set(keys)
+
+        found = {}
+        if content_keys.enabled():
+            (found, version) = content_keys.get_many(model, keys)
+            keys.difference_update(found)
+
+        if keys:
+            loaded = dict((key, None) for key in keys)
+            queryset = self.get_queryset().filter(key__in=keys)
+            # Like a get, a page depends on the objects found, which are
+            # recorded as they're loaded, rather than the whole model.
+            queryset._single_object = True
+            for content_obj in queryset:
+                loaded[content_obj.key] = content_obj
+            if content_keys.enabled():
+                content_keys.set_many(model, loaded, version)
+            found.update(loaded)
+
+        objects = {}
+        for (key, content_obj) in found.items():
+            if content_obj is None:
+                # A page using a missing object depends on the whole model,
+                # as the object may be created later.
+                from swim.core.pagecache import record_model
+                record_model(model)
+                continue
+            if hasattr(content_obj, 'set_request'):
+                content_obj.set_request(request)
+            objects[key] = content_obj
+        return objects
 
 #-------------------------------------------------------------------------------
 # A module level global that is used to lookup the appropriate content object
@@ -339,12 +992,29 @@ class DjangoContentTypeGetter:
 
 
 
+#-------------------------------------------------------------------------------
+# The accessors are attached once, when the app registry is ready (see
+# swim.core.apps).  Anything registered after that is attached immediately.
+ACCESSORS_ATTACHED = False
+
+#-------------------------------------------------------------------------------
+# The time spent registering content objects and atom types, and attaching
+# their accessors, as {name: [count, seconds]}.  Reported on startup.
+REGISTRATION_TIMINGS = {}
+
+#-------------------------------------------------------------------------------
+def record_registration_time(name, started):
+    timing = REGISTRATION_TIMINGS.setdefault(name, [0, 0.0])
+    timing[0] += 1
+    timing[1] += time.perf_counter() - started
+
 #-------------------------------------------------------------------------------
 def register_content_object(name, model, global_key=False):
     """
     """
     global DJANGO_MODEL_SWIM_CONTENT_TYPE_LOOKUPS
     global CONTENT_OBJECTS
+    started = time.perf_counter()
 
     # Provide a way to get a (cached) instance of django's content type
     # for each content object.
@@ -352,14 +1022,18 @@ def register_content_object(name, model, global_key=False):
 
     # Keep a list of SWIM's content objects
     CONTENT_OBJECTS.append(model)
+    content_keys.watch(model)
 
     #
     dmco = DjangoModelContentObject(model)
     DJANGO_MODEL_SWIM_CONTENT_TYPE_LOOKUPS[name] = dmco
 
-    # TODO: this is a bit wasteful to be calling this everytime something
-    #       is registered, but meh - we'll optimize that afterwards
-    attach_content_atom_accessors()
+    if ACCESSORS_ATTACHED:
+        model._atom_accessors = []
+        for attr_name, content_atom in CONTENT_ATOM_METADATA.items():
+            attach_content_atom_accessor(model, attr_name, content_atom)
+
+    record_registration_time('register_content_object', started)
 
 #-------------------------------------------------------------------------------
 def register_atom_type(attribute_name, content_atom):
@@ -370,16 +1044,79 @@ def register_atom_type(attribute_name, content_atom):
     <attribute_name> attribute on all content objects.
     """
     global CONTENT_ATOM_METADATA
+    started = time.perf_counter()
+
     CONTENT_ATOM_METADATA[attribute_name] = content_atom
-    # TODO: this is a bit wasteful to be calling this everytime something
-    #       is registered, but meh - we'll optimize that afterwards
-    attach_content_atom_accessors()
+    atom_snapshots.watch(content_atom)
+
+    if ACCESSORS_ATTACHED:
+        for dmco in DJANGO_MODEL_SWIM_CONTENT_TYPE_LOOKUPS.values():
+            attach_content_atom_accessor(
+                    dmco.django_model, attribute_name, content_atom)
+
+    record_registration_time('register_atom_type', started)
+
+#-------------------------------------------------------------------------------
+def attach_content_atom_accessor(model, attr_name, content_atom):
+    # Replace any accessor previously registered under the same name.
+    model._atom_accessors = [
+            accessor for accessor in model._atom_accessors
+            if accessor.attr_name != attr_name
+        ]
+    content_atom.contribute_to_model(attr_name, model)
 
 #-------------------------------------------------------------------------------
 def attach_content_atom_accessors():
+    """
+    Attach the accessors for every atom type to every content object.
+    """
+    global ACCESSORS_ATTACHED
+    started = time.perf_counter()
+
     for name, dmco in DJANGO_MODEL_SWIM_CONTENT_TYPE_LOOKUPS.items():
         model = dmco.django_model
         model._atom_accessors = []
         for attr_name, content_atom in CONTENT_ATOM_METADATA.items():
             content_atom.contribute_to_model(attr_name, model)
+    ACCESSORS_ATTACHED = True
+
+    record_registration_time('attach_content_atom_accessors', started)
 
+#-------------------------------------------------------------------------------
+def get_subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from get_subclasses(subclass)
+
+#-------------------------------------------------------------------------------
+def warm_up_content_types(**kwargs):
+    """
+    Fill the SWIM and django content type caches with two bulk queries.
+
+    Without this, the first use of each class's swim_content_type and of
+    each content object's or slot's django content type costs a query.
+    """
+    # SWIM content types for every class which is a content type.  Only the
+    # rows that exist are cached, the rest are still created on first use.
+    titles = {}
+    for cls in set(get_subclasses(core_models.ClassIsContentType)):
+        if getattr(getattr(cls, '_meta', None), 'abstract', False):
+            continue
+        titles[get_content_type_title(cls)] = cls
+
+    for content_type in core_models.ContentType.objects.filter(
+            title__in=list(titles.keys())):
+        core_models.CONTENT_TYPE_CACHE[titles[content_type.title]] = content_type
+
+    # Django content types for the content objects and the atom models.
+    django_models = set(CONTENT_OBJECTS)
+    for content_atom in CONTENT_ATOM_METADATA.values():
+        django_models.add(content_atom.content_slot_model)
+        if getattr(content_atom, 'atom_model', None) is not None:
+            django_models.add(content_atom.atom_model)
+
+    django_content_types = DjangoContentType.objects.get_for_models(*django_models)
+    for model in CONTENT_OBJECTS:
+        model._django_content_type = django_content_types[model]
+
+signals.warmup.connect(warm_up_content_types)
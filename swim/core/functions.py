@@ -0,0 +1,117 @@
+"""
+A process wide registry of the python callables referenced by Function rows.
+
+Function.invoke used to import the module named by the row on every call.
+The registry resolves each dotted path once per worker and hands back the
+cached callable from then on.
+"""
+import logging
+import threading
+
+from django.apps import apps
+
+from swim.core import signals
+from swim.core.cache import PROCESS_CACHES, VersionStamp
+
+logger = logging.getLogger(__name__)
+
+#-------------------------------------------------------------------------------
+def import_function(dotted_path):
+    """
+    Import and return the callable named by dotted_path.
+
+    raises ImportError when the module or the callable can't be found.
+    """
+    (module_name, function_name) = dotted_path.rsplit('.', 1)
+    module = __import__(module_name, globals(), locals(), [str(function_name)])
+    try:
+        return module.__dict__[function_name]
+    except KeyError:
+        raise ImportError("Could not import %s from %s" % (function_name, module_name))
+
+
+#-------------------------------------------------------------------------------
+class FunctionRegistry:
+    """
+    Maps dotted paths onto the callables they name.
+
+    Failed imports are not remembered, so fixing the module (or the row) is
+    enough for the next call to succeed.
+
+    attributes:
+    stamp
+        A VersionStamp bumped by invalidate so that the other workers drop
+        their callables as well.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self):
+        self.stamp = VersionStamp('functions')
+        self._lock = threading.Lock()
+        self.reset()
+        PROCESS_CACHES.append(self)
+
+    #---------------------------------------------------------------------------
+    def reset(self):
+        self._state = (None, {})
+
+    #---------------------------------------------------------------------------
+    def resolve(self, dotted_path):
+        version = self.stamp.get()
+        loaded_version, callables = self._state
+        if loaded_version == version and dotted_path in callables:
+            return callables[dotted_path]
+
+        with self._lock:
+            loaded_version, callables = self._state
+            if loaded_version != version:
+                callables = {}
+            if dotted_path not in callables:
+                callables = dict(callables)
+                callables[dotted_path] = import_function(dotted_path)
+            self._state = (version, callables)
+        return callables[dotted_path]
+
+    #---------------------------------------------------------------------------
+    def invalidate(self, *args, **kwargs):
+        """
+        Forget every resolved callable, in this worker and all the others.
+
+        Accepts (and ignores) any arguments so it can be used directly as a
+        signal receiver.
+        """
+        self.reset()
+        self.stamp.bump()
+
+    #---------------------------------------------------------------------------
+    def preload(self):
+        """
+        Resolve the callable for every Function row in the database.
+
+        returns
+            a list of (dotted_path, exception) for each one that failed.
+        """
+        from swim.core.models import Function
+
+        errors = []
+        for model in apps.get_models():
+            if not issubclass(model, Function):
+                continue
+            for dotted_path in model.objects.values_list('function', flat=True):
+                try:
+                    self.resolve(dotted_path)
+                except Exception as e:
+                    logger.error(
+                            "Unable to resolve %s %s: %s",
+                            model.__name__, dotted_path, e
+                        )
+                    errors.append((dotted_path, e))
+        return errors
+
+function_registry = FunctionRegistry()
+
+#-------------------------------------------------------------------------------
+def preload_functions(**kwargs):
+    return function_registry.preload()
+
+signals.warmup.connect(preload_functions)
@@ -0,0 +1,129 @@
+import random
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from swim.core.chunkstore import ChunkStore
+
+#-------------------------------------------------------------------------------
+WORDS = (
+    "swim simple web information manager page resource template menu link "
+    "copy image arrangement schema atom slot footer header section archive "
+    "event calendar blog post feed design media content type key path"
+).split()
+
+#-------------------------------------------------------------------------------
+def paragraph(rand, words=80):
+    return '<p>%s.</p>\n' % ' '.join(rand.choice(WORDS) for i in range(words))
+
+#-------------------------------------------------------------------------------
+def menu(rand, prefix, items):
+    return ''.join(
+            '<li><a href="%s/%d">%s</a></li>\n' % (prefix, i, rand.choice(WORDS).title())
+            for i in range(items)
+        )
+
+#-------------------------------------------------------------------------------
+def site_pages(pages, domains, sections):
+    """
+    Yields (key, html) for the pages of a made up site.
+
+    Every page has the same header and footer, the pages of a section share
+    its menu, and each page's body is its own.  Each domain serves every
+    page, with its name in the header.
+    """
+    rand = random.Random(0)
+    head = ''.join(
+            '<link rel="stylesheet" href="/css/%d">\n' % i for i in range(12)
+        ) + paragraph(rand, 40)
+    navigation = menu(rand, '/section', 80)
+    footer = ''.join(paragraph(rand) for i in range(12))
+    section_menus = [menu(rand, '/section/%d' % s, 30) for s in range(sections)]
+    bodies = [
+            ''.join(paragraph(rand) for i in range(15)) for p in range(pages)
+        ]
+
+    for domain in range(domains):
+        for page in range(pages):
+            html = (
+                '<!DOCTYPE html>\n<html>\n<head>\n<title>Page %d</title>\n%s'
+                '</head>\n<body>\n<h1>site%d.example.com</h1>\n<ul>\n%s</ul>\n'
+                '<ul>\n%s</ul>\n<div>\n%s</div>\n<footer>\n%s</footer>\n'
+                '</body>\n</html>\n'
+            ) % (
+                page, head, domain, navigation,
+                section_menus[page % sections], bodies[page], footer,
+            )
+            yield ('site%d.page%d' % (domain, page), html.encode('utf-8'))
+
+#-------------------------------------------------------------------------------
+def cache_size(cache):
+    return sum(len(key) + len(value) for (key, value) in cache._cache.items())
+
+#-------------------------------------------------------------------------------
+def new_cache(name):
+    return LocMemCache(name, {'OPTIONS': {'MAX_ENTRIES': 10 ** 7}, 'TIMEOUT': None})
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares storing rendered pages whole with storing them in a "
+        "ChunkStore, reporting the memory used and the time taken to read "
+        "them back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=500)
+        parser.add_argument('--domains', type=int, default=2)
+        parser.add_argument('--sections', type=int, default=10)
+        parser.add_argument('--reads', type=int, default=5)
+
+    def handle(self, *args, **options):
+        pages = list(site_pages(
+                options['pages'], options['domains'], options['sections']))
+
+        whole = new_cache('swim-benchmark-whole')
+        chunked = new_cache('swim-benchmark-chunked')
+        whole.clear()
+        chunked.clear()
+        chunks = ChunkStore(chunked)
+
+        started = time.perf_counter()
+        for (key, html) in pages:
+            whole.set(key, html)
+        whole_write = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for (key, html) in pages:
+            chunked.set(key, chunks.put(html))
+        chunked_write = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for i in range(options['reads']):
+            for (key, html) in pages:
+                whole.get(key)
+        whole_read = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for i in range(options['reads']):
+            for (key, html) in pages:
+                assert chunks.get(chunked.get(key)) == html
+        chunked_read = time.perf_counter() - started
+
+        reads = options['reads'] * len(pages)
+        whole_size = cache_size(whole)
+        chunked_size = cache_size(chunked)
+        rendered = sum(len(html) for (key, html) in pages)
+        self.stdout.write("%d pages, %.1f MB rendered" % (len(pages), rendered / 2.0 ** 20))
+        self.stdout.write("%-8s %12s %12s %12s" % ('', 'cache MB', 'write ms', 'read us'))
+        for (name, size, write, read) in (
+                ('whole', whole_size, whole_write, whole_read),
+                ('chunked', chunked_size, chunked_write, chunked_read),
+            ):
+            self.stdout.write("%-8s %12.2f %12.1f %12.1f" % (
+                    name, size / 2.0 ** 20, write * 1000, read * 10 ** 6 / reads))
+        self.stdout.write("memory saved: %.0f%%, read overhead: %.1f us per page" % (
+                100.0 * (whole_size - chunked_size) / whole_size,
+                (chunked_read - whole_read) * 10 ** 6 / reads,
+            ))
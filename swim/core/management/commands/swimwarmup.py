@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from swim.core.apps import warm_up
+from swim.core.functions import preload_functions
+
+
+class Command(BaseCommand):
+    help = "Fills the SWIM process caches and reports anything that fails to load."
+
+    def handle(self, *args, **options):
+        failures = 0
+        for (receiver, response) in warm_up(sender=self):
+            if isinstance(response, Exception):
+                failures += 1
+                self.stderr.write("%r: %s" % (receiver, response))
+            elif receiver is preload_functions:
+                for (dotted_path, error) in response:
+                    failures += 1
+                    self.stderr.write("%s: %s" % (dotted_path, error))
+
+        if failures:
+            raise CommandError("%d item(s) failed to warm up." % failures)
+        self.stdout.write("Warm up complete.")
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_auto_20180321_2015'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourcetype',
+            name='page_cache_timeout',
+            field=models.PositiveIntegerField(blank=True, help_text='\n        The number of seconds for which anonymous visitors may be served\n        a cached copy of these resources.  Leave this empty to render them\n        for every request.  Has no effect unless SWIM_PAGE_CACHE is set.\n        ', null=True),
+        ),
+        migrations.AddField(
+            model_name='resourcetype',
+            name='page_cache_vary',
+            field=models.CharField(blank=True, default='', help_text='\n        A comma separated list of the request headers, and cookies (as\n        cookie:name), which change how these resources are rendered.\n        ', max_length=255),
+        ),
+    ]
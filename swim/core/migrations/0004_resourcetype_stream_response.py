@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_resourcetype_page_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourcetype',
+            name='stream_response',
+            field=models.BooleanField(default=False, help_text="\n        Send these resources to the client while their templates are being\n        rendered, rather than once they're done.  This is meant for very\n        large pages.  Streamed pages are never stored in the page cache.\n        "),
+        ),
+    ]
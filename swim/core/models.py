@@ -1,17 +1,25 @@
 import time
 import string
+import threading
+import uuid
+from contextlib import contextmanager
+from types import MappingProxyType
 
+from django.apps import apps
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType as DjangoContentType
 from django.contrib.sites.managers import CurrentSiteManager
 from django.contrib.sites.models import Site
 from django.db import models, IntegrityError
-from django.db.models.signals import pre_delete, post_save
+from django.db.models.signals import pre_delete, post_save, post_delete
+from django.utils import timezone
 from django.utils.http import http_date
 
 import swim
 from swim.core import modelfields, string_to_key, WithRelated
+from swim.core.cache import VersionedCache, VersionStamp, PROCESS_CACHES
+from swim.core.functions import function_registry
 
 #-------------------------------------------------------------------------------
 class ModelBase(models.Model):
@@ -252,18 +260,21 @@ class Function(ModelBase):
         """
         Invoke the function represented by this row in the database.
         """
-        # TODO: This class lacks tests!
-        # Try to import the function specified by arbitrary code.
-        (module_name, function_name) = self.function.rsplit('.', 1)
-        module = __import__(module_name, globals(), locals(), [str(function_name)])
-        try:
-            arbitrary_code_function = module.__dict__[function_name]
-        except KeyError:
-            raise ImportError("Could not import %s from %s" % (function_name, module_name))
+        # The callable is imported once per worker and then cached.
+        arbitrary_code_function = function_registry.resolve(self.function)
 
         # run the function and return anything that is retured by it
         return arbitrary_code_function(*args, **kwargs)
 
+    def save(self, *args, **kwargs):
+        super(Function, self).save(*args, **kwargs)
+        function_registry.invalidate()
+
+    def delete(self, *args, **kwargs):
+        result = super(Function, self).delete(*args, **kwargs)
+        function_registry.invalidate()
+        return result
+
     def callable(self):
         return self.invoke
 
@@ -319,6 +330,59 @@ class RequestHandlerMapping(ModelBase):
         unique_together = (("path", "method", ),)
 
 
+#-------------------------------------------------------------------------------
+class RouteTable:
+    """
+    An in memory copy of every RequestHandlerMapping, keyed on path and method.
+
+    Allows swim.core.views.default to route requests, and decide on 404s and
+    405s, without consulting the database.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self, routes, constructors):
+        # routes maps path -> {method: constructor_id}
+        self.routes = routes
+        self.constructors = constructors
+
+    #---------------------------------------------------------------------------
+    def get_constructor(self, path, method):
+        """
+        Returns the RequestHandler mapped to the path and method, or None.
+        """
+        constructor_id = self.routes.get(path, {}).get(method, None)
+        if constructor_id is None:
+            return None
+        return self.constructors.get(constructor_id, None)
+
+    #---------------------------------------------------------------------------
+    def get_methods(self, path):
+        """
+        Returns a sorted list of the methods which are mapped for the path.
+        """
+        return sorted(self.routes.get(path, {}).keys())
+
+#-------------------------------------------------------------------------------
+def load_route_table():
+    routes = {}
+    mappings = RequestHandlerMapping.objects.values_list(
+            'path', 'method', 'constructor_id'
+        ).order_by()
+    for path, method, constructor_id in mappings.iterator():
+        routes.setdefault(path, {})[method] = constructor_id
+    return RouteTable(routes, RequestHandler.objects.in_bulk())
+
+route_table = VersionedCache('request_handlers', load_route_table)
+
+# update_request_handlers and delete_request_handlers (below) both save or
+# delete RequestHandlerMapping instances, so these also keep the route table
+# up to date for resources.
+post_save.connect(route_table.invalidate, sender=RequestHandlerMapping)
+post_delete.connect(route_table.invalidate, sender=RequestHandlerMapping)
+post_save.connect(route_table.invalidate, sender=RequestHandler)
+post_delete.connect(route_table.invalidate, sender=RequestHandler)
+
+
 #-------------------------------------------------------------------------------
 class ReservedPath(ModelBase):
     """
@@ -397,10 +461,11 @@ class ContentSchemaMember(ModelBase):
 
 #-------------------------------------------------------------------------------
 def resource_type_default():
-    try:
-        return ResourceType.objects.get(key='default').pk
-    except ResourceType.DoesNotExist:
-        return None
+    # Only the primary key is selected, as this is also called by migrations
+    # run before the latest ResourceType columns exist.
+    return ResourceType.objects.filter(
+            key='default'
+        ).values_list('pk', flat=True).first()
 
 #-------------------------------------------------------------------------------
 class EntityType(ModelInstancesAreContentTypes):
@@ -442,32 +507,19 @@ class EntityType(ModelInstancesAreContentTypes):
     def __str__(self):
         return self.title
 
+    #--------------------------------------------------------------------------
+    def get_compiled_schema(self):
+        """
+        Return the CompiledSchema for this type.
+        """
+        return compiled_schemas.get(self)
+
     #--------------------------------------------------------------------------
     def get_interface(self, key):
         """
         Return a cached version of the related interface element.
         """
-
-        # Use the cached one if it's available.
-        if self.content_schema_cache:
-            return self.content_schema_cache['members_key_lookup'].get(key, None)
-
-        # otherwise, try the database.
-        cache_object = swim.current_request()
-        if not cache_object:
-            cache_object = self
-
-        if not hasattr(cache_object, 'resource_type_interfaces'):
-            cache_object.resource_type_interfaces = {}
-        request_rti = cache_object.resource_type_interfaces
-        if self.id not in request_rti:
-            interfaces = {}
-            for interface in ContentSchemaMember.objects.filter(
-                        content_schema=self.content_schema,
-                    ):
-                interfaces[interface.key] = interface
-            request_rti[self.id] = interfaces
-        return content_schema_member_to_dict(request_rti[self.id][key])
+        return compiled_schemas.get(self).get(key)
 
 
 #-------------------------------------------------------------------------------
@@ -505,6 +557,120 @@ def content_schema_to_dict(content_schema):
     return schema_cache
 
 
+#-------------------------------------------------------------------------------
+class CompiledSchema:
+    """
+    An immutable, ready to use version of a content schema.
+
+    attributes:
+    title
+        The title of the content schema.
+    revision
+        The revision of the content_schema_cache this was compiled from.
+    members
+        A tuple of the members, in order.  Each member is a read only dict
+        like the ones produced by content_schema_member_to_dict.
+    lookup
+        A read only dict of the members by key.
+    list_keys
+        The keys of the members whose cardinality is 'list'.
+    swim_content_types
+        The titles of the swim content types used by the members.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self, schema_cache=None, revision=None):
+        schema_cache = schema_cache or {}
+        self.title = schema_cache.get('title')
+        self.revision = revision
+        self.members = tuple(
+                MappingProxyType(dict(member))
+                for member in schema_cache.get('members_list', ())
+            )
+        self.lookup = MappingProxyType(
+                dict((member['key'], member) for member in self.members)
+            )
+        self.list_keys = frozenset(
+                member['key'] for member in self.members
+                if member['cardinality'] == 'list'
+            )
+        self.swim_content_types = frozenset(
+                member['swim_content_type'] for member in self.members
+            )
+
+    #---------------------------------------------------------------------------
+    def get(self, key, default=None):
+        return self.lookup.get(key, default)
+
+    #---------------------------------------------------------------------------
+    def is_list(self, key):
+        return key in self.list_keys
+
+
+#-------------------------------------------------------------------------------
+class CompiledSchemaRegistry:
+    """
+    The CompiledSchema of every EntityType, shared by the whole process.
+
+    Each content_schema_cache is stamped with a revision when it is rebuilt
+    by update_content_schema_cache, so a compiled schema is reused for as
+    long as the revision of the EntityType in hand matches it.  The schemas
+    can also be looked up by id alone, in which case they are only trusted
+    until the stamp (which is bumped alongside the revisions) changes.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self):
+        self.stamp = VersionStamp('content_schemas')
+        self._lock = threading.Lock()
+        self.reset()
+        PROCESS_CACHES.append(self)
+
+    #---------------------------------------------------------------------------
+    def reset(self):
+        self._state = (None, {})
+
+    #---------------------------------------------------------------------------
+    def _get_schemas(self):
+        version = self.stamp.get()
+        loaded_version, schemas = self._state
+        if loaded_version != version:
+            with self._lock:
+                loaded_version, schemas = self._state
+                if loaded_version != version:
+                    schemas = {}
+                    self._state = (version, schemas)
+        return schemas
+
+    #---------------------------------------------------------------------------
+    def get(self, entity_type):
+        schemas = self._get_schemas()
+        schema_cache = entity_type.content_schema_cache
+        revision = schema_cache.get('revision') if schema_cache else None
+
+        compiled = schemas.get(entity_type.id)
+        if compiled is None or compiled.revision != revision:
+            if not schema_cache and entity_type.content_schema_id:
+                # The cache hasn't been built for this type yet.
+                schema_cache = content_schema_to_dict(entity_type.content_schema)
+            compiled = CompiledSchema(schema_cache, revision)
+            schemas[entity_type.id] = compiled
+        return compiled
+
+    #---------------------------------------------------------------------------
+    def get_by_id(self, entity_type_id):
+        """
+        Returns the compiled schema for the id, or None if it isn't loaded.
+        """
+        return self._get_schemas().get(entity_type_id)
+
+    #---------------------------------------------------------------------------
+    def invalidate(self):
+        self.reset()
+        self.stamp.bump()
+
+compiled_schemas = CompiledSchemaRegistry()
+
 #-------------------------------------------------------------------------------
 def update_content_schema_cache(sender, instance, **kwargs):
 
@@ -526,12 +692,34 @@ def update_content_schema_cache(sender, instance, **kwargs):
     entity_type_ids = [et.id for et in content_schema.entitytype_set.all()]
 
     schema_cache = content_schema_to_dict(content_schema)
+    schema_cache['revision'] = uuid.uuid4().hex
 
     EntityType.objects.filter(id__in=entity_type_ids).update(
             content_schema_cache=schema_cache
         )
+    if isinstance(instance, EntityType):
+        instance.content_schema_cache = schema_cache
+    compiled_schemas.invalidate()
 
-post_save.connect(update_content_schema_cache)
+#-------------------------------------------------------------------------------
+def get_entity_interface(instance, type_field_name, key):
+    """
+    Return the interface element for key from the schema of instance's type.
+
+    The type is only loaded from the database if neither it, nor its
+    compiled schema, have been loaded already.
+    """
+    field = instance._meta.get_field(type_field_name)
+    compiled = None
+    if not field.is_cached(instance):
+        compiled = compiled_schemas.get_by_id(getattr(instance, field.attname))
+
+    if compiled is None:
+        entity_type = getattr(instance, type_field_name)
+        if entity_type is None:
+            return None
+        compiled = compiled_schemas.get(entity_type)
+    return compiled.get(key)
 
 #-------------------------------------------------------------------------------
 class ArrangementType(EntityType):
@@ -588,19 +776,7 @@ class HasArrangementType(ModelIsContentType):
     #---------------------------------------------------------------------------
     def get_interface(self, key):
         """Utility function that allows for cached retrieval of interfaces."""
-        # The fact that this uses a request object is a bit wierd.
-        # TODO: move this somewhere else.
-        cache_object = swim.current_request()
-        if not cache_object:
-            cache_object = self
-
-        types = getattr(cache_object, 'arrangement_types', {})
-        cache_object.arrangement_types = types
-
-        at = types.get(self.arrangement_type_id, None)
-        if not at: at = self.arrangement_type
-        types[at.id] = at
-        return at.get_interface(key)
+        return get_entity_interface(self, 'arrangement_type', key)
 
     class Meta:
         abstract = True
@@ -613,6 +789,12 @@ class ResourceType(EntityType):
     attributes:
     parent
         Creates a hierarchy of ResourceTypes which inherit their mappings.
+    page_cache_timeout
+        How long the full page cache may keep these resources, if at all.
+    page_cache_vary
+        The request inputs, besides the url, which the cached pages vary on.
+    stream_response
+        Send these resources to the client while they are being rendered.
     """
 
     parent = models.ForeignKey(
@@ -623,36 +805,53 @@ class ResourceType(EntityType):
         on_delete=models.CASCADE
     )
 
+    page_cache_timeout = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text="""
+        The number of seconds for which anonymous visitors may be served
+        a cached copy of these resources.  Leave this empty to render them
+        for every request.  Has no effect unless SWIM_PAGE_CACHE is set.
+        """,
+    )
+    page_cache_vary = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        help_text="""
+        A comma separated list of the request headers, and cookies (as
+        cookie:name), which change how these resources are rendered.
+        """,
+    )
+    stream_response = models.BooleanField(
+        default=False,
+        help_text="""
+        Send these resources to the client while their templates are being
+        rendered, rather than once they're done.  This is meant for very
+        large pages.  Streamed pages are never stored in the page cache.
+        """,
+    )
+
 
     #--------------------------------------------------------------------------
     def get_middleware(self):
         """Return middleware for this resource type.
 
-        Include parent middleware.
+        Include parent middleware.  See: FunctionChains
         """
-        my_middleware = list(ResourceTypeMiddlewareMapping.objects.filter(
-            resource_type = self,
-        ))
-        parent_middleware = []
-        if self.parent:
-            parent_middleware = self.parent.get_middleware()
-
-        return my_middleware + parent_middleware
+        return list(function_chains.get().get_middleware(self.id))
 
     #--------------------------------------------------------------------------
     def get_response_processors(self):
         """Return response processors for this resource type.
 
-        Include parent response processors.
+        Include parent response processors.  See: FunctionChains
         """
-        my_response_processors = list(ResourceTypeResponseProcessorMapping.objects.filter(
-            resource_type = self,
-        ))
-        parent_response_processors = []
-        if self.parent:
-            parent_response_processors = self.parent.get_response_processors()
+        return list(function_chains.get().get_response_processors(self.id))
 
-        return my_response_processors + parent_response_processors
+    #--------------------------------------------------------------------------
+    def get_page_cache_vary(self):
+        return [name.strip() for name in self.page_cache_vary.split(',') if name.strip()]
 
     #--------------------------------------------------------------------------
     class Meta:
@@ -744,6 +943,9 @@ class ResourceTypeMiddleware(Function):
     resource - The SWIM resource object that was matched for the request
     template - The SWIM template object that was matched for the request
     The return value is ignored.
+
+    Pages are only given an ETag when each of their middleware functions
+    describes what it adds, see PageView.get_middleware_stamps.
     """
 
 #-------------------------------------------------------------------------------
@@ -762,6 +964,71 @@ class ResourceTypeMiddlewareMapping(ModelBase):
         unique_together = (("resource_type", "function", ),)
 
 
+#-------------------------------------------------------------------------------
+class FunctionChains:
+    """
+    An in memory copy of the middleware and response processors of every
+    ResourceType, in the order they run: the resource type's own followed
+    by those of each of its parents in turn.
+
+    Allows swim.content.views to run them without consulting the database.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self, middleware, response_processors):
+        # Both map resource_type_id -> [mapping, ...]
+        self.middleware = middleware
+        self.response_processors = response_processors
+
+    #---------------------------------------------------------------------------
+    def get_middleware(self, resource_type_id):
+        return self.middleware.get(resource_type_id, ())
+
+    #---------------------------------------------------------------------------
+    def get_response_processors(self, resource_type_id):
+        return self.response_processors.get(resource_type_id, ())
+
+#-------------------------------------------------------------------------------
+def flatten_function_chains(parents, mapping_model):
+    own = {}
+    for mapping in mapping_model.objects.select_related('function').order_by('id'):
+        own.setdefault(mapping.resource_type_id, []).append(mapping)
+
+    chains = {}
+    for resource_type_id in parents:
+        chain = []
+        seen = set()
+        current = resource_type_id
+        # A broken hierarchy which loops is only followed once around.
+        while current is not None and current not in seen:
+            seen.add(current)
+            chain.extend(own.get(current, ()))
+            current = parents.get(current)
+        chains[resource_type_id] = chain
+    return chains
+
+#-------------------------------------------------------------------------------
+def load_function_chains():
+    parents = dict(ResourceType.objects.values_list('id', 'parent_id').order_by())
+    return FunctionChains(
+            flatten_function_chains(parents, ResourceTypeMiddlewareMapping),
+            flatten_function_chains(parents, ResourceTypeResponseProcessorMapping),
+        )
+
+function_chains = VersionedCache('function_chains', load_function_chains)
+
+for model in (
+        ResourceType,
+        ResourceTypeMiddlewareMapping,
+        ResourceTypeResponseProcessorMapping,
+        Function,
+        ResourceTypeMiddleware,
+        ResourceTypeResponseProcessor,
+    ):
+    post_save.connect(function_chains.invalidate, sender=model)
+    post_delete.connect(function_chains.invalidate, sender=model)
+
+
 #-------------------------------------------------------------------------------
 class HasResourceType(ModelIsContentType):
     """A mixin that allows this type to have a resource type.
@@ -787,19 +1054,7 @@ class HasResourceType(ModelIsContentType):
         Utility function that allows for cached retrieval of interfaces.
 
         """
-        # The fact that this uses a request object is a bit wierd.
-        # TODO: move this somewhere else.
-        cache_object = swim.current_request()
-        if not cache_object:
-            cache_object = self
-
-        types = getattr(cache_object, 'types', {})
-
-        rt = types.get(self.resource_type_id, None)
-        if not rt:
-            rt = self.resource_type
-            types[rt.id] = rt
-        return rt.get_interface(key)
+        return get_entity_interface(self, 'resource_type', key)
 
     #---------------------------------------------------------------------------
     def get_default_type(self):
@@ -892,63 +1147,240 @@ class HasRequestHandler(models.Model):
     class Meta:
         abstract = True
 
+#-------------------------------------------------------------------------------
+def normalize_path(url):
+    """
+    Returns url the way the Path model field will store it.
+    """
+    return "/%s" % (url.strip("/").lower(),)
+
+#-------------------------------------------------------------------------------
+class DeferredBookkeeping(threading.local):
+    """
+    The HasRequestHandler instances saved within swim.core.bulk_writes.
+
+    Their request handlers and path reservations are brought up to date
+    together when the outermost block exits.
+
+    attributes:
+    depth
+        How many bulk_writes blocks are currently open in this thread.
+    pending
+        The saved instances, keyed on (model, primary key).
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self):
+        self.depth = 0
+        self.pending = {}
+
+    #---------------------------------------------------------------------------
+    def defer(self, instance):
+        self.pending[(type(instance), instance.pk)] = instance
+
+    #---------------------------------------------------------------------------
+    def discard(self, instance):
+        self.pending.pop((type(instance), instance.pk), None)
+
+deferred_bookkeeping = DeferredBookkeeping()
+
+#-------------------------------------------------------------------------------
+@contextmanager
+def bulk_writes():
+    """
+    Put off the request handler and path reservation updates for every
+    HasRequestHandler saved within the block.
+
+    When the outermost block exits cleanly they are all done at once, with
+    a few queries per model rather than several per save.  If the block
+    raises they are dropped, so it should be used within transaction.atomic.
+    """
+    deferred_bookkeeping.depth += 1
+    succeeded = False
+    try:
+        yield
+        succeeded = True
+    finally:
+        deferred_bookkeeping.depth -= 1
+        if not deferred_bookkeeping.depth:
+            pending = deferred_bookkeeping.pending
+            deferred_bookkeeping.pending = {}
+            if succeeded and pending:
+                update_bookkeeping(pending.values())
+
+#-------------------------------------------------------------------------------
+def first_by_object_id(queryset, object_ids, batch_size=500):
+    """
+    Returns the first row in queryset for each of object_ids, by object_id.
+    """
+    object_ids = list(object_ids)
+    rows = {}
+    for i in range(0, len(object_ids), batch_size):
+        batch = queryset.filter(object_id__in=object_ids[i:i + batch_size])
+        for row in batch.order_by('id'):
+            rows.setdefault(row.object_id, row)
+    return rows
+
+#-------------------------------------------------------------------------------
+def update_bookkeeping(instances):
+    """
+    Create or update the request handler and path reservation of each of
+    the given HasRequestHandler instances using bulk queries.
+    """
+    by_model = {}
+    for instance in instances:
+        by_model.setdefault(instance._meta.concrete_model, []).append(instance)
+
+    now = timezone.now()
+    for (model, model_instances) in by_model.items():
+        django_content_type = DjangoContentType.objects.get_for_model(model)
+        object_ids = [instance.pk for instance in model_instances]
+        mappings = first_by_object_id(
+                RequestHandlerMapping.objects.filter(
+                    django_content_type=django_content_type
+                ),
+                object_ids
+            )
+        reservations = first_by_object_id(
+                ReservedPath.objects.filter(
+                    django_content_type=django_content_type
+                ),
+                object_ids
+            )
+
+        # Every request handler in SWIM is the same for all of the instances
+        # of a model, so it is only looked up once.
+        request_handler = None
+        (new_mappings, changed_mappings) = ([], [])
+        (new_reservations, changed_reservations) = ([], [])
+        for instance in model_instances:
+            path = normalize_path(instance.url())
+
+            mapping = mappings.get(instance.pk)
+            if mapping is None:
+                if request_handler is None:
+                    request_handler = instance.get_request_handler()
+                new_mappings.append(RequestHandlerMapping(
+                        django_content_type=django_content_type,
+                        object_id=instance.pk,
+                        path=path,
+                        method=instance.get_request_method().upper(),
+                        constructor=request_handler,
+                    ))
+            elif mapping.path != path:
+                mapping.path = path
+                mapping.modifieddate = now
+                changed_mappings.append(mapping)
+
+            reservation = reservations.get(instance.pk)
+            if reservation is None:
+                new_reservations.append(ReservedPath(
+                        django_content_type=django_content_type,
+                        object_id=instance.pk,
+                        path=path,
+                        reservation_type=instance.get_path_reservation_type(),
+                    ))
+            elif reservation.path != path:
+                reservation.path = path
+                reservation.modifieddate = now
+                changed_reservations.append(reservation)
+
+        RequestHandlerMapping.objects.bulk_update(
+                changed_mappings, ['path', 'modifieddate']
+            )
+        RequestHandlerMapping.objects.bulk_create(new_mappings)
+        ReservedPath.objects.bulk_update(
+                changed_reservations, ['path', 'modifieddate']
+            )
+        ReservedPath.objects.bulk_create(new_reservations)
+
+    # The bulk queries don't send any signals.
+    route_table.invalidate()
+
 #-------------------------------------------------------------------------------
 def update_request_handlers(sender, instance, **kwargs):
-    if not isinstance(instance, HasRequestHandler):
+    if deferred_bookkeeping.depth:
+        deferred_bookkeeping.defer(instance)
         return
-    path = "/%s" % (instance.url().strip("/"),)
+    path = normalize_path(instance.url())
 
-    if instance.request_handler_mappings.count() == 0:
-        request_handler = RequestHandlerMapping.objects.create(
+    mappings = list(instance.request_handler_mappings.all()[:1])
+    if not mappings:
+        RequestHandlerMapping.objects.create(
                 content_object=instance,
                 path=path,
                 method=instance.get_request_method(),
                 constructor=instance.get_request_handler()
             )
-    else:
-        request_handler = instance.request_handler_mappings.all()[0]
-
-    # We need to ensure that if our path changes that we
-    # keep our request handlers updated.
-    request_handler.path = path
-    request_handler.save()
-
-post_save.connect(update_request_handlers)
+    elif mappings[0].path != path:
+        # We need to ensure that if our path changes that we
+        # keep our request handlers updated.
+        mappings[0].path = path
+        mappings[0].save()
 
 #-------------------------------------------------------------------------------
 def update_path_reservations(sender, instance, **kwargs):
-    if not isinstance(instance, HasRequestHandler):
+    if deferred_bookkeeping.depth:
+        deferred_bookkeeping.defer(instance)
         return
-    path = "/%s" % (instance.url().strip("/"),)
-    if instance.reserved_paths.count() == 0:
-        reserved_path = ReservedPath(
+    path = normalize_path(instance.url())
+
+    reservations = list(instance.reserved_paths.all()[:1])
+    if not reservations:
+        ReservedPath.objects.create(
                 path=path,
                 content_object=instance,
                 reservation_type=instance.get_path_reservation_type()
             )
-    else:
-        reserved_path = instance.reserved_paths.all()[0]
-
-    # We need to ensure that if our path changes that we
-    # keep our reservations updated.
-    reserved_path.path = path
-    reserved_path.save()
-post_save.connect(update_path_reservations)
+    elif reservations[0].path != path:
+        # We need to ensure that if our path changes that we
+        # keep our reservations updated.
+        reservations[0].path = path
+        reservations[0].save()
 
 #-------------------------------------------------------------------------------
 def delete_request_handlers(sender, instance, **kwargs):
-    if not isinstance(instance, HasRequestHandler):
-        return
+    deferred_bookkeeping.discard(instance)
     instance.request_handler_mappings.all().delete()
-pre_delete.connect(delete_request_handlers)
 
 #-------------------------------------------------------------------------------
 def delete_path_reservations(sender, instance, **kwargs):
-    if not isinstance(instance, HasRequestHandler):
-        return
+    deferred_bookkeeping.discard(instance)
     # Delete all of my reserved paths!
     instance.reserved_paths.all().delete()
-pre_delete.connect(delete_path_reservations)
+
+#-------------------------------------------------------------------------------
+def connect_bookkeeping_receivers():
+    """
+    Connect the receivers above, and update_content_schema_cache, to the
+    models they look after rather than to every model in the project.
+
+    Called once the app registry is ready, because most of those models
+    live in other apps.
+    """
+    for model in apps.get_models():
+        if issubclass(model, HasRequestHandler):
+            post_save.connect(
+                    update_request_handlers, sender=model,
+                    dispatch_uid='swim.core.update_request_handlers'
+                )
+            post_save.connect(
+                    update_path_reservations, sender=model,
+                    dispatch_uid='swim.core.update_path_reservations'
+                )
+            pre_delete.connect(
+                    delete_request_handlers, sender=model,
+                    dispatch_uid='swim.core.delete_request_handlers'
+                )
+            pre_delete.connect(
+                    delete_path_reservations, sender=model,
+                    dispatch_uid='swim.core.delete_path_reservations'
+                )
+        if issubclass(model, (EntityType, ContentSchema, ContentSchemaMember)):
+            post_save.connect(
+                    update_content_schema_cache, sender=model,
+                    dispatch_uid='swim.core.update_content_schema_cache'
+                )
 
 
 #-------------------------------------------------------------------------------
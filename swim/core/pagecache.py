@@ -0,0 +1,368 @@
+"""
+A full page cache for the resources rendered by SWIM.
+
+Enabled by setting SWIM_PAGE_CACHE to the name of a django cache, and then
+turned on for each ResourceType by giving it a page_cache_timeout.  Only
+anonymous GET and HEAD requests are served from, or stored in, the cache.
+
+While a cacheable page is being rendered every row that is loaded, and
+every model that is listed, is recorded as a dependency of the page.  Each
+dependency is a tag with a version kept in the cache, and saving or deleting
+a row bumps the versions of its tags.  A page is stored with the version
+each tag had when it was first recorded, so anything changed while the page
+was being rendered leaves it out of date.  A cached page is only served
+while the versions of all of its tags are the ones it was stored with, so a
+change evicts exactly the pages which used what changed.
+
+Slots and other generic relations change the object they belong to.  Rows
+which aren't content, and are listed through a related manager of a row the
+page loaded, such as the links of a menu, are recorded with
+record_related(), which saving or deleting any of them evicts.
+
+Unless SWIM_PAGE_CACHE_CHUNKS is False, the content of the pages is stored
+through a ChunkStore, so the parts which many pages share (their headers,
+menus and footers) are only stored once.  See swim.core.chunkstore.
+
+Middleware and response processors run when the page is rendered and not
+when it is served from the cache.  They can call mark_uncacheable(request)
+to keep a response out of the cache, and must do so when they set anything
+on it, such as a cookie, which differs between visitors.
+"""
+import contextlib
+import copy
+import hashlib
+import threading
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType as DjangoContentType
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+
+import swim
+from swim.core.chunkstore import ChunkStore
+
+#-------------------------------------------------------------------------------
+def model_tag(model):
+    """
+    The tag for pages which list the rows of model.
+    """
+    return 'model.%d' % DjangoContentType.objects.get_for_model(model).id
+
+#-------------------------------------------------------------------------------
+def object_tag(model, pk):
+    """
+    The tag for pages which use the row of model with the given primary key.
+    """
+    return 'object.%d.%s' % (DjangoContentType.objects.get_for_model(model).id, pk)
+
+#-------------------------------------------------------------------------------
+def related_tag(model, pk, related_model):
+    """
+    The tag for pages which list the rows of related_model which point to
+    the row of model with the given primary key.
+    """
+    return 'related.%d.%s.%d' % (
+            DjangoContentType.objects.get_for_model(model).id,
+            pk,
+            DjangoContentType.objects.get_for_model(related_model).id,
+        )
+
+#-------------------------------------------------------------------------------
+_collecting = threading.local()
+
+#-------------------------------------------------------------------------------
+def start_recording(request):
+    request._swim_page_dependencies = {}
+
+#-------------------------------------------------------------------------------
+def current_dependencies():
+    """
+    The dict of tag to version the dependencies being recorded are added
+    to, or None.
+    """
+    collected = getattr(_collecting, 'dependencies', None)
+    if collected is not None:
+        return collected
+    return getattr(swim.current_request(), '_swim_page_dependencies', None)
+
+#-------------------------------------------------------------------------------
+@contextlib.contextmanager
+def collect_dependencies():
+    """
+    Collects the dependencies recorded within the block into the dict of
+    tag to version it yields, rather than into those of the page being
+    rendered.  For things which are loaded once and then used by many pages,
+    which pass the collected versions to record_versions themselves.
+    """
+    if not page_cache.enabled():
+        yield {}
+        return
+
+    previous = getattr(_collecting, 'dependencies', None)
+    _collecting.dependencies = {}
+    try:
+        yield _collecting.dependencies
+    finally:
+        _collecting.dependencies = previous
+
+#-------------------------------------------------------------------------------
+def record_dependencies(*tags):
+    """
+    Add the tags to the dependencies of the page being rendered, if any.
+
+    Their versions are read when they're first recorded, before the page
+    uses what they stand for, so that a change made while it is rendered
+    isn't stored under the new versions.
+    """
+    dependencies = current_dependencies()
+    if dependencies is None:
+        return
+    tags = [tag for tag in tags if tag not in dependencies]
+    if tags:
+        dependencies.update(page_cache.get_versions(tags))
+
+#-------------------------------------------------------------------------------
+def record_versions(versions):
+    """
+    Add the tags yielded by collect_dependencies to the dependencies of the
+    page being rendered, with the versions they had when they were collected.
+    """
+    dependencies = current_dependencies()
+    if dependencies is not None:
+        for (tag, version) in versions.items():
+            dependencies.setdefault(tag, version)
+
+#-------------------------------------------------------------------------------
+def record_model(model):
+    if current_dependencies() is not None:
+        record_dependencies(model_tag(model))
+
+#-------------------------------------------------------------------------------
+def record_related(instance, related_model):
+    """
+    Record that the page lists the rows of related_model which point to
+    instance, through a related manager.
+    """
+    if current_dependencies() is not None and instance.pk is not None:
+        record_dependencies(related_tag(type(instance), instance.pk, related_model))
+
+#-------------------------------------------------------------------------------
+def mark_uncacheable(request):
+    """
+    Keep the response to this request out of the page cache.
+    """
+    request._swim_page_uncacheable = True
+
+#-------------------------------------------------------------------------------
+def cache_key(request, http_content_type, vary):
+    """
+    Returns the cache key for a page.
+
+    vary
+        A list of the other inputs that change the page.  Each is either the
+        name of a request header, or cookie:<name> for a cookie.
+    """
+    parts = [
+        request.scheme,
+        request.get_host(),
+        request.path,
+        request.META.get('QUERY_STRING', ''),
+        http_content_type,
+    ]
+    for name in vary:
+        if name.lower().startswith('cookie:'):
+            parts.append(request.COOKIES.get(name[7:], ''))
+        else:
+            meta_name = 'HTTP_%s' % name.upper().replace('-', '_')
+            parts.append(request.META.get(meta_name, ''))
+    digest = hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+    return 'swim.page.%s' % digest
+
+
+#-------------------------------------------------------------------------------
+class PageCache:
+    """
+    Stores rendered responses along with the versions of their tags.
+    """
+
+    #---------------------------------------------------------------------------
+    def enabled(self):
+        return bool(getattr(settings, 'SWIM_PAGE_CACHE', None))
+
+    #---------------------------------------------------------------------------
+    def get_cache(self):
+        return caches[settings.SWIM_PAGE_CACHE]
+
+    #---------------------------------------------------------------------------
+    def tag_key(self, tag):
+        return 'swim.page.tag.%s' % tag
+
+    #---------------------------------------------------------------------------
+    def get_chunks(self):
+        """
+        Returns the ChunkStore the content of the pages is kept in, or None
+        when they're stored whole.
+        """
+        if not getattr(settings, 'SWIM_PAGE_CACHE_CHUNKS', True):
+            return None
+        return ChunkStore(
+                self.get_cache(),
+                timeout=getattr(settings, 'SWIM_PAGE_CACHE_CHUNK_TIMEOUT', 86400),
+                prefix='swim.page.chunk',
+            )
+
+    #---------------------------------------------------------------------------
+    def get(self, key):
+        """
+        Returns the cached response for key, or None.
+        """
+        cache = self.get_cache()
+        entry = cache.get(key)
+        if entry is None:
+            return None
+
+        (tag_versions, response, manifest) = entry
+        current = cache.get_many([self.tag_key(tag) for tag in tag_versions])
+        for (tag, version) in tag_versions.items():
+            if current.get(self.tag_key(tag)) != version:
+                self.delete(key, entry)
+                return None
+
+        if manifest is not None:
+            chunks = self.get_chunks()
+            content = chunks.get(manifest) if chunks else None
+            if content is None:
+                self.delete(key, entry)
+                return None
+            response.content = content
+        return response
+
+    #---------------------------------------------------------------------------
+    def get_versions(self, tags):
+        """
+        Returns a dict of tag to its current version, giving the tags which
+        don't have one yet a version.
+        """
+        cache = self.get_cache()
+        tag_keys = dict((self.tag_key(tag), tag) for tag in tags)
+        current = cache.get_many(list(tag_keys))
+
+        tag_versions = {}
+        for (tag_key, tag) in tag_keys.items():
+            version = current.get(tag_key)
+            if version is None:
+                version = uuid.uuid4().hex
+                if not cache.add(tag_key, version, None):
+                    version = cache.get(tag_key, version)
+            tag_versions[tag] = version
+        return tag_versions
+
+    #---------------------------------------------------------------------------
+    def set(self, key, response, tag_versions, timeout):
+        """
+        Stores response under key, along with the versions of the tags it
+        depends on, as they were recorded while it was rendered.
+        """
+        cache = self.get_cache()
+
+        manifest = None
+        chunks = self.get_chunks()
+        if chunks is not None:
+            manifest = chunks.put(response.content)
+            response = copy.copy(response)
+            response.content = b''
+
+        previous = cache.get(key)
+        cache.set(key, (tag_versions, response, manifest), timeout)
+        if previous is not None:
+            self.release(previous)
+
+    #---------------------------------------------------------------------------
+    def delete(self, key, entry):
+        self.get_cache().delete(key)
+        self.release(entry)
+
+    #---------------------------------------------------------------------------
+    def release(self, entry):
+        manifest = entry[2]
+        chunks = self.get_chunks()
+        if manifest is not None and chunks is not None:
+            chunks.release(manifest)
+
+    #---------------------------------------------------------------------------
+    def bump(self, *tags):
+        """
+        Evict every page which depends on any of the tags.
+        """
+        def set_versions():
+            self.get_cache().set_many(
+                    dict((self.tag_key(tag), uuid.uuid4().hex) for tag in tags),
+                    None
+                )
+        set_versions()
+
+        # A page rendered before the transaction commits could be stored
+        # with the new versions and the old rows.
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(set_versions)
+
+page_cache = PageCache()
+
+#-------------------------------------------------------------------------------
+def instance_loaded(sender, instance, **kwargs):
+    if current_dependencies() is not None and instance.pk is not None:
+        record_dependencies(object_tag(sender, instance.pk))
+
+#-------------------------------------------------------------------------------
+def instance_changed(sender, instance, **kwargs):
+    if not page_cache.enabled():
+        return
+    tags = [model_tag(sender), object_tag(sender, instance.pk)]
+
+    # Slots and other generic relations change the object they belong to.
+    django_content_type_id = getattr(instance, 'django_content_type_id', None)
+    object_id = getattr(instance, 'object_id', None)
+    if django_content_type_id and object_id:
+        tags.append('object.%d.%s' % (django_content_type_id, object_id))
+
+    # Only the pages which listed it through the rows it points to, with
+    # record_related, rather than every page using those rows.
+    for field in sender._meta.concrete_fields:
+        if field.many_to_one or field.one_to_one:
+            value = getattr(instance, field.attname)
+            if value is not None:
+                tags.append(related_tag(field.related_model, value, sender))
+    page_cache.bump(*tags)
+
+#-------------------------------------------------------------------------------
+IGNORED_APPS = ('admin', 'contenttypes', 'sessions')
+
+#-------------------------------------------------------------------------------
+def connect_page_cache_receivers():
+    """
+    Track the loading and saving of the rows of every model in the project,
+    apart from the bookkeeping ones which pages don't display.
+
+    Does nothing unless the page cache is enabled.
+    """
+    if not page_cache.enabled():
+        return
+
+    for model in apps.get_models():
+        if model._meta.app_label in IGNORED_APPS:
+            continue
+        post_init.connect(
+                instance_loaded, sender=model,
+                dispatch_uid='swim.core.pagecache.instance_loaded'
+            )
+        post_save.connect(
+                instance_changed, sender=model,
+                dispatch_uid='swim.core.pagecache.instance_changed'
+            )
+        post_delete.connect(
+                instance_changed, sender=model,
+                dispatch_uid='swim.core.pagecache.instance_changed'
+            )
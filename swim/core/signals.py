@@ -2,3 +2,8 @@ import django.dispatch
 
 initialswimdata = django.dispatch.Signal()
 
+
+# Sent once per worker before the first request is handled (or by the
+# swimwarmup management command) so that process caches can be filled ahead
+# of time.
+warmup = django.dispatch.Signal()
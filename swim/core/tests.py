@@ -1,6 +1,7 @@
 import os
 import traceback
 
+from django.contrib.contenttypes.models import ContentType as DjangoContentType
 from django.http import HttpResponse
 from django.core.exceptions import ValidationError
 from django.test import override_settings
@@ -8,15 +9,18 @@ from django.utils.encoding import smart_bytes
 
 import swim
 from swim.test import TestCase
-from swim.core import is_subpath_on_path
+from swim.core import checks, models, timing
+from swim.core import is_subpath_on_path, get_object_by_path, PathTrie
 from swim.core.paginator import DualPaginator
 from swim.core.http import HeaderElement, AcceptElement
 from swim.core.validators import isAlphaNumericURL
+from swim.core.functions import function_registry
 
 from swim.core.models import (
     ResourceType,
     RequestHandlerMapping,
     RequestHandler,
+    route_table,
 )
 
 #-------------------------------------------------------------------------------
@@ -94,6 +98,61 @@ class RequestHandlerTests(TestCase):
                         )
                     )
 
+    def test_route_table_is_kept_up_to_date(self):
+        GETHandlerFunction = RequestHandler.objects.create(
+            title = 'GET Handler',
+            function = 'swim.core.tests.GETHandler',
+        )
+
+        # Once loaded, the route table answers without the database.
+        route_table.get()
+        with self.assertNumQueries(0):
+            routes = route_table.get()
+            self.assertEqual(None, routes.get_constructor('/routed', 'GET'))
+            self.assertEqual([], routes.get_methods('/routed'))
+
+        mapping = RequestHandlerMapping.objects.create(
+            content_object = GETHandlerFunction,
+            path='/routed',
+            method='GET',
+            constructor = GETHandlerFunction,
+        )
+        routes = route_table.get()
+        self.assertEqual(
+                GETHandlerFunction, routes.get_constructor('/routed', 'GET'))
+        self.assertEqual(None, routes.get_constructor('/routed', 'POST'))
+        self.assertEqual(['GET'], routes.get_methods('/routed'))
+
+        mapping.delete()
+        routes = route_table.get()
+        self.assertEqual(None, routes.get_constructor('/routed', 'GET'))
+        self.assertEqual([], routes.get_methods('/routed'))
+
+    def test_function_registry_resolves_once(self):
+        handler = RequestHandler.objects.create(
+            title = 'GET Handler',
+            function = 'swim.core.tests.GETHandler',
+        )
+        self.assertEqual([], function_registry.preload())
+        self.assertTrue(isinstance(handler.invoke(), GETHandler))
+
+        # Saving the row throws away the resolved callables.
+        handler.function = 'swim.core.tests.POSTHandler'
+        handler.save()
+        self.assertTrue(isinstance(handler.invoke(), POSTHandler))
+
+        # Import errors are reported by preload rather than mid request.
+        RequestHandler.objects.create(
+            title = 'Missing Handler',
+            function = 'swim.core.tests.MissingHandler',
+        )
+        errors = function_registry.preload()
+        self.assertEqual(
+                ['swim.core.tests.MissingHandler'],
+                [dotted_path for (dotted_path, error) in errors]
+            )
+        self.assertTrue(isinstance(errors[0][1], ImportError))
+
     def test_admin_without_slash_redirection(self):
         response = self.client.get("/admin")
 
@@ -122,6 +181,60 @@ class SubpathOnPathTests(TestCase):
         self.assertFalse(is_subpath_on_path('/art', '/artisan/foo/bar'))
         self.assertFalse(is_subpath_on_path('/art/', '/artisan/foo/bar'))
 
+#-------------------------------------------------------------------------------
+class PathTrieTests(TestCase):
+    """A bundle of tests for the PathTrie
+    """
+
+    def test_longest_prefix(self):
+        trie = PathTrie([('/art', 'art'), ('/art/foo', 'foo')])
+        self.assertEqual('foo', trie.longest_prefix('/art/foo/bar'))
+        self.assertEqual('foo', trie.longest_prefix('/art/foo/'))
+        self.assertEqual('art', trie.longest_prefix('/art/bar'))
+        self.assertEqual(None, trie.longest_prefix('/artisan'))
+        self.assertEqual(None, trie.longest_prefix('/'))
+
+        trie.add('/', 'root')
+        self.assertEqual('root', trie.longest_prefix('/artisan'))
+        self.assertEqual('root', trie.longest_prefix('/'))
+
+        # The trie agrees with get_object_by_path
+        for path in ('/art/foo/bar', '/art/bar', '/artisan', '/'):
+            self.assertEqual(
+                    trie.longest_prefix(path),
+                    get_object_by_path(trie.get, path, KeyError)
+                )
+
+#-------------------------------------------------------------------------------
+class AtomAccessorAttachmentTests(TestCase):
+
+    def test_accessors_are_attached_once(self):
+        from swim.core.content import REGISTRATION_TIMINGS, CONTENT_ATOM_METADATA
+        from swim.content.models import Page
+
+        self.assertEqual(1, REGISTRATION_TIMINGS['attach_content_atom_accessors'][0])
+        self.assertEqual(
+                sorted(CONTENT_ATOM_METADATA.keys()),
+                sorted(accessor.attr_name for accessor in Page._atom_accessors)
+            )
+
+    def test_warm_up_content_types(self):
+        from swim.core.content import warm_up_content_types
+        from swim.content.models import Page, CopySlot
+
+        CopySlot.swim_content_type()
+        models.CONTENT_TYPE_CACHE.clear()
+        DjangoContentType.objects.clear_cache()
+        if '_django_content_type' in vars(Page):
+            del Page._django_content_type
+
+        with self.assertNumQueries(2):
+            warm_up_content_types()
+
+        with self.assertNumQueries(0):
+            CopySlot.swim_content_type()
+            Page.get_django_content_type()
+
 #-------------------------------------------------------------------------------
 class DualPaginatorTests(TestCase):
     """A bundle of tests to test out the DualPaginator
@@ -218,3 +331,47 @@ class isAlphaNumericURLTests(TestCase):
 
 if __name__ == "__main__":
     run_tests()
+
+#-------------------------------------------------------------------------------
+class SharedCacheCheckTests(TestCase):
+
+    def test_process_local_caches_are_reported(self):
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        shared = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}
+        with override_settings(CACHES={'default': locmem}):
+            self.assertEqual(
+                    ['swim.W001'], [e.id for e in checks.check_shared_cache(None)])
+            self.assertEqual(
+                    ['swim.E001'], [e.id for e in checks.check_shared_cache_deploy(None)])
+
+        with override_settings(
+                CACHES={'default': locmem, 'shared': shared}, SWIM_CACHE_ALIAS='shared'):
+            self.assertEqual([], checks.check_shared_cache(None))
+            self.assertEqual([], checks.check_shared_cache_deploy(None))
+
+#-------------------------------------------------------------------------------
+class ServerTimingTests(TestCase):
+
+    def test_rendered_objects_are_summed_for_each_template(self):
+        timings = timing.Timings()
+        timings.entries.append(('render', '', 0.5, 3))
+        for i in range(2000):
+            timings.entries.append(('render_tag', '/post', 0.001, 1))
+        timings.entries.append(('render_tag', '/menu', 0.002, 0))
+        timings.finish()
+
+        server_timing = timings.server_timing()
+        self.assertEqual(4, server_timing.count(';dur='))
+        self.assertIn('render_tag;dur=2000.00;desc="/post, 2000 renders, 2000 queries"', server_timing)
+        self.assertIn('render_tag;dur=2.00;desc="/menu, 0 queries"', server_timing)
+
+    def test_the_header_is_capped_but_keeps_the_total(self):
+        timings = timing.Timings()
+        for i in range(2000):
+            timings.entries.append(('render_tag', '/post/%d' % i, 0.001, 1))
+        timings.finish()
+
+        server_timing = timings.server_timing()
+        self.assertLessEqual(len(server_timing), timing.SERVER_TIMING_SIZE)
+        self.assertIn('render_tag;dur=1.00;desc="/post/0, 1 query"', server_timing)
+        self.assertIn(', total;dur=', server_timing)
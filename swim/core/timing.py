@@ -0,0 +1,368 @@
+"""
+Lightweight timing of the stages SWIM goes through to render a page.
+
+PageView records the wall time, and the number of database queries made,
+of each of its stages: match_resource, match_template, get_context,
+run_middleware, render and run_response_processors.  Each resource type
+middleware function and response processor, and each object rendered by
+{% render %}, is recorded as well.
+
+Once the page has been rendered its timings are sent to staff in a
+Server-Timing header, where the browser's developer tools show them, with
+the objects rendered from each template summed into one metric, and
+handed to each of the sinks named by SWIM_TIMING_SINKS.  A sink is the
+dotted path to a callable taking (request, timings), and three are
+provided:
+
+record_timings
+    The default.  Keeps histograms of the timings in each worker, which the
+    admin lists, slowest first, at admin/core/resourcetype/timings/
+log_timings
+    Writes a line for each page to the swim.core.timing logger.
+send_to_statsd
+    Sends the timings to the statsd server at SWIM_STATSD_HOST and
+    SWIM_STATSD_PORT, under SWIM_STATSD_PREFIX, which aggregates them.
+
+SWIM_TIMING = False turns all of it off.  Streamed pages are only timed
+until their rendering starts.
+"""
+import bisect
+import contextlib
+import logging
+import re
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from swim.core.cache import PROCESS_CACHES
+from swim.core.functions import function_registry
+
+logger = logging.getLogger(__name__)
+
+# Keeps the Server-Timing header well within the size proxies accept.
+SERVER_TIMING_SIZE = 2000
+
+#-------------------------------------------------------------------------------
+def enabled():
+    return getattr(settings, 'SWIM_TIMING', True)
+
+#-------------------------------------------------------------------------------
+class Timings:
+    """
+    The timings of a single request.
+
+    attributes:
+    entries
+        A list of (kind, detail, seconds, queries) in the order each one
+        finished.  The detail is the function or template path, if any.
+    resource_type, template
+        The key of the resource type and the path of the template of the
+        page, once they're known.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.entries = []
+        self.resource_type = None
+        self.template = None
+
+    #---------------------------------------------------------------------------
+    def count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    #---------------------------------------------------------------------------
+    @contextlib.contextmanager
+    def stage(self, kind, detail=''):
+        started = time.perf_counter()
+        queries = self.queries
+        try:
+            yield
+        finally:
+            self.entries.append(
+                    (kind, detail, time.perf_counter() - started, self.queries - queries))
+
+    #---------------------------------------------------------------------------
+    def finish(self):
+        self.entries.append(
+                ('total', '', time.perf_counter() - self.started, self.queries))
+
+    #---------------------------------------------------------------------------
+    def server_timing(self):
+        """
+        Returns the value of a Server-Timing header for the entries.
+
+        The {% render %} entries are summed for each template, and the
+        metrics which would take the header beyond SERVER_TIMING_SIZE are
+        left out, apart from the total.
+        """
+        entries = []
+        rendered = {}
+        for (kind, detail, seconds, queries) in self.entries:
+            if kind == 'render_tag' and detail in rendered:
+                entry = rendered[detail]
+                entry[2] += seconds
+                entry[3] += queries
+                entry[4] += 1
+                continue
+            entry = [kind, detail, seconds, queries, 1]
+            if kind == 'render_tag':
+                rendered[detail] = entry
+            entries.append(entry)
+
+        metrics = []
+        for (kind, detail, seconds, queries, count) in entries:
+            description = "%d %s" % (queries, 'query' if queries == 1 else 'queries')
+            if count > 1:
+                description = "%d renders, %s" % (count, description)
+            if detail:
+                description = "%s, %s" % (detail, description)
+            description = description.replace('\\', '\\\\').replace('"', '\\"')
+            description = description.encode('ascii', 'replace').decode('ascii')
+            metrics.append(
+                    (kind, '%s;dur=%.2f;desc="%s"' % (kind, seconds * 1000, description)))
+
+        size = sum(len(metric) + 2 for (kind, metric) in metrics if kind == 'total')
+        kept = []
+        for (kind, metric) in metrics:
+            if kind != 'total':
+                if size + len(metric) + 2 > SERVER_TIMING_SIZE:
+                    continue
+                size += len(metric) + 2
+            kept.append(metric)
+        return ', '.join(kept)
+
+#-------------------------------------------------------------------------------
+@contextlib.contextmanager
+def recording(request):
+    """
+    Times the request handled within the block, yielding its Timings, or
+    None when timing is turned off.
+    """
+    if not enabled():
+        yield None
+        return
+
+    timings = request._swim_timings = Timings()
+    with connection.execute_wrapper(timings.count_query):
+        yield timings
+
+#-------------------------------------------------------------------------------
+def stage(request, kind, detail=''):
+    """
+    Times the block as a stage of the request, if it is being timed.
+    """
+    timings = getattr(request, '_swim_timings', None)
+    if timings is None:
+        return contextlib.nullcontext()
+    return timings.stage(kind, detail)
+
+#-------------------------------------------------------------------------------
+def describe(request, resource_type=None, template=None):
+    """
+    Sets the resource type key and template path the timings of the request
+    are kept under.
+    """
+    timings = getattr(request, '_swim_timings', None)
+    if timings is None:
+        return
+    if resource_type is not None:
+        timings.resource_type = resource_type
+    if template is not None:
+        timings.template = template
+
+#-------------------------------------------------------------------------------
+def finish(request, response):
+    """
+    Report the timings of the request, which has produced the response.
+    """
+    timings = getattr(request, '_swim_timings', None)
+    if timings is None:
+        return
+    request._swim_timings = None
+    timings.finish()
+
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff:
+        response['Server-Timing'] = timings.server_timing()
+
+    for dotted_path in getattr(settings, 'SWIM_TIMING_SINKS', (
+                'swim.core.timing.record_timings',
+            )):
+        try:
+            function_registry.resolve(dotted_path)(request, timings)
+        except Exception:
+            # Timing must never break a page.
+            logger.exception("The timing sink %s failed", dotted_path)
+
+#-------------------------------------------------------------------------------
+class Histogram:
+    """
+    The distribution of the times of one kind of thing.
+
+    attributes:
+    buckets
+        The number of times within each of BOUNDS, in milliseconds, with a
+        last bucket for the times beyond them.
+    """
+    BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    #---------------------------------------------------------------------------
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.queries = 0
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+
+    #---------------------------------------------------------------------------
+    def add(self, seconds, queries):
+        self.count += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.queries += queries
+        self.buckets[bisect.bisect_left(self.BOUNDS, seconds * 1000)] += 1
+
+    #---------------------------------------------------------------------------
+    def mean_ms(self):
+        return self.seconds * 1000 / self.count
+
+    #---------------------------------------------------------------------------
+    def max_ms(self):
+        return self.max_seconds * 1000
+
+    #---------------------------------------------------------------------------
+    def mean_queries(self):
+        return float(self.queries) / self.count
+
+    #---------------------------------------------------------------------------
+    def percentile_ms(self, percentile):
+        """
+        The bound of the bucket the percentile falls in, or the largest time
+        seen if that's beyond the last bound.
+        """
+        wanted = self.count * percentile / 100.0
+        seen = 0
+        for (bound, count) in zip(self.BOUNDS, self.buckets):
+            seen += count
+            if seen >= wanted:
+                return bound
+        return self.max_ms()
+
+#-------------------------------------------------------------------------------
+class TimingHistograms:
+    """
+    The histograms of every resource type, template, middleware function
+    and stage timed by this worker.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+        PROCESS_CACHES.append(self)
+
+    #---------------------------------------------------------------------------
+    def reset(self):
+        self.histograms = {}
+
+    #---------------------------------------------------------------------------
+    def add(self, kind, name, seconds, queries):
+        with self._lock:
+            histogram = self.histograms.get((kind, name))
+            if histogram is None:
+                histogram = self.histograms[(kind, name)] = Histogram()
+            histogram.add(seconds, queries)
+
+    #---------------------------------------------------------------------------
+    def slowest(self, kind, limit=25):
+        """
+        Returns (name, histogram) for the things of a kind with the slowest
+        mean times.
+        """
+        with self._lock:
+            found = [
+                    (name, histogram)
+                    for ((each, name), histogram) in self.histograms.items()
+                    if each == kind
+                ]
+        found.sort(key=lambda item: item[1].mean_ms(), reverse=True)
+        return found[:limit]
+
+timing_histograms = TimingHistograms()
+
+#-------------------------------------------------------------------------------
+def summarize(timings):
+    """
+    Yields (kind, name, seconds, queries) for the things a page's timings
+    are kept under.
+    """
+    for (kind, detail, seconds, queries) in timings.entries:
+        if kind == 'total':
+            if timings.resource_type:
+                yield ('resource_type', timings.resource_type, seconds, queries)
+        elif kind == 'render' and timings.template:
+            yield ('template', timings.template, seconds, queries)
+        elif kind == 'render_tag':
+            yield ('template', detail, seconds, queries)
+        elif kind in ('middleware', 'response_processor'):
+            yield (kind, detail, seconds, queries)
+        yield ('stage', kind, seconds, queries)
+
+#-------------------------------------------------------------------------------
+def record_timings(request, timings):
+    for (kind, name, seconds, queries) in summarize(timings):
+        timing_histograms.add(kind, name, seconds, queries)
+
+#-------------------------------------------------------------------------------
+def log_timings(request, timings):
+    logger.info(
+            "%s %s resource_type=%s template=%s %s",
+            request.method,
+            request.path,
+            timings.resource_type,
+            timings.template,
+            ' '.join(
+                '%s=%.2fms/%dq' % (
+                    '%s:%s' % (kind, detail) if detail else kind,
+                    seconds * 1000,
+                    queries
+                )
+                for (kind, detail, seconds, queries) in timings.entries
+            )
+        )
+
+#-------------------------------------------------------------------------------
+statsd_name_re = re.compile(r'[^A-Za-z0-9_\-]+')
+
+# Keeps each packet within the size statsd servers expect.
+STATSD_PACKET_SIZE = 1400
+
+#-------------------------------------------------------------------------------
+def send_to_statsd(request, timings):
+    prefix = getattr(settings, 'SWIM_STATSD_PREFIX', 'swim')
+    address = (
+            getattr(settings, 'SWIM_STATSD_HOST', 'localhost'),
+            getattr(settings, 'SWIM_STATSD_PORT', 8125),
+        )
+
+    packets = [b'']
+    for (kind, name, seconds, queries) in summarize(timings):
+        metric = '%s.%s.%s' % (prefix, kind, statsd_name_re.sub('_', name).strip('_'))
+        for line in (
+                '%s.time:%.3f|ms' % (metric, seconds * 1000),
+                '%s.queries:%d|h' % (metric, queries),
+            ):
+            line = line.encode('utf-8')
+            if packets[-1] and len(packets[-1]) + len(line) >= STATSD_PACKET_SIZE:
+                packets.append(b'')
+            packets[-1] = b'\n'.join(filter(None, (packets[-1], line)))
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as statsd:
+        for packet in packets:
+            statsd.sendto(packet, address)
@@ -14,11 +14,11 @@ from swim.core import path_resolution_order, get_object_by_path
 from swim.core.models import (
     Resource,
     ResourceType,
-    RequestHandlerMapping,
+    route_table,
 )
 
 # TODO: Remove this dependency on design
-from swim.design.models import CSS, JavaScript
+from swim.design.bundles import css_bundles, javascript_bundles, fingerprint_re
 
 #-------------------------------------------------------------------------------
 class CoreView:
@@ -40,82 +40,75 @@ def default(request):
     found, then we return an Http404, if some are found, we return an HTTP
     405 with the appropriate Allow headers set.
     """
-    request.types = {}
     request.resource_type_templates = {}
 
     path = "/%s" % request.path.strip('/')
     path = path.lower()
 
-    try:
-        request_handler = RequestHandlerMapping.objects.select_related("constructor").get(
-                path=path,
-                method=request.method,
-            )
-    except RequestHandlerMapping.DoesNotExist:
-        request_handler = None
+    routes = route_table.get()
+    constructor = routes.get_constructor(path, request.method)
 
     # When a request handler is not found, we return one of a few errors.
     # if other request handlers exist for the given path, but have a different
     # method, then we return a 405.
     # if no request handlers exist for the given path we return a 404.
-    if not request_handler:
-        path_request_handlers = RequestHandlerMapping.objects.filter(
-                path=path,
-            )
+    if not constructor:
+        potential_methods = routes.get_methods(path)
 
         # There are NO potential handlers for this path.
-        if path_request_handlers.count() == 0:
+        if not potential_methods:
             request.message_404 = 'No matching request handler found for path %s.' % path
             raise Http404(request.message_404)
 
-        potential_methods = set()
-        for request_handler in path_request_handlers:
-            potential_methods.add(request_handler.method)
-
         response = HttpResponse('Method not allowed.', status = 405)
-        response['Allow'] = ' '.join(sorted(list(potential_methods)))
+        response['Allow'] = ' '.join(potential_methods)
         return response
 
     # For methods that don't typically contain request bodies, we will redirect
     # to the canonical URL.
-    if request.path != request_handler.path and request.method in ('GET', 'HEAD',):
-        return HttpResponseRedirect(request_handler.path)
+    if request.path != path and request.method in ('GET', 'HEAD',):
+        return HttpResponseRedirect(path)
 
-    request_handler_instance = request_handler.constructor.invoke()
+    request_handler_instance = constructor.invoke()
     return request_handler_instance(request)
 
 #-------------------------------------------------------------------------------
 # css is served up slightly differently than normal content
-def media(request, path=None, model=None, mimetype=None):
+def media(request, path=None, bundles=None):
+    """
+    Serve the bundle of the rows named by path, such as "reset/site".
+
+    When path starts with the fingerprint of a bundle, that bundle never
+    changes and browsers are told to keep it.  Bundles built before the
+    latest edit remain available under their fingerprints, so pages which
+    still refer to them get the files they were rendered with.
+    """
     media_path_list = path.split('/')
-    media_object_list = model.objects.filter(path__in=media_path_list).order_by('-modifieddate')
-    if not media_object_list:
-        raise Http404('No media found at this url')
-
-    # Start with a last modified date of 15 years ago.
-    media_dict = dict([(media.path, media) for media in media_object_list])
-    media_body_list = []
-    latest_media = media_object_list[0]
-    for media_path in media_path_list:
-        try:
-            media = media_dict[media_path]
-        except KeyError:
-            raise Http404('%s not found.' % media_path)
-        media_body_list.append(media.body)
-
-    response = HttpResponse('\n'.join(media_body_list), content_type=mimetype)
-    response['Last-Modified'] = latest_media.http_last_modified()
+    if len(media_path_list) > 1 and fingerprint_re.match(media_path_list[0]):
+        response = bundles.response(request, media_path_list[0])
+        if response is not None:
+            response['Cache-Control'] = 'public, max-age=31536000, immutable'
+            return response
+        media_path_list = media_path_list[1:]
+
+    bundle = bundles.get(media_path_list)
+    response = bundles.bundle_response(request, bundle)
+    if response is None:
+        # The files were removed after this worker last saw them.
+        bundle = bundles.build(media_path_list)
+        response = bundles.bundle_response(request, bundle)
+    response['Last-Modified'] = bundle.last_modified
     return response
 
 
 #-------------------------------------------------------------------------------
 def css(request, path=None):
-    return media(request, path, CSS, 'text/css')
+    return media(request, path, css_bundles)
 
 #-------------------------------------------------------------------------------
 # css is served up slightly differently than normal content
 def javascript(request, path=None):
-    return media(request, path, JavaScript, 'text/javascript')
+    return media(request, path, javascript_bundles)
 
 #-------------------------------------------------------------------------------
 def admin_redirect(request):
@@ -29,7 +29,7 @@ class TemplateAdmin(ModelAdmin):
         }),
         ('Advanced', {
             'classes': ('collapse', ),
-            'fields' : ('http_content_type', 'swim_content_type')
+            'fields' : ('http_content_type', 'swim_content_type', 'stream_response')
         }),
     )
     list_filter = (
@@ -0,0 +1,147 @@
+"""
+Static analysis of design templates.
+
+Templates use atoms through the resource and target variables, as in
+resource.copy.body or target.image.photo.url.  Analyzing a template finds
+the atom types it uses, so that they can all be loaded before it's rendered
+instead of one at a time as it is, and the relations it follows from those
+atoms, such as resource.menu.main.links.  The content objects it uses by
+key, as in content.page.about, are found as well, so that they can all be
+looked up together.
+
+The analysis of a template is a dict, stored with it:
+
+    {
+        "atoms": ["copy", "menu"],
+        "relations": [["menu", "main", "links"]],
+        "content": [["page", "about"]],
+    }
+
+where each relation is [atom type, key, attribute] and each content object
+is [content type, key].  Only the template's own
+body is analyzed, so the templates it extends or includes aren't covered.
+"""
+from django.template import engines, Template as DjangoTemplate, TemplateSyntaxError
+from django.template.base import FilterExpression, Variable
+from django.template.smartif import TokenBase
+
+from django_jinja.backend import Jinja2
+from jinja2 import nodes
+from jinja2.exceptions import TemplateSyntaxError as JinjaTemplateSyntaxError
+
+from swim.core.content import (
+        CONTENT_ATOM_METADATA,
+        DJANGO_MODEL_SWIM_CONTENT_TYPE_LOOKUPS,
+    )
+
+# The names the atoms of the object being rendered are used through.
+ROOTS = ('resource', 'target')
+
+#-------------------------------------------------------------------------------
+def get_jinja_engine(path):
+    """
+    Returns the jinja engine which renders templates on path, or None if
+    they're rendered by django.
+    """
+    for engine in engines.all():
+        if isinstance(engine, Jinja2) and engine.match_template(path):
+            return engine
+    return None
+
+#-------------------------------------------------------------------------------
+def django_lookups(nodelist):
+    """
+    Yields the lookups, such as ('resource', 'copy', 'body'), of every
+    variable used in a compiled django template.
+    """
+    for node in nodelist:
+        for value in vars(node).values():
+            yield from django_value_lookups(value)
+        for attr in node.child_nodelists:
+            yield from django_lookups(getattr(node, attr, None) or ())
+
+#-------------------------------------------------------------------------------
+def django_value_lookups(value):
+    if isinstance(value, Variable):
+        if value.lookups:
+            yield value.lookups
+    elif isinstance(value, FilterExpression):
+        yield from django_value_lookups(value.var)
+        for (function, args) in value.filters:
+            for (lookup, arg) in args:
+                yield from django_value_lookups(arg)
+    elif isinstance(value, TokenBase):
+        # The conditions of {% if %} tags.
+        for attr in ('value', 'first', 'second'):
+            yield from django_value_lookups(getattr(value, attr, None))
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from django_value_lookups(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from django_value_lookups(item)
+
+#-------------------------------------------------------------------------------
+def jinja_lookups(ast):
+    """
+    Yields the lookups of every attribute or constant item used in a parsed
+    jinja template.
+    """
+    for node in ast.find_all((nodes.Getattr, nodes.Getitem)):
+        lookups = []
+        while isinstance(node, (nodes.Getattr, nodes.Getitem)):
+            if isinstance(node, nodes.Getattr):
+                lookups.append(node.attr)
+            elif isinstance(node.arg, nodes.Const):
+                lookups.append(str(node.arg.value))
+            else:
+                lookups = None
+                break
+            node = node.node
+        if lookups is not None and isinstance(node, nodes.Name):
+            lookups.append(node.name)
+            yield tuple(reversed(lookups))
+
+#-------------------------------------------------------------------------------
+def analyze_lookups(lookups):
+    content_types = set(
+            content_object.get_context_name()
+            for content_object in DJANGO_MODEL_SWIM_CONTENT_TYPE_LOOKUPS.values()
+        )
+    atoms = set()
+    relations = set()
+    content = set()
+    for lookup in lookups:
+        # The context is also available as swim.content, swim.resource ...
+        if lookup[:1] == ('swim',):
+            lookup = lookup[1:]
+        if len(lookup) >= 3 and lookup[0] == 'content' and lookup[1] in content_types:
+            content.add(lookup[1:3])
+            continue
+        if len(lookup) < 2 or lookup[0] not in ROOTS:
+            continue
+        if lookup[1] not in CONTENT_ATOM_METADATA:
+            continue
+        atoms.add(lookup[1])
+        if len(lookup) >= 4:
+            relations.add(lookup[1:4])
+    return {
+        'atoms': sorted(atoms),
+        'relations': [list(relation) for relation in sorted(relations)],
+        'content': [list(item) for item in sorted(content)],
+    }
+
+#-------------------------------------------------------------------------------
+def analyze_template(path, body):
+    """
+    Returns the analysis of a template body, or None if it can't be parsed.
+    """
+    engine = get_jinja_engine(path)
+    try:
+        if engine is not None:
+            lookups = jinja_lookups(engine.env.parse(body))
+        else:
+            lookups = django_lookups(DjangoTemplate(body).nodelist)
+        return analyze_lookups(lookups)
+    except (TemplateSyntaxError, JinjaTemplateSyntaxError):
+        return None
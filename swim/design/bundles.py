@@ -0,0 +1,390 @@
+"""
+Bundled, minified and precompressed delivery of the CSS and JavaScript rows.
+
+A url such as /css/reset/site names a bundle: the bodies of the named rows
+joined in order.  The first time a bundle is asked for it is minified,
+written to SWIM_BUNDLE_ROOT along with gzip (and, when the brotli package is
+installed, brotli) copies, and named by the hash of its contents.  From then
+on serving it is a dictionary lookup and a file response, which the server
+can send without copying it through python.
+
+Saving or deleting a row bumps the version of its kind of bundle, and every
+combination that has been asked for is built again straight away, so the
+first visitor after an edit doesn't pay for it.
+
+The urls produced by css_url and js_url include the hash, as in
+/css/<hash>/reset/site.  Those responses never change and are served with
+headers that let browsers keep them for a year.
+
+A bundle is made of at most MAX_PATHS different rows, and only the first
+MAX_COMBINATIONS combinations asked for are stored.  Those after them are
+built for each request, so that urls naming every ordering of the rows
+can't fill the disk and the cache.
+"""
+import gzip
+import hashlib
+import os
+import re
+import threading
+import uuid
+from collections import namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponse
+
+from swim.core.cache import PROCESS_CACHES, VersionStamp, get_cache
+from swim.core.http import AcceptElement
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#-------------------------------------------------------------------------------
+def bundle_root():
+    return getattr(
+            settings,
+            'SWIM_BUNDLE_ROOT',
+            os.path.join(settings.MEDIA_ROOT, 'bundles')
+        )
+
+#-------------------------------------------------------------------------------
+# Strings are matched first so that nothing inside of them is changed.
+css_tokens = re.compile(
+        r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)''',
+        re.DOTALL
+    )
+# The last semicolon of a block is dropped along with the whitespace, and the
+# whitespace before a colon only when it's in a declaration, as in a selector
+# such as "a :hover" it matters.
+css_punctuation = re.compile(
+        r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')'''
+        r'''|\s*(?:;\s*)?(})\s*'''
+        r'''|\s*([{;,>])\s*'''
+        r'''|(?:\s+(?=:[^{}]*[;}]))?(:)\s*''',
+        re.DOTALL
+    )
+
+def minify_css(body):
+    """
+    Remove the comments and the whitespace which doesn't change the meaning
+    of a stylesheet.
+
+    Comments starting with /*! are kept, as they are usually licenses.
+    """
+    def tokens(match):
+        (string, comment, space) = match.groups()
+        if string:
+            return string
+        if comment:
+            return comment if comment.startswith('/*!') else ''
+        return ' '
+
+    def punctuation(match):
+        (string, brace, character, colon) = match.groups()
+        return string or brace or character or colon
+
+    body = css_tokens.sub(tokens, body)
+    body = css_punctuation.sub(punctuation, body)
+    return body.strip()
+
+#-------------------------------------------------------------------------------
+def minify_javascript(body):
+    """
+    Minify a script with rjsmin when it is installed.
+
+    Removing whitespace from javascript safely takes a real tokenizer, so
+    without rjsmin the script is left alone and only compressed.
+    """
+    try:
+        import rjsmin
+    except ImportError:
+        return body
+    return rjsmin.jsmin(body)
+
+#-------------------------------------------------------------------------------
+# The data of a bundle is only kept when it isn't stored.
+Bundle = namedtuple('Bundle', ('fingerprint', 'last_modified', 'data'), defaults=(None,))
+
+fingerprint_re = re.compile(r'^[0-9a-f]{16}$')
+
+# The encodings we store, most preferred first.
+ENCODINGS = (
+    ('br', '.br'),
+    ('gzip', '.gz'),
+)
+
+# Stop storing new combinations past this many.
+MAX_COMBINATIONS = 1000
+
+# The most rows a bundle can be made of.
+MAX_PATHS = 32
+
+#-------------------------------------------------------------------------------
+def accepted_encodings(accept_encoding):
+    """
+    Returns the set of the ENCODINGS an Accept-Encoding header accepts,
+    which are those it gives (by name or with *) a qvalue above zero.
+    """
+    qvalues = {}
+    for element in accept_encoding.split(','):
+        if not element.strip():
+            continue
+        element = AcceptElement.from_str(element)
+        try:
+            qvalues[element.value.lower()] = element.qvalue
+        except ValueError:
+            qvalues[element.value.lower()] = 0
+    default = qvalues.get('*', 0)
+    return set(
+            encoding
+            for (encoding, suffix) in ENCODINGS
+            if qvalues.get(encoding, default) > 0
+        )
+
+#-------------------------------------------------------------------------------
+class BundleRegistry:
+    """
+    The bundles for one model, keyed on the tuple of paths they contain.
+
+    attributes:
+    kind
+        The first part of their urls, and the directory their files go in.
+    model_name
+        The app_label.ModelName of the rows they are made from.
+    content_type
+        The Content-Type they are served with.
+    minify
+        A callable which takes the joined bodies and returns them minified.
+    stamp
+        A VersionStamp bumped whenever one of the rows changes.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self, kind, model_name, content_type, extension, minify):
+        self.kind = kind
+        self.model_name = model_name
+        self.content_type = content_type
+        self.extension = extension
+        self.minify = minify
+        self.stamp = VersionStamp('bundles.%s' % kind)
+        self._lock = threading.Lock()
+        self.reset()
+        PROCESS_CACHES.append(self)
+
+    #---------------------------------------------------------------------------
+    def reset(self):
+        self._state = (None, {})
+
+    #---------------------------------------------------------------------------
+    def shared_key(self, version, paths):
+        return 'swim.bundle.%s.%s.%s' % (self.kind, version, '/'.join(paths))
+
+    #---------------------------------------------------------------------------
+    def combinations_key(self):
+        return 'swim.bundle.%s.combinations' % self.kind
+
+    #---------------------------------------------------------------------------
+    def filename(self, fingerprint, suffix=''):
+        return os.path.join(
+                bundle_root(),
+                self.kind,
+                '%s.%s%s' % (fingerprint, self.extension, suffix)
+            )
+
+    #---------------------------------------------------------------------------
+    def get(self, paths):
+        """
+        Returns the Bundle made of the rows with the given paths, building it
+        when it doesn't exist yet.
+
+        raises Http404 when one of the paths doesn't exist, is repeated, or
+        there are more than MAX_PATHS of them.
+        """
+        paths = tuple(paths)
+        if len(paths) > MAX_PATHS or len(set(paths)) != len(paths):
+            raise Http404('A bundle is made of at most %d different rows.' % MAX_PATHS)
+        version = self.stamp.get()
+        loaded_version, bundles = self._state
+        if loaded_version == version and paths in bundles:
+            return bundles[paths]
+
+        # Another worker has probably built it already.
+        cache = get_cache()
+        bundle = cache.get(self.shared_key(version, paths))
+        if bundle is None or not os.path.exists(self.filename(bundle.fingerprint)):
+            bundle = self.build(paths)
+            if bundle.data is not None:
+                return bundle
+            cache.set(self.shared_key(version, paths), bundle, None)
+
+        with self._lock:
+            loaded_version, bundles = self._state
+            if loaded_version != version:
+                bundles = {}
+            bundles = dict(bundles)
+            bundles[paths] = bundle
+            self._state = (version, bundles)
+        return bundle
+
+    #---------------------------------------------------------------------------
+    def build(self, paths):
+        """
+        Writes the files for the bundle of the given paths.
+
+        Once there are MAX_COMBINATIONS, the bundles of new combinations
+        aren't written, and are returned with their data instead.
+        """
+        model = apps.get_model(self.model_name)
+        rows = dict((row.path, row) for row in model.objects.filter(path__in=paths))
+        if not rows:
+            raise Http404('No media found at this url')
+        for path in paths:
+            if path not in rows:
+                raise Http404('%s not found.' % path)
+
+        body = self.minify('\n'.join(rows[path].body for path in paths))
+        data = body.encode('utf-8')
+        fingerprint = hashlib.sha256(data).hexdigest()[:16]
+        latest = max(rows.values(), key=lambda row: row.modifieddate)
+        if not self.remember_combination(paths):
+            return Bundle(fingerprint, latest.http_last_modified(), data)
+
+        # The name is the hash of the contents, so an existing file is
+        # already correct.
+        if not os.path.exists(self.filename(fingerprint)):
+            self.write(self.filename(fingerprint, '.gz'), gzip.compress(data, 9, mtime=0))
+            if brotli is not None:
+                self.write(self.filename(fingerprint, '.br'), brotli.compress(data))
+            self.write(self.filename(fingerprint), data)
+        return Bundle(fingerprint, latest.http_last_modified())
+
+    #---------------------------------------------------------------------------
+    def write(self, filename, data):
+        # Written to a temporary file and moved into place so that a request
+        # never sees part of a file.
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        temporary = '%s.%s.tmp' % (filename, uuid.uuid4().hex)
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, filename)
+
+    #---------------------------------------------------------------------------
+    def remember_combination(self, paths):
+        """
+        Adds paths to the combinations built again when a row changes.
+
+        Returns False, without adding them, when there are MAX_COMBINATIONS
+        already.
+        """
+        cache = get_cache()
+        combinations = cache.get(self.combinations_key(), [])
+        if paths in combinations:
+            return True
+        if len(combinations) >= MAX_COMBINATIONS:
+            return False
+        cache.set(self.combinations_key(), combinations + [paths], None)
+        return True
+
+    #---------------------------------------------------------------------------
+    def rebuild(self, *args, **kwargs):
+        """
+        Bump the version of the bundles, and build every combination that has
+        been asked for once the change is committed.
+
+        Accepts (and ignores) any arguments so it can be used directly as a
+        signal receiver.
+        """
+        self.reset()
+        self.stamp.bump()
+        transaction.on_commit(self.build_combinations)
+
+    #---------------------------------------------------------------------------
+    def build_combinations(self):
+        cache = get_cache()
+        combinations = cache.get(self.combinations_key(), [])
+        existing = []
+        for paths in combinations:
+            try:
+                self.get(paths)
+            except Http404:
+                continue
+            existing.append(paths)
+        if existing != combinations:
+            cache.set(self.combinations_key(), existing, None)
+
+    #---------------------------------------------------------------------------
+    def url(self, path):
+        """
+        Returns the fingerprinted url for a path such as "reset/site".
+
+        When one of the rows doesn't exist the plain url is returned, so that
+        rendering a page never fails because of it.
+        """
+        path = path.strip('/')
+        try:
+            bundle = self.get(path.split('/'))
+        except Http404:
+            return '/%s/%s' % (self.kind, path)
+        return '/%s/%s/%s' % (self.kind, bundle.fingerprint, path)
+
+    #---------------------------------------------------------------------------
+    def response(self, request, fingerprint):
+        """
+        Returns a FileResponse for the bundle with the given fingerprint, in
+        the best encoding the client accepts, or None if there is no such
+        bundle.
+        """
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for (encoding, suffix) in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                f = open(self.filename(fingerprint, suffix), 'rb')
+            except FileNotFoundError:
+                continue
+            response = FileResponse(f, content_type=self.content_type)
+            response['Content-Encoding'] = encoding
+            break
+        else:
+            try:
+                f = open(self.filename(fingerprint), 'rb')
+            except FileNotFoundError:
+                return None
+            response = FileResponse(f, content_type=self.content_type)
+
+        # FileResponse names the file after the one on disk.
+        del response['Content-Disposition']
+        response['Vary'] = 'Accept-Encoding'
+        response['ETag'] = '"%s"' % fingerprint
+        return response
+
+    #---------------------------------------------------------------------------
+    def bundle_response(self, request, bundle):
+        """
+        Returns the response for a Bundle, or None if its files are missing.
+
+        The bundles which weren't stored are sent as they are.
+        """
+        if bundle.data is None:
+            return self.response(request, bundle.fingerprint)
+        response = HttpResponse(bundle.data, content_type=self.content_type)
+        response['ETag'] = '"%s"' % bundle.fingerprint
+        return response
+
+css_bundles = BundleRegistry(
+        'css', 'design.CSS', 'text/css', 'css', minify_css
+    )
+javascript_bundles = BundleRegistry(
+        'js', 'design.JavaScript', 'text/javascript', 'js', minify_javascript
+    )
+
+#-------------------------------------------------------------------------------
+def css_url(path):
+    return css_bundles.url(path)
+
+#-------------------------------------------------------------------------------
+def js_url(path):
+    return javascript_bundles.url(path)
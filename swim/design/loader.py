@@ -1,14 +1,18 @@
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.template import TemplateDoesNotExist
 from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.template.base import Origin
 from django.template.loaders.base import Loader as BaseLoader
 
 from jinja2 import loaders
 from jinja2.exceptions import TemplateNotFound
 
-from swim.design.models import Template
+from swim.design.models import Template, template_versions
 from django import template
 from swim.core.models import Resource
+from swim.core.cache import LRUCache, VersionedCache
 
 
 #-------------------------------------------------------------------------------
@@ -38,17 +42,16 @@ def load_design_template(path, http_content_type, swim_content_type):
     return template.Template(t.body)
 
 #-------------------------------------------------------------------------------
-class DjangoStyleDesignTemplate(object):
-    def __init__(self, name):
-        self.name = name
-        self.template_name = name
+class DjangoStyleDesignTemplate(Origin):
+    def __init__(self, name, loader=None):
+        super(DjangoStyleDesignTemplate, self).__init__(name, name, loader)
 
 #-------------------------------------------------------------------------------
 class DjangoStyleLoadDesignTemplate(BaseLoader):
     is_usable = True
 
     def get_template_sources(self, name):
-        return [DjangoStyleDesignTemplate(name)]
+        return [DjangoStyleDesignTemplate(name, self)]
 
     def get_contents(self, origin):
         try:
@@ -63,6 +66,76 @@ class DjangoStyleLoadDesignTemplate(BaseLoader):
     get_template_sources.is_usable = True
 
 
+#-------------------------------------------------------------------------------
+def load_template_paths():
+    """
+    Returns a dict of the path of every Resource design template to its
+    (id, modifieddate), or to None when more than one template has that path.
+    """
+    paths = {}
+    templates = Template.objects.filter(
+            swim_content_type=Resource.swim_content_type()
+        ).values_list('id', 'path', 'modifieddate')
+    for (template_id, path, modifieddate) in templates:
+        paths[path] = None if path in paths else (template_id, modifieddate)
+    return paths
+
+template_paths = VersionedCache('design_template_paths', load_template_paths)
+
+# Compiled templates keyed on (engine, path, Template id, modifieddate).
+compiled_design_templates = LRUCache(
+        getattr(settings, 'SWIM_COMPILED_TEMPLATE_CACHE_SIZE', 256)
+    )
+
+#-------------------------------------------------------------------------------
+def template_changed(sender, instance, **kwargs):
+    template_paths.invalidate()
+    compiled_design_templates.discard(lambda key: key[2] == instance.id)
+post_save.connect(template_changed, sender=Template)
+post_delete.connect(template_changed, sender=Template)
+
+#-------------------------------------------------------------------------------
+class CachedDjangoStyleLoadDesignTemplate(DjangoStyleLoadDesignTemplate):
+    """
+    A DjangoStyleLoadDesignTemplate which keeps the templates it compiles.
+
+    The paths of all of the design templates are kept in memory as well, so
+    names which aren't in the database are turned away without a query.
+    """
+
+    def get_template(self, template_name, skip=None):
+        paths = template_paths.get()
+        if template_name not in paths:
+            raise TemplateDoesNotExist(
+                    template_name,
+                    tried=[
+                        (origin, 'Source does not exist')
+                        for origin in self.get_template_sources(template_name)
+                    ]
+                )
+
+        found = paths[template_name]
+        if found is None:
+            # More than one template has this path, let the database decide.
+            return super(CachedDjangoStyleLoadDesignTemplate, self).get_template(
+                    template_name, skip
+                )
+
+        # Like django's cached loader, the templates {% extends %} skips to
+        # avoid recursion are part of the key.
+        skipped = tuple(
+                origin.name for origin in skip or ()
+                if origin.template_name == template_name
+            )
+        (template_id, modifieddate) = found
+        return compiled_design_templates.get_or_build(
+                (self.engine, template_name, template_id, modifieddate, skipped),
+                lambda: super(CachedDjangoStyleLoadDesignTemplate, self).get_template(
+                    template_name, skip
+                )
+            )
+
+
 #-------------------------------------------------------------------------------
 class JinjaStyleLoadDesignTemplate(loaders.BaseLoader):
     is_usable = True
@@ -71,6 +144,7 @@ class JinjaStyleLoadDesignTemplate(loaders.BaseLoader):
         if template == "500.jinja.html":
             error_msg = "The 500 template cannot be in the database."
             raise TemplateNotFound(error_msg)
+        version = template_versions.get()
         try:
             t = Template.objects.get(
                 Q(path=template) &
@@ -79,7 +153,12 @@ class JinjaStyleLoadDesignTemplate(loaders.BaseLoader):
         except ObjectDoesNotExist as e:
             error_msg = "Couldn't find template on path %s" % template
             raise TemplateNotFound(error_msg)
-        return t.body, t.path, lambda: True
+
+        # The compiled template stays good until any design template changes.
+        # The stamp is read once per request, so checking it is cheap.
+        def uptodate():
+            return template_versions.get() == version
+        return t.body, t.path, uptodate
 
 #-------------------------------------------------------------------------------
 def jinja2_loader(template_dirs):
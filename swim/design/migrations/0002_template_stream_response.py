@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('design', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='template',
+            name='stream_response',
+            field=models.BooleanField(default=False, help_text='\n        Send the pages rendered with this template to the client while they\n        are being rendered.  This is meant for very large pages.\n        '),
+        ),
+    ]
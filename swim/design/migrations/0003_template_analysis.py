@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+def analyze_templates(apps, schema_editor):
+    from swim.design.analysis import analyze_template
+
+    Template = apps.get_model('design', 'Template')
+    for template in Template.objects.all():
+        Template.objects.filter(pk=template.pk).update(
+                analysis=analyze_template(template.path, template.body)
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('design', '0002_template_stream_response'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='template',
+            name='analysis',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(analyze_templates, migrations.RunPython.noop),
+    ]
@@ -3,11 +3,12 @@ import time
 from django.db import models
 from django.conf import settings
 from django.utils.http import http_date
-from django.template import TemplateDoesNotExist
+from django.template import Template as DjangoTemplate, TemplateDoesNotExist
 from django.contrib.sites.models import Site
-from django.db.models import Q
+from django.db.models.signals import post_save, post_delete, m2m_changed
 
 from swim.core import modelfields, string_to_key
+from swim.core.cache import LRUCache, VersionedCache, VersionStamp
 from swim.core.models import (
     KeyedModel,
     ModelBase,
@@ -16,6 +17,8 @@ from swim.core.models import (
     resource_type_default,
     ContentType as SwimContentType,
 )
+from swim.design.analysis import analyze_template
+from swim.design.bundles import css_bundles, javascript_bundles
 from swim.media.fields import ImageField
 
 #-------------------------------------------------------------------------------
@@ -41,6 +44,8 @@ class Template(ModelBase):
 
     Defines a template model for use with the database template loader.
     The field ``path`` is the equivalent to the filename of a static template.
+    The atoms it uses are found whenever it is saved and stored in
+    ``analysis``, see swim.design.analysis.
     """
 
     path = models.CharField(max_length=100)
@@ -55,8 +60,16 @@ class Template(ModelBase):
         on_delete=models.CASCADE,
     )
     body = models.TextField("Body")
+    stream_response = models.BooleanField(
+        default=False,
+        help_text="""
+        Send the pages rendered with this template to the client while they
+        are being rendered.  This is meant for very large pages.
+        """,
+    )
 
     domains = models.ManyToManyField(Site, related_name='templates', blank=True)
+    analysis = models.JSONField(blank=True, null=True, editable=False)
 
     def __str__(self):
         return "%s, %s -> %s" % (self.path, self.swim_content_type, self.http_content_type)
@@ -64,6 +77,7 @@ class Template(ModelBase):
     def save(self, *args, **kwargs):
         # Templates need to store their paths lower case to do lookups properly
         self.path = self.path.lower()
+        self.analysis = analyze_template(self.path, self.body)
         super(Template, self).save(*args, **kwargs)
 
     class Meta:
@@ -73,6 +87,40 @@ class Template(ModelBase):
         unique_together = (("path", "http_content_type", "swim_content_type" ),)
 
 
+#-------------------------------------------------------------------------------
+# Compiled django templates, keyed on (Template id, modifieddate), so that
+# a body is only parsed once per worker until it is edited.
+compiled_templates = LRUCache(
+        getattr(settings, 'SWIM_COMPILED_TEMPLATE_CACHE_SIZE', 256)
+    )
+
+#-------------------------------------------------------------------------------
+def get_compiled_template(template):
+    """
+    Returns a django Template built from the body of the given Template.
+    """
+    return compiled_templates.get_or_build(
+            (template.id, template.modifieddate),
+            lambda: DjangoTemplate(template.body),
+        )
+
+#-------------------------------------------------------------------------------
+def discard_compiled_template(sender, instance, **kwargs):
+    compiled_templates.discard(lambda key: key[0] == instance.id)
+post_save.connect(discard_compiled_template, sender=Template)
+post_delete.connect(discard_compiled_template, sender=Template)
+
+#-------------------------------------------------------------------------------
+# Bumped whenever any Template changes, so that template engines holding on to
+# compiled templates know to load them again.
+template_versions = VersionStamp('design_templates')
+
+def bump_template_versions(sender, instance, **kwargs):
+    template_versions.bump()
+post_save.connect(bump_template_versions, sender=Template)
+post_delete.connect(bump_template_versions, sender=Template)
+
+
 #------------------------------------------------------------------------------
 class CSS(ModelBase):
     """
@@ -183,53 +231,13 @@ class ResourceTypeTemplateMapping(ModelBase):
         If there are no templates for that resource_type/swim_content_type try our
         parent.
 
-        raises ResourceTypeTemplateMapping.DoesNotExist when no template exists.
+        raises TemplateDoesNotExist when no template exists.
         """
-        resource_type_templates = getattr(request, 'resource_type_templates', {}).setdefault(
-                resource_type.id, {})
-
-        template =  resource_type_templates.get(swim_content_type, None)
-        if not template:
-            host_name = request.META.get('HTTP_HOST')
-            domain_specific_template_set = []
-            if host_name:
-                template_set = ResourceTypeTemplateMapping.objects.filter(
-                        Q(resource_type=resource_type) &
-                        (
-                            Q(template__domains__domain__iexact=host_name) |
-                            Q(template__domains__domain__isnull=True)
-                        )
-                    ).select_related(
-                        *RTTM_select_related
-                    ).extra(
-                        select={'has_domain': "COALESCE(django_site.domain, '/')"}
-                    ).extra(
-                        order_by = ['-has_domain', 'template__swim_content_type', 'order']
-                    )
-            else:
-                template_set = ResourceTypeTemplateMapping.objects.filter(
-                        resource_type = resource_type,
-                        template__domains__domain__isnull=True,
-                    ).select_related(*RTTM_select_related).order_by('template__swim_content_type', 'order')
-
-            for template in template_set:
-                if template.template.swim_content_type not in resource_type_templates:
-                    resource_type_templates[template.template.swim_content_type] = template
-
-        template =  resource_type_templates.get(swim_content_type, None)
-        if template:
-            return template
-
-        if resource_type.parent:
-            template = ResourceTypeTemplateMapping.get_template(
-                    request,
-                    resource_type.parent,
-                    swim_content_type,
-                    http_content_type
-                )
-            if template:
-                resource_type_templates[swim_content_type] = template
-                return template
+        templates = ResourceTypeTemplateMapping.get_potential_templates(
+                request, resource_type, swim_content_type
+            )
+        if templates:
+            return templates[0]
 
         error_message = "No template matching %s, %s, %s" % (
                 resource_type, swim_content_type, http_content_type
@@ -245,40 +253,98 @@ class ResourceTypeTemplateMapping(ModelBase):
 
         Returns an empty list when none are found.
         """
-        host_name = request.META.get('HTTP_HOST')
-        domain_specific_template_set = []
-        if host_name:
-            template_set = ResourceTypeTemplateMapping.objects.filter(
-                    Q(resource_type=resource_type) &
-                    Q(template__swim_content_type=swim_content_type) &
-                    (
-                        Q(template__domains__domain__iexact=host_name) |
-                        Q(template__domains__domain__isnull=True)
-                    )
-                ).select_related(
-                    *RTTM_select_related
-                ).extra(
-                    select={'has_domain': "COALESCE(django_site.domain, '/')"}
-                ).extra(
-                    order_by = ['-has_domain', 'order']
-                )
-        else:
-            template_set = ResourceTypeTemplateMapping.objects.filter(
-                    resource_type=resource_type,
-                    template__swim_content_type=swim_content_type,
-                    template__domains__domain__isnull=True,
-                ).select_related(*RTTM_select_related).order_by('order')
-
-        if resource_type.parent and len(template_set) == 0:
-            return ResourceTypeTemplateMapping.get_potential_templates(
-                    request,
-                    resource_type.parent,
-                    swim_content_type
-                )
-        else:
-            return template_set
+        return list(template_index.get().resolve(
+                resource_type.id,
+                getattr(swim_content_type, 'id', None),
+                request.META.get('HTTP_HOST'),
+            ))
     get_potential_templates = staticmethod(get_potential_templates)
 
 
     class Meta:
         ordering = ('order',)
+
+
+#-------------------------------------------------------------------------------
+class TemplateIndex:
+    """
+    Every ResourceTypeTemplateMapping, ready to be resolved without queries.
+
+    Lookups are keyed on (resource_type id, swim_content_type id, host) and
+    return the prioritized mappings: those for templates on the host's
+    domain first, then those for templates without a domain, each by order.
+    When a resource type has none, its parents are tried in turn.  Every
+    lookup is remembered until the index is thrown away.
+    """
+
+    #---------------------------------------------------------------------------
+    def __init__(self, mappings, parents):
+        """
+        mappings
+            The ResourceTypeTemplateMappings with their templates and domains.
+        parents
+            A dict of ResourceType id to the id of its parent.
+        """
+        self.parents = parents
+        self.domains = set()
+        self.mappings = {}
+        for mapping in mappings:
+            domains = frozenset(
+                    site.domain.lower() for site in mapping.template.domains.all()
+                )
+            self.domains.update(domains)
+            key = (mapping.resource_type_id, mapping.template.swim_content_type_id)
+            self.mappings.setdefault(key, []).append((domains, mapping))
+        self.resolved = {}
+
+    #---------------------------------------------------------------------------
+    def resolve(self, resource_type_id, swim_content_type_id, host=None):
+        # Hosts which no template is limited to all resolve the same way, so
+        # they share an entry.
+        host = host.lower() if host else None
+        if host not in self.domains:
+            host = None
+
+        key = (resource_type_id, swim_content_type_id, host)
+        templates = self.resolved.get(key)
+        if templates is not None:
+            return templates
+
+        templates = ()
+        visited = set()
+        while not templates and resource_type_id is not None:
+            if resource_type_id in visited:
+                break
+            visited.add(resource_type_id)
+
+            candidates = self.mappings.get(
+                    (resource_type_id, swim_content_type_id), ()
+                )
+            by_order = lambda mapping: (mapping.order, mapping.id)
+            templates = tuple(
+                    sorted([m for (d, m) in candidates if host in d], key=by_order) +
+                    sorted([m for (d, m) in candidates if not d], key=by_order)
+                )
+            resource_type_id = self.parents.get(resource_type_id)
+
+        self.resolved[key] = templates
+        return templates
+
+#-------------------------------------------------------------------------------
+def load_template_index():
+    mappings = ResourceTypeTemplateMapping.objects.select_related(
+            *RTTM_select_related
+        ).prefetch_related('template__domains')
+    parents = dict(ResourceType.objects.values_list('id', 'parent_id'))
+    return TemplateIndex(mappings, parents)
+
+template_index = VersionedCache('template_index', load_template_index)
+
+for model in (Template, ResourceTypeTemplateMapping, ResourceType, Site):
+    post_save.connect(template_index.invalidate, sender=model)
+    post_delete.connect(template_index.invalidate, sender=model)
+m2m_changed.connect(template_index.invalidate, sender=Template.domains.through)
+
+for (model, bundles) in ((CSS, css_bundles), (JavaScript, javascript_bundles)):
+    post_save.connect(bundles.rebuild, sender=model)
+    post_delete.connect(bundles.rebuild, sender=model)
@@ -3,6 +3,8 @@ from django.utils.html import conditional_escape
 from django.utils.safestring import mark_safe
 from django import template
 
+from swim.design.bundles import css_url, js_url
+
 
 #-------------------------------------------------------------------------------
 def escape_lookup(autoescape):
@@ -40,4 +42,5 @@ def get_item(d, k):
 register = template.Library()
 register.filter('nbsp', nbsp)
 register.filter('get_item', get_item)
-
+register.filter('css_url', css_url)
+register.filter('js_url', js_url)
@@ -1,9 +1,16 @@
+import gzip
+import os
+import shutil
+import tempfile
 import traceback
 
 from django.db import IntegrityError, transaction
+from django.http import Http404
 from django.core.exceptions import ValidationError
-from django.template import Template as DjangoTemplate, Context
-from django.test import override_settings
+from django.template import Template as DjangoTemplate, Context, engines
+from django.template import TemplateDoesNotExist
+from django.contrib.sites.models import Site
+from django.test import override_settings, RequestFactory
 from django.utils.encoding import smart_bytes
 
 from swim.test import TestCase, TransactionTestCase
@@ -11,6 +18,10 @@ from swim.core.models import ResourceType, Resource
 from swim.design.models import ResourceTypeTemplateMapping, Image
 from swim.content.models import Page
 from swim.design.models import CSS, JavaScript, Template
+from swim.design.models import compiled_templates, get_compiled_template
+from swim.design import bundles
+from swim.design.bundles import css_bundles, minify_css, minify_javascript
+from swim.core.cache import LRUCache, get_cache
 from swim.core.validators import isValidTemplate
 from swim.core import validators
 
@@ -20,6 +31,11 @@ from swim.core import validators
 class MediaTest(TransactionTestCase):
     def setUp(self):
         super(MediaTest, self).setUp()
+        # The bundles built by the tests are written somewhere of their own.
+        self.bundle_root = tempfile.mkdtemp()
+        self.bundle_settings = override_settings(SWIM_BUNDLE_ROOT=self.bundle_root)
+        self.bundle_settings.enable()
+
         self.css1 = CSS.objects.create(
             path='css_file',
             body='.works { margin: 0; }'
@@ -37,6 +53,11 @@ class MediaTest(TransactionTestCase):
             body='alert("confirmed!2");'
         )
 
+    def tearDown(self):
+        self.bundle_settings.disable()
+        shutil.rmtree(self.bundle_root)
+        super(MediaTest, self).tearDown()
+
     def testNullAlt(self):
         image = Image(key='1', alt=None)
         image.save()
@@ -86,13 +107,14 @@ class MediaTest(TransactionTestCase):
                                 path, model,))
 
     def testMediaHasPriority(self):
-        for model, http_content_type, url_format, object in (
-                (CSS, 'text/css', '/css/%s', self.css1),
-                (JavaScript, 'text/javascript', '/js/%s', self.js1),
+        for model, http_content_type, url_format, object, minify in (
+                (CSS, 'text/css', '/css/%s', self.css1, minify_css),
+                (JavaScript, 'text/javascript', '/js/%s', self.js1, minify_javascript),
             ):
 
             # CSS MUST be served up via the following URL
             response = self.client.get(url_format % object.path)
+            content = response.getvalue()
             self.assertEqual(response.status_code, 200)
 
             # CSS MUST be served up with the appropriate Content-type header
@@ -111,16 +133,17 @@ class MediaTest(TransactionTestCase):
                     response['Last-Modified']==object.http_last_modified(),
                     "%s Last-Modified is incorrect" % model)
             self.assert_(
-                    smart_bytes(object.body) in response.content,
+                    smart_bytes(minify(object.body)) in content,
                     " %s not accessible via its url." % model)
 
 
     def testCSSMultipleLoad(self):
-        for model, http_content_type, url_format, object1, object2 in (
-                (CSS, 'text/css', '/css/%s/%s', self.css1, self.css2),
-                (JavaScript, 'text/javascript', '/js/%s/%s', self.js1, self.js2),
+        for model, http_content_type, url_format, object1, object2, minify in (
+                (CSS, 'text/css', '/css/%s/%s', self.css1, self.css2, minify_css),
+                (JavaScript, 'text/javascript', '/js/%s/%s', self.js1, self.js2, minify_javascript),
             ):
             response = self.client.get(url_format % (object1.path, object2.path))
+            content = response.getvalue()
             # CSS MUST be served up via the above URL
             self.assertEqual(
                     response.status_code,
@@ -146,17 +169,17 @@ class MediaTest(TransactionTestCase):
 
             # All of the requested files MUST be in the response.
             self.assert_(
-                    smart_bytes(object1.body) in response.content,
+                    smart_bytes(minify(object1.body)) in content,
                     "%s not accessible via the multi url." % model)
             self.assert_(
-                    smart_bytes(object2.body) in response.content,
+                    smart_bytes(minify(object2.body)) in content,
                     "%s not accessible via the multi url." % model)
 
             # The request MUST maintain the same order.
             # find will return the first index where it find the value
             self.assertTrue(
-                    response.content.find(smart_bytes(object1.body)) <
-                    response.content.find(smart_bytes(object2.body)))
+                    content.find(smart_bytes(minify(object1.body))) <
+                    content.find(smart_bytes(minify(object2.body))))
 
     def test404CSSMultiple(self):
         response = self.client.get('/css/%s/InVaLiD' % self.css1)
@@ -173,6 +196,88 @@ class MediaTest(TransactionTestCase):
                 "single-body-url where one component is invalid should 404.")
 
 
+    def test_media_bundles(self):
+        self.assertEqual(
+                minify_css('a  >  b { color: red ; /* note */ }\n\n.c { content: "  ;  " }'),
+                'a>b{color:red}.c{content:"  ;  "}'
+            )
+        self.assertEqual(minify_css('a{content:";}"}'), 'a{content:";}"}')
+        self.assertEqual(minify_css('a { x : y }'), 'a{x:y}')
+        self.assertEqual(minify_css('a :hover { x : y; }'), 'a :hover{x:y}')
+
+        # The files are written again if they're removed.
+        css_bundles.url('css_file')
+        shutil.rmtree(self.bundle_root)
+        response = self.client.get('/css/css_file')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.getvalue(), smart_bytes(minify_css(self.css1.body)))
+
+        url = css_bundles.url('css_file/css_file2')
+        fingerprint = url.split('/')[2]
+        self.assertEqual(url, '/css/%s/css_file/css_file2' % fingerprint)
+
+        # Fingerprinted urls never change, and are precompressed.
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue('Accept-Encoding' in response['Vary'])
+        self.assertEqual(
+                gzip.decompress(response.getvalue()),
+                smart_bytes(minify_css('%s\n%s' % (self.css1.body, self.css2.body)))
+            )
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0, deflate')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='identity, *;q=0.5')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        # Saving a row builds the bundles again under a new fingerprint, and
+        # the old one is still served to the pages that refer to it.
+        self.css2.body = '.changed { margin: 0; }'
+        self.css2.save()
+        changed_url = css_bundles.url('css_file/css_file2')
+        self.assertNotEqual(changed_url, url)
+        response = self.client.get(changed_url)
+        self.assertTrue(b'.changed{margin:0}' in response.getvalue())
+        response = self.client.get(url)
+        self.assertTrue(b'.works2{margin:0}' in response.getvalue())
+
+        # A fingerprint that was never built falls back to the rows.
+        response = self.client.get('/css/0123456789abcdef/css_file')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Cache-Control'))
+
+    def test_media_bundles_are_bounded(self):
+        # Repeated rows, or too many of them, are refused before any query.
+        with self.assertNumQueries(0):
+            self.assertRaises(Http404, css_bundles.get, ['css_file', 'css_file'])
+            self.assertRaises(
+                    Http404,
+                    css_bundles.get,
+                    ['css_%d' % i for i in range(bundles.MAX_PATHS + 1)]
+                )
+
+        # Past the limit, new combinations are built without being stored.
+        css_bundles.url('css_file')
+        written = os.listdir(os.path.join(self.bundle_root, 'css'))
+        limit = bundles.MAX_COMBINATIONS
+        bundles.MAX_COMBINATIONS = len(get_cache().get(css_bundles.combinations_key()))
+        try:
+            response = self.client.get('/css/css_file2/css_file')
+        finally:
+            bundles.MAX_COMBINATIONS = limit
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+                response.content,
+                smart_bytes(minify_css('%s\n%s' % (self.css2.body, self.css1.body)))
+            )
+        self.assertEqual(written, os.listdir(os.path.join(self.bundle_root, 'css')))
+        self.assertEqual(
+                None,
+                get_cache().get(css_bundles.shared_key(
+                    css_bundles.stamp.get(), ('css_file2', 'css_file')))
+            )
+
     def testTemplateUniqueness(self):
         transaction.commit()
         try:
@@ -322,6 +427,167 @@ class MediaTest(TransactionTestCase):
         )
         #self.assertTrue(False, "use the content type to choose between templates with the same path ")
 
+    def test_template_resolution_is_shared(self):
+        parent_type = ResourceType.objects.create(key='parent', title='Parent')
+        child_type = ResourceType.objects.create(
+                key='child', title='Child', parent=parent_type)
+        general = Template.objects.create(
+            path = 'general',
+            body = """General""",
+            swim_content_type = Resource.swim_content_type(),
+        )
+        specific = Template.objects.create(
+            path = 'specific',
+            body = """Specific""",
+            swim_content_type = Resource.swim_content_type(),
+        )
+        site = Site.objects.create(domain='Example.com', name='example')
+        specific.domains.add(site)
+        for template in (general, specific):
+            ResourceTypeTemplateMapping.objects.create(
+                resource_type = parent_type,
+                template = template,
+            )
+
+        def potential_templates(host):
+            request = RequestFactory().get('/', HTTP_HOST=host)
+            return [
+                rttm.template for rttm in
+                ResourceTypeTemplateMapping.get_potential_templates(
+                    request, child_type, Resource.swim_content_type())
+            ]
+
+        # The child falls back to its parent, and the domain's template wins.
+        self.assertEqual([specific, general], potential_templates('example.com'))
+        self.assertEqual([general], potential_templates('other.com'))
+        with self.assertNumQueries(0):
+            self.assertEqual([general], potential_templates('other.com'))
+
+        specific.domains.remove(site)
+        self.assertEqual([general, specific], potential_templates('example.com'))
+
+    def test_jinja_design_templates_are_reloaded_when_changed(self):
+        template = Template.objects.create(
+            path = 'reloaded.jinja.html',
+            body = """Hello {{ name }}""",
+            swim_content_type = Resource.swim_content_type(),
+        )
+        engine = engines['backend']
+        compiled = engine.get_template('reloaded.jinja.html')
+        self.assertEqual("Hello you", compiled.render({'name': 'you'}))
+        self.assertTrue(
+                compiled.template is
+                engine.get_template('reloaded.jinja.html').template)
+
+        template.body = """Goodbye {{ name }}"""
+        template.save()
+        compiled = engine.get_template('reloaded.jinja.html')
+        self.assertEqual("Goodbye you", compiled.render({'name': 'you'}))
+
+    def test_django_design_templates_are_cached(self):
+        template = Template.objects.create(
+            path = 'included',
+            body = """Hello {{ name }}""",
+            swim_content_type = Resource.swim_content_type(),
+        )
+        engine = engines['django']
+        compiled = engine.get_template('included')
+        self.assertEqual("Hello you", compiled.render({'name': 'you'}))
+
+        # Both found and missing templates are answered from memory.
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                    compiled.template is engine.get_template('included').template)
+            self.assertRaises(
+                    TemplateDoesNotExist, engine.get_template, 'not-included')
+
+        # A template skipped to avoid recursion isn't answered from memory.
+        loader = compiled.origin.loader
+        try:
+            loader.get_template('included', skip=[compiled.origin])
+            self.fail("The skipped template was found")
+        except TemplateDoesNotExist as e:
+            self.assertEqual(
+                    [(compiled.origin, 'Skipped to avoid recursion')], e.tried)
+        try:
+            loader.get_template('not-included')
+            self.fail("A missing template was found")
+        except TemplateDoesNotExist as e:
+            self.assertEqual(['not-included'], [origin.name for (origin, status) in e.tried])
+
+        template.body = """Goodbye {{ name }}"""
+        template.save()
+        compiled = engine.get_template('included')
+        self.assertEqual("Goodbye you", compiled.render({'name': 'you'}))
+
+    def test_template_analysis(self):
+        for (path, body) in (
+                ('/analyzed', """
+                    {% if resource.copy.intro %}{{ resource.copy.intro.body|safe }}{% endif %}
+                    {% for link in resource.menu.main.links %}{{ link.url }}{% endfor %}
+                    {% with photo=target.image.photo %}{{ request.path }}{% endwith %}
+                    {{ content.page.about.title }}
+                """),
+                ('/analyzed.jinja.html', """
+                    {% if resource.copy.intro %}{{ resource.copy.intro.body|safe }}{% endif %}
+                    {% for link in resource.menu['main'].links %}{{ link.url }}{% endfor %}
+                    {% set photo = target.image.photo %}{{ request.path }}
+                    {{ swim.content.page['about'].title }}
+                """),
+            ):
+            template = Template.objects.create(
+                path=path,
+                body=body,
+                swim_content_type=Resource.swim_content_type(),
+            )
+            self.assertEqual(
+                    {
+                        'atoms': ['copy', 'image', 'menu'],
+                        'relations': [
+                            ['copy', 'intro', 'body'],
+                            ['menu', 'main', 'links'],
+                        ],
+                        'content': [['page', 'about']],
+                    },
+                    Template.objects.get(pk=template.pk).analysis,
+                )
+
+        template.body = '{% if %}'
+        template.save()
+        self.assertEqual(None, template.analysis)
+
+    def test_compiled_templates_are_reused(self):
+        template = Template.objects.create(
+            path = 'compiled',
+            body = """Hello {{ name }}""",
+            swim_content_type = Resource.swim_content_type(),
+        )
+        compiled_templates.reset()
+
+        compiled = get_compiled_template(template)
+        self.assertEqual("Hello you", compiled.render(Context({'name': 'you'})))
+        self.assertTrue(compiled is get_compiled_template(template))
+        self.assertEqual((1, 1), (compiled_templates.hits, compiled_templates.misses))
+
+        # Editing the template throws the compiled copy away.
+        template.body = """Goodbye {{ name }}"""
+        template.save()
+        self.assertEqual(0, len(compiled_templates))
+        compiled = get_compiled_template(template)
+        self.assertEqual("Goodbye you", compiled.render(Context({'name': 'you'})))
+
+        template.delete()
+        self.assertEqual(0, len(compiled_templates))
+
+    def test_compiled_template_cache_is_bounded(self):
+        cache = LRUCache(2)
+        for key in ('a', 'b', 'a', 'c'):
+            cache.get_or_build(key, lambda: key.upper())
+        self.assertEqual(
+                {'hits': 1, 'misses': 3, 'size': 2, 'maxsize': 2}, cache.info())
+        self.assertEqual('A', cache.get_or_build('a', lambda: None))
+        self.assertEqual(None, cache.get_or_build('b', lambda: None))
+
 #-------------------------------------------------------------------------------
 @override_settings(ROOT_URLCONF='swim.urls')
 class TemplateFilters(TestCase):
@@ -7,7 +7,9 @@ from django.contrib import admin
 from django.contrib.admin import widgets
 from django.contrib.admin.options import flatten_fieldsets
 from django.conf import settings
+from django.conf.urls import url
 from django.http import HttpResponse
+from django.shortcuts import render
 from django.utils.translation import ugettext as _
 from django.utils.html import escape
 from django.utils.safestring import mark_safe
@@ -895,6 +897,55 @@ class ResourceTypeAdmin(ModelAdmin):
         ResourceTypeMiddlewareMappingInline,
         ResourceTypeSwimContentTypeMappingInline,
     ]
+    change_list_template = "admin/swim_resourcetype_change_list.html"
+
+    #---------------------------------------------------------------------------
+    def get_urls(self):
+        urls = super(ResourceTypeAdmin, self).get_urls()
+        my_urls = [
+            url(r'^timings/$',
+                self.admin_site.admin_view(self.timings_view),
+                name='swim.core.resourcetype-timings'),
+        ]
+        return my_urls + urls
+
+    #---------------------------------------------------------------------------
+    def timings_view(self, request):
+        """
+        Lists the slowest resource types, templates and functions, as timed
+        by the worker serving the request.  See: swim.core.timing
+        """
+        from swim.core.timing import timing_histograms
+
+        sections = []
+        for (kind, title) in (
+                ('resource_type', 'Resource Types'),
+                ('template', 'Templates'),
+                ('middleware', 'Middleware'),
+                ('response_processor', 'Response Processors'),
+            ):
+            sections.append({
+                'title': title,
+                'rows': [
+                    {
+                        'name': name,
+                        'count': histogram.count,
+                        'mean': histogram.mean_ms(),
+                        'p95': histogram.percentile_ms(95),
+                        'max': histogram.max_ms(),
+                        'queries': histogram.mean_queries(),
+                    }
+                    for (name, histogram) in timing_histograms.slowest(kind)
+                ],
+            })
+
+        context = dict(
+                self.admin_site.each_context(request),
+                title='Timings',
+                opts=self.model._meta,
+                sections=sections,
+            )
+        return render(request, 'admin/swim_timings.html', context)
 
 # ResourceType Administration
 admin.site.register(ResourceType, ResourceTypeAdmin)
@@ -41,7 +41,9 @@ class HasTimeline:
         Returns a published post timeline.
         """
         return Timeline(
-            self.event_set.all().order_by('start_timestamp', 'end_timestamp'),
+            self.event_set.all().order_by(
+                'start_timestamp', 'end_timestamp'
+            ).prefetch_atoms(),
             'start_timestamp',
             'end_timestamp',
             'resource_type',
@@ -194,7 +196,9 @@ class AllCalendarEvents(Timeline):
     def __init__(self):
         # ensure we initialize the ranges mixin properly.
         super(AllCalendarEvents, self).__init__(
-            Event.objects.all().order_by('start_timestamp', 'end_timestamp'),
+            Event.objects.all().order_by(
+                'start_timestamp', 'end_timestamp'
+            ).prefetch_atoms(),
             'start_timestamp',
             'end_timestamp',
             'resource_type',
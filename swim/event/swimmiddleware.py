@@ -1,6 +1,10 @@
 """
 Event related middleware.
 """
+from django.db import models
+from django.utils import timezone
+
+from swim.core.content import get_queryset_stamp
 from swim.event.models import Event, AllCalendarEvents, Calendar
 
 #-------------------------------------------------------------------------------
@@ -10,9 +14,26 @@ def all_calendar_events(request, context, resource, template):
     """
     context['all_calendar_events'] = AllCalendarEvents()
 
+def all_calendar_events_stamps(request, resource, template):
+    # Events start and end as time goes by, without being saved.
+    now = timezone.now()
+    passed = Event.objects.aggregate(
+            started=models.Count('pk', filter=models.Q(start_timestamp__lte=now)),
+            ended=models.Count('pk', filter=models.Q(end_timestamp__lte=now)),
+        )
+    return [
+        get_queryset_stamp(Event.objects.all()),
+        (None, (passed['started'], passed['ended'])),
+    ]
+all_calendar_events.modification_stamps = all_calendar_events_stamps
+
 #-------------------------------------------------------------------------------
 def all_calendars(request, context, resource, template):
     """
     Update the context to include an 'all_calendars' entry.
     """
     context['all_calendars'] = Calendar.objects.all()
+
+def all_calendars_stamps(request, resource, template):
+    return [get_queryset_stamp(Calendar.objects.all())]
+all_calendars.modification_stamps = all_calendars_stamps
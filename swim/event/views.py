@@ -1,3 +1,4 @@
+from swim.core.content import get_queryset_stamp
 from swim.content.views import PageView
 from swim.event.models import (
     Calendar,
@@ -20,6 +21,18 @@ class CalendarView(PageView):
         """
         return Calendar.objects.get(path=path)
 
+    #---------------------------------------------------------------------------
+    def get_modification_stamps(self, request, resource, template):
+        """
+        Calendar pages list the events of their calendar.
+        """
+        stamps = super(CalendarView, self).get_modification_stamps(
+                request, resource, template)
+        calendar_id = resource.pk if isinstance(resource, Calendar) else resource.calendar_id
+        stamps.append(get_queryset_stamp(
+                Event.objects.filter(calendar=calendar_id)))
+        return stamps
+
 #-------------------------------------------------------------------------------
 class EventView(CalendarView):
     #---------------------------------------------------------------------------
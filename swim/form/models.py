@@ -4,7 +4,7 @@ from django.forms.forms import NON_FIELD_ERRORS
 from django.forms.utils import ErrorList
 from django.contrib.contenttypes.models import ContentType as DjangoContentType
 
-from swim.core import modelfields
+from swim.core import modelfields, pagecache
 from swim.core.models import (
     ModelBase,
     ContentType as SwimContentType,
@@ -130,6 +130,7 @@ class FormFieldArrangement(ModelBase):
             self._form = FormWrapper(request)
 
         # loop over the field that should be attached to this form
+        pagecache.record_related(self, FormField)
         for field in self.formfield_set.all():
             field.initial = initial.get(field.name, None)
             self._form.fields[field.name] = field.type.constructor.invoke(field)
@@ -713,7 +713,13 @@ class ImageSlot(AbstractImageSlot, ContentSlot):
         verbose_name_plural = 'Images'
         ordering = ['order']
 
-register_atom_type('image', ReferencedAtomType(Image, ImageSlot))
+register_atom_type(
+        'image',
+        ReferencedAtomType(
+            Image, ImageSlot,
+            swim_content_types=('swim.media.ImageType',)
+        )
+    )
 
 
 #-------------------------------------------------------------------------------
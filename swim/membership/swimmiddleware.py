@@ -6,6 +6,7 @@ import base64
 import json
 
 from django.contrib import auth
+from swim.core.content import get_queryset_stamp
 from swim.membership.models import Member
 from swim.form.models import Form
 from swim.membership import MEMBERSHIP_ORIGIN_COOKIE_NAME
@@ -101,6 +102,12 @@ def member_middleware(request, context, resource, template):
         except Member.DoesNotExist as e:
             pass
 
+def member_middleware_stamps(request, resource, template):
+    if not request.user.is_authenticated:
+        return []
+    return [get_queryset_stamp(Member.objects.filter(user=request.user))]
+member_middleware.modification_stamps = member_middleware_stamps
+
 
 #-------------------------------------------------------------------------------
 def membership_origin_middleware(request, context, resource, template):
@@ -15,8 +15,7 @@ from django.http import (
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.auth.models import User
 
-from swim.core import get_object_by_path, query_object_by_potential_paths
-from swim.security.models import SslEncryption, AccessRestriction
+from swim.security.models import access_restrictions
 
 
 #-------------------------------------------------------------------------------
@@ -52,18 +51,14 @@ def allow_confirmed_email(middleware, access_restriction, request, path):
 def allow_specific_groups(middleware, access_restriction, request, path):
     if request.user.is_active and request.user.is_authenticated:
 
-        # Get the users group queryset.
-        user_group_qs = request.user.groups.all()
-
-        # Get the access restriction groups query set
-        access_restriction_groups = access_restriction.allow_groups.all()
-
-        # filter the users groups by the groups in the access_restrction_groups
-        user_group_qs.in_bulk([group.id for group in access_restriction_groups])
+        # filter the users groups by the groups in the access_restrction
+        user_group_qs = request.user.groups.filter(
+            id__in=access_restriction.allow_group_ids
+        )
 
         # if there is at least one group in common, let them in.
         # Or if they are the superuser
-        if len(user_group_qs) > 0 or request.user.is_superuser:
+        if request.user.is_superuser or user_group_qs.exists():
             return middleware.get_response(request)
 
     return HttpResponseRedirect(access_restriction.redirect_path)
@@ -93,7 +88,7 @@ class EnforceAccessRestriction:
 
     def __call__(self, request):
         path = request.path
-        access_restriction = query_object_by_potential_paths(AccessRestriction, path)
+        access_restriction = access_restrictions.get().longest_prefix(path)
         if not access_restriction:
             # We don't care about this URL
             return self.get_response(request)
@@ -1,10 +1,12 @@
 from datetime import datetime
 
 from django.db import models
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.contrib.auth.models import Group, User
 from django.urls import reverse
 
-from swim.core import modelfields, WithRelated
+from swim.core import modelfields, WithRelated, PathTrie
+from swim.core.cache import VersionedCache
 from swim.core.models import (
     ModelIsContentType,
     ContentSlot,
@@ -71,6 +73,37 @@ class AccessRestriction(models.Model):
             self.only_allow,
         )
 
+#-------------------------------------------------------------------------------
+def load_access_restrictions():
+    """
+    Returns a PathTrie of every AccessRestriction.
+
+    Each restriction is given an allow_group_ids attribute, the set of the
+    ids of its allow_groups.
+    """
+    restrictions = AccessRestriction.objects.in_bulk()
+    for restriction in restrictions.values():
+        restriction.allow_group_ids = set()
+
+    AllowGroups = AccessRestriction.allow_groups.through
+    for (restriction_id, group_id) in AllowGroups.objects.values_list(
+            'accessrestriction_id', 'group_id').order_by().iterator():
+        restrictions[restriction_id].allow_group_ids.add(group_id)
+
+    return PathTrie(
+            (restriction.path, restriction)
+            for restriction in restrictions.values()
+        )
+
+access_restrictions = VersionedCache('access_restrictions', load_access_restrictions)
+post_save.connect(access_restrictions.invalidate, sender=AccessRestriction)
+post_delete.connect(access_restrictions.invalidate, sender=AccessRestriction)
+post_delete.connect(access_restrictions.invalidate, sender=Group)
+m2m_changed.connect(
+        access_restrictions.invalidate,
+        sender=AccessRestriction.allow_groups.through
+    )
+
 #-------------------------------------------------------------------------------
 # This is here because django and apache have no way to communicate regarding
 # a user's access level for files, if apache is serving up.
@@ -305,3 +305,38 @@ class SslEncryptionTests(TestCase):
             self.anonymous_user,
         ):
             self._testNoAccess(user, '/securificationify-the-nation', self.restriction)
+
+    def testAccessRestrictionsChangeWithoutQuerying(self):
+        self.restriction = AccessRestriction.objects.create(
+            path='securificationify-the-nation',
+            only_allow='specific_groups',
+        )
+        self._testNoAccess(
+                self.normal_user_wo_group,
+                '/securificationify-the-nation/sub',
+                self.restriction
+            )
+
+        # Changing the groups is noticed straight away.
+        self.restriction.allow_groups.add(self.group)
+        self.normal_user_wo_group.groups.add(self.group)
+        self._testHasAccess(
+                self.normal_user_wo_group,
+                '/securificationify-the-nation/sub',
+                self.restriction
+            )
+
+        self.restriction.only_allow = 'all_superusers'
+        self.restriction.save()
+        self._testNoAccess(
+                self.normal_user_wo_group,
+                '/securificationify-the-nation/sub',
+                self.restriction
+            )
+
+        self.restriction.delete()
+        self._testHasAccess(
+                self.normal_user_wo_group,
+                '/securificationify-the-nation/sub',
+                None
+            )
@@ -86,8 +86,20 @@ TEMPLATES = [
             ],
             "globals": {
                 "is_subpath_on_path": "swim.core.is_subpath_on_path",
+                "css_url": "swim.design.bundles.css_url",
+                "js_url": "swim.design.bundles.js_url",
             },
             "loader": "swim.design.loader.jinja2_loader",
+            # Design templates live in the database, so jinja must ask the
+            # loader whether its compiled copies are still current.
+            "auto_reload": True,
+            # Compiled templates are stored in the cache so that they survive
+            # restarts and are shared between workers.
+            "bytecode_cache": {
+                "name": "default",
+                "backend": "django_jinja.cache.BytecodeCache",
+                "enabled": True,
+            },
         }
     },
     {
@@ -114,7 +126,7 @@ TEMPLATES = [
             'loaders': [
                 'django.template.loaders.filesystem.Loader',
                 'django.template.loaders.app_directories.Loader',
-                'swim.design.loader.DjangoStyleLoadDesignTemplate',
+                'swim.design.loader.CachedDjangoStyleLoadDesignTemplate',
             ]
         },
     },
@@ -134,6 +146,11 @@ MIDDLEWARE = (
 )
 
 
+# The cache SWIM keeps the versions of its in memory data in.  Every worker
+# must share it, so set it to a memcached, redis or database cache whenever
+# there is more than one.  See swim.core.cache
+SWIM_CACHE_ALIAS = 'default'
+
 SWIM_RUN_MIDDLEWARE = True
 SWIM_RUN_RESPONSE_PROCESSOR = True
 SWIM_ENABLE_ADMIN = True
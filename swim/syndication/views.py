@@ -1,5 +1,7 @@
+from swim.core.content import get_queryset_stamp
 from swim.content.views import PageView
 from swim.syndication.models import RSSFeed
+from swim.blog.models import Post
 
 #-------------------------------------------------------------------------------
 class RSSView(PageView):
@@ -33,4 +35,10 @@ class RSSView(PageView):
         context['blog'] = request.resource.blog
         return context
 
-
+    #---------------------------------------------------------------------------
+    def get_modification_stamps(self, request, resource, template):
+        stamps = super(RSSView, self).get_modification_stamps(
+                request, resource, template)
+        stamps.append(get_queryset_stamp(
+                Post.published_objects.filter(blog=resource.blog_id)))
+        return stamps
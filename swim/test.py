@@ -25,7 +25,9 @@ class SWIMTestMixin:
     #---------------------------------------------------------------------------
     def setUp(self):
         from swim.core import models
+        from swim.core.cache import reset_process_caches
         models.CONTENT_TYPE_CACHE = {}
+        reset_process_caches()
         self.OLD_SWIM_RUN_MIDDLEWARE = settings.SWIM_RUN_MIDDLEWARE
         self.OLD_SWIM_RUN_RESPONSE_PROCESSOR = settings.SWIM_RUN_RESPONSE_PROCESSOR
 